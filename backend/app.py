@@ -3,6 +3,10 @@ from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 from database import db
+from services.metrics import init_metrics
+from services.query_stats import init_query_stats
+from services.profiler import init_profiler
+from services.jobs import init_jobs
 
 # Load environment variables
 load_dotenv()
@@ -11,10 +15,14 @@ app = Flask(__name__, static_folder='../frontend', static_url_path='')
 CORS(app)
 
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///ict_support.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///ict_support.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
+init_metrics(app)
+init_query_stats(app)
+init_profiler(app)
+init_jobs(app)
 
 # Import models after db initialization
 from models.support_ticket import SupportTicket
@@ -22,6 +30,15 @@ from models.building import Building
 from models.department import Department
 from models.user import User
 from models.floor import Floor
+from models.token_revocation import TokenRevocation
+from models.migration_checkpoint import MigrationCheckpoint
+from models.resolution_rollup import ResolutionRollup
+from models.volume_rollup import VolumeRollup
+from models.satisfaction_rollup import SatisfactionRollup
+from models.sla_target import SlaTarget
+from models.outbox_event import OutboxEvent
+from models.job import Job
+from models.index_generation import IndexGeneration
 
 # Register blueprints
 from routes.tickets import tickets_bp
@@ -30,6 +47,7 @@ from routes.general import general_bp
 from routes.auth import auth_bp
 from routes.admin import admin_bp
 from routes.health import health_bp
+from routes.analytics import analytics_bp
 
 app.register_blueprint(tickets_bp, url_prefix='/api')
 app.register_blueprint(ai_bp, url_prefix='/api')
@@ -37,6 +55,7 @@ app.register_blueprint(general_bp, url_prefix='/api')
 app.register_blueprint(auth_bp, url_prefix='/api')
 app.register_blueprint(admin_bp, url_prefix='/api')
 app.register_blueprint(health_bp, url_prefix='/api')
+app.register_blueprint(analytics_bp, url_prefix='/api')
 
 # Serve frontend files
 @app.route('/')
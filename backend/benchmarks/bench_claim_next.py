@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark for the agent work queue
+
+Fills one department with pending tickets, then has concurrent agents drain it
+over HTTP, once per mode:
+
+  claim-next   POST /api/admin/tickets/claim-next until the queue is empty
+  list-update  read the first pending ticket from /api/admin/tickets, then
+               PATCH it to in_progress (how agents picked tickets before)
+
+Reports claims per second, latency percentiles, tickets claimed by more than
+one agent and, for claim-next, how often a claim lost a race and moved on.
+
+Usage: python benchmarks/bench_claim_next.py [--queue 2000] [--agents 16] [--modes claim-next,list-update]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import http.client
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import configure_environment, build_database, start_server, percentile
+
+PRIORITIES = ('urgent', 'high', 'medium', 'low')
+AGENT_PASSWORD = 'Bench@agent1'
+
+
+def call(port, method, path, token, body=None):
+    """One HTTP request; returns (status, parsed JSON body, latency seconds)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    start = time.perf_counter()
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'})
+        response = conn.getresponse()
+        data = json.loads(response.read() or b'{}')
+        return response.status, data, time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def create_agents(app, count):
+    """A benchmark department with count agents; returns (department id, {username: user id})"""
+    from database import db
+    from models.department import Department
+    from models.user import User
+
+    with app.app_context():
+        department = Department(name='Claim Benchmark')
+        db.session.add(department)
+        db.session.flush()
+        agents = []
+        for i in range(count):
+            user = User(username=f'bench_agent_{i}', role='AGENT', department_id=department.id,
+                        active=True, must_change_password=False)
+            user.set_password(AGENT_PASSWORD)
+            agents.append(user)
+        db.session.add_all(agents)
+        db.session.commit()
+        return department.id, {user.username: user.id for user in agents}
+
+
+def fill_queue(app, department_id, size, seed):
+    """Replace the department's tickets with size pending, unassigned tickets"""
+    import random
+    from database import db
+    from models.floor import Floor
+    from models.user import User
+    from models.support_ticket import SupportTicket
+    from services.assignment import assignment_engine
+
+    rng = random.Random(seed)
+    with app.app_context():
+        floor = Floor.query.first()
+        SupportTicket.query.filter_by(department_id=department_id).delete()
+        User.query.filter_by(department_id=department_id).update({'assignment_load': 0})
+        now = datetime.utcnow()
+        rows = []
+        for i in range(size):
+            created_at = now - timedelta(minutes=rng.randint(1, 7 * 24 * 60))
+            priority = rng.choices(PRIORITIES, weights=(1, 3, 8, 4))[0]
+            rows.append({
+                'building_id': floor.building_id, 'floor_id': floor.id, 'department_id': department_id,
+                'issue_type': 'Benchmark', 'description': f'Queued benchmark ticket {i}',
+                'priority': priority, 'status': 'pending', 'created_at': created_at, 'updated_at': created_at,
+                'due_at': created_at + timedelta(hours=24)
+            })
+        db.session.execute(SupportTicket.__table__.insert(), rows)
+        db.session.commit()
+        assignment_engine.invalidate()
+
+
+def claim_next(port, token, department_id):
+    status, data, elapsed = call(port, 'POST', '/api/admin/tickets/claim-next', token)
+    if status == 404:
+        return None, elapsed
+    if status != 200:
+        raise RuntimeError(data.get('error'))
+    return data['ticket']['id'], elapsed
+
+
+def list_then_update(port, token, department_id):
+    status, data, first = call(port, 'GET', f'/api/admin/tickets?status=pending&department_id={department_id}'
+                                            f'&per_page=1', token)
+    if status != 200:
+        raise RuntimeError(data.get('error'))
+    if not data['tickets']:
+        return None, first
+    ticket_id = data['tickets'][0]['id']
+    status, data, second = call(port, 'PATCH', f'/api/admin/tickets/{ticket_id}/status', token,
+                                {'status': 'in_progress'})
+    if status != 200:
+        raise RuntimeError(data.get('error'))
+    return ticket_id, first + second
+
+
+MODES = {'claim-next': claim_next, 'list-update': list_then_update}
+
+
+def conflict_count():
+    from services.metrics import REGISTRY
+    values, _ = REGISTRY.local_totals()
+    return sum(value for (name, _), value in values.items() if name == 'ticket_claim_conflicts_total')
+
+
+def verify(app, department_id, claims, user_ids):
+    """Tickets still pending, and claimed tickets not assigned to the agent that claimed them"""
+    from models.support_ticket import SupportTicket
+
+    with app.app_context():
+        pending = SupportTicket.query.filter_by(department_id=department_id, status='pending').count()
+        owners = dict(SupportTicket.query.with_entities(SupportTicket.id, SupportTicket.assigned_to_id)
+                      .filter_by(department_id=department_id))
+    misassigned = sum(1 for username, ticket_id in claims if owners.get(ticket_id) != user_ids[username])
+    return pending, misassigned
+
+
+def run(mode, port, tokens, department_id):
+    claim = MODES[mode]
+    claims, latencies, errors = [], [], [0]
+    lock = threading.Lock()
+
+    def agent(username, token):
+        while True:
+            try:
+                ticket_id, elapsed = claim(port, token, department_id)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            if ticket_id is None:
+                return
+            with lock:
+                claims.append((username, ticket_id))
+                latencies.append(elapsed)
+
+    conflicts = conflict_count()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=agent, args=item) for item in tokens.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    counts = Counter(ticket_id for _, ticket_id in claims)
+    return claims, {
+        'claims': len(claims),
+        'tickets': len(counts),
+        'double_claimed': sum(1 for count in counts.values() if count > 1),
+        'claims_per_second': round(len(claims) / wall, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'conflicts': conflict_count() - conflicts if mode == 'claim-next' else None,
+        'errors': errors[0],
+    }
+
+
+def run_benchmark(args, workdir):
+    configure_environment(args, workdir)
+
+    from app import app
+    print(f"🌱 Building database with {args.tickets} tickets in {workdir}")
+    build_database(app, args.tickets, args.seed)
+    department_id, user_ids = create_agents(app, args.agents)
+
+    server = start_server(app)
+    port = server.server_port
+    tokens = {}
+    for username in user_ids:
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        conn.request('POST', '/api/login', body=json.dumps({'username': username, 'password': AGENT_PASSWORD}),
+                     headers={'Content-Type': 'application/json'})
+        tokens[username] = json.loads(conn.getresponse().read())['token']
+        conn.close()
+
+    print(f"🚀 {args.agents} agents draining {args.queue} pending tickets\n")
+    print(f"{'mode':<12} {'claims/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'claims':>7} "
+          f"{'doubles':>8} {'conflicts':>10} {'left':>5} {'wrong owner':>12}")
+    try:
+        for mode in args.modes.split(','):
+            if mode not in MODES:
+                print(f"✗ Unknown mode: {mode}")
+                continue
+            fill_queue(app, department_id, args.queue, args.seed)
+            claims, stats = run(mode, port, tokens, department_id)
+            pending, misassigned = verify(app, department_id, claims, user_ids)
+            conflicts = '-' if stats['conflicts'] is None else stats['conflicts']
+            owner = misassigned if mode == 'claim-next' else '-'  # list-update does not assign
+            print(f"{mode:<12} {stats['claims_per_second']:>9} {stats['p50_ms']:>8} {stats['p95_ms']:>8} "
+                  f"{stats['p99_ms']:>8} {stats['claims']:>7} {stats['double_claimed']:>8} {conflicts:>10} "
+                  f"{pending:>5} {owner:>12}")
+            if stats['errors']:
+                print(f"  ⚠️ {stats['errors']} failed requests")
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=5000, help='background tickets in other departments')
+    parser.add_argument('--queue', type=int, default=2000, help='pending tickets to drain per mode')
+    parser.add_argument('--agents', type=int, default=16, help='concurrent agents')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--bcrypt-rounds', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='ict-bench-') as workdir:
+        run_benchmark(args, workdir)
+
+
+if __name__ == "__main__":
+    main()
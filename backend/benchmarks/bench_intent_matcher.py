@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the fallback intent matcher
+
+Usage: python benchmarks/bench_intent_matcher.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.intent_matcher import IntentMatcher
+
+MESSAGES = [
+    "WiFi keeps dropping on the 12th floor",
+    "The printer on our floor shows a paper jam but nothing is stuck",
+    "How do I connect my laptop to the projector for a presentation?",
+    "My computer shows a blue screen every morning",
+    "Outlook is not receiving any emails since yesterday",
+    "I need a new application installed",
+    "Hi, who are you?",
+    "This is about something completely unrelated to the office",
+    "The internet connection in the boardroom is very slow and my laptop cannot print anything " * 4,
+]
+
+
+def legacy_fallback(user_message):
+    """Chained substring scan used before the matcher (reference only)"""
+    message_lower = user_message.lower()
+    if any(word in message_lower for word in ['wifi', 'internet', 'connection', 'network']):
+        return 'wifi'
+    elif any(word in message_lower for word in ['printer', 'print', 'printing']):
+        return 'printer'
+    elif any(word in message_lower for word in ['projector', 'display', 'screen', 'presentation']):
+        return 'projector'
+    elif any(word in message_lower for word in ['computer', 'pc', 'laptop', 'desktop']):
+        return 'computer'
+    elif any(word in message_lower for word in ['email', 'mail', 'outlook']):
+        return 'email'
+    elif any(word in message_lower for word in ['software', 'program', 'application', 'app']):
+        return 'software'
+    elif any(word in message_lower for word in ['name', 'who are you', 'hello', 'hi']):
+        return 'greeting'
+    return None
+
+
+def synthetic_knowledge(intent_count, keywords_per_intent=10):
+    """Knowledge base with many intents, to show how matching cost scales"""
+    return {
+        'intents': [
+            {
+                'id': f'intent{i}',
+                'keywords': {f'word{i}x{k}': 1 for k in range(keywords_per_intent)},
+                'response': f'Response {i}',
+            }
+            for i in range(intent_count)
+        ]
+    }
+
+
+def bench(label, func, iterations):
+    """Time func over every sample message and print the per-message cost"""
+    total = timeit.timeit(lambda: [func(m) for m in MESSAGES], number=iterations)
+    per_message_us = total / (iterations * len(MESSAGES)) * 1e6
+    print(f"{label:<28} {per_message_us:8.2f} µs/message")
+    return per_message_us
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    build_time = timeit.timeit(IntentMatcher.from_file, number=10) / 10
+    print(f"Knowledge file load + index build: {build_time * 1000:.2f} ms")
+
+    matcher = IntentMatcher.from_file()
+    print(f"Benchmarking {len(MESSAGES)} messages x {iterations} iterations\n")
+
+    bench("legacy substring scan", legacy_fallback, iterations)
+    bench("IntentMatcher.match", matcher.match, iterations)
+    bench("IntentMatcher.get_quick_fixes", matcher.get_quick_fixes, iterations)
+
+    print("\nScaling with knowledge base size:")
+    for intent_count in (10, 100, 1000):
+        knowledge = synthetic_knowledge(intent_count)
+        keyword_lists = [list(intent['keywords']) for intent in knowledge['intents']]
+
+        def chained_scan(message, keyword_lists=keyword_lists):
+            message_lower = message.lower()
+            for words in keyword_lists:
+                if any(word in message_lower for word in words):
+                    return words
+            return None
+
+        scaled_iterations = max(1, iterations // intent_count)
+        bench(f"  substring scan, {intent_count} intents", chained_scan, scaled_iterations)
+        bench(f"  IntentMatcher, {intent_count} intents", IntentMatcher(knowledge).match, scaled_iterations)
+
+    print("\nMatches:")
+    for message in MESSAGES:
+        print(f"  {str(matcher.match(message)):<10} <- {message[:60]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark for the password hashing pool
+
+Simulates a burst of logins from concurrent request threads and, at the same
+time, a light request loop in the same process, for each PASSWORD_POOL mode.
+
+Usage: python benchmarks/bench_login.py [--rounds 10] [--threads 16] [--logins 64]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.passwords import PasswordHasher
+
+
+def light_requests(stop, latencies):
+    """Stand-in for cheap requests served by the same worker during the burst"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        sum(i * i for i in range(2000))
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.001)
+
+
+def run(mode, args, hashed):
+    hasher = PasswordHasher(mode=mode, workers=args.workers)
+    hasher.verify('warm-up', hashed)  # start the pool outside the timed section
+
+    per_thread = args.logins // args.threads
+    stop = threading.Event()
+    latencies = []
+    background = threading.Thread(target=light_requests, args=(stop, latencies))
+    background.start()
+
+    def login_burst():
+        for _ in range(per_thread):
+            hasher.verify('correct horse battery staple', hashed)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=login_burst) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    background.join()
+    hasher.shutdown()
+
+    p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) >= 2 else float('nan')
+    print(f"{mode:<8} {per_thread * args.threads / elapsed:8.1f} logins/s   "
+          f"light request p50 {statistics.median(latencies):6.2f} ms  p99 {p99:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=10, help='bcrypt work factor')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent login threads')
+    parser.add_argument('--logins', type=int, default=64, help='total logins per mode')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='pool size')
+    parser.add_argument('--modes', default='inline,thread,process')
+    args = parser.parse_args()
+
+    hashed = PasswordHasher(mode='inline').hash('correct horse battery staple', rounds=args.rounds)
+    print(f"bcrypt cost {args.rounds}, {args.threads} threads, {args.logins} logins, {args.workers} workers\n")
+    for mode in args.modes.split(','):
+        run(mode, args, hashed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+HTTP load-testing harness for the backend
+
+Builds a throwaway SQLite database at the requested scale, starts the app
+in-process on a local port (with a fake AI provider), then drives each endpoint
+with concurrent clients and reports throughput, latency percentiles and SQL
+queries per request. Results can be saved as JSON and compared against a
+previous run.
+
+Usage:
+    python benchmarks/load_test.py --tickets 20000 --concurrency 8 --duration 10 \\
+        --output results.json [--compare baseline.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+import http.client
+import platform
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# name -> (method, path, json body or None, needs admin token)
+ENDPOINTS = {
+    'tickets_list': ('GET', '/api/tickets', None, False),
+    'tickets_search': ('GET', '/api/tickets?search=printer&status=pending', None, False),
+    'dashboard': ('GET', '/api/dashboard', None, False),
+    'admin_tickets': ('GET', '/api/admin/tickets?per_page=20', None, True),
+    'login': ('POST', '/api/login', {'username': 'ict_support', 'password': 'Ict@support'}, False),
+    'ai_chat': ('POST', '/api/ai/chat', {'message': 'My printer says paper jam on floor 3'}, False),
+}
+
+
+def configure_environment(args, workdir):
+    """Environment for the app under test; must run before the app is imported"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['RATE_LIMIT_ENABLED'] = 'false'
+    os.environ['QUERY_STATS_HEADERS'] = 'true'  # X-Query-Count on every response
+    os.environ['BCRYPT_ROUNDS'] = str(args.bcrypt_rounds)
+    os.environ['JOB_WORKERS'] = '0'  # No SLA scans or recounts during the measured run
+    for key in ('DEEPSEEK_API_KEY', 'OPENAI_API_KEY', 'GEMINI_API_KEY'):
+        os.environ.pop(key, None)
+
+
+def build_database(app, ticket_count, seed):
+    """Seed reference data and insert ticket_count synthetic tickets"""
+    from database import db
+    from utils.seed_data import seed_database
+    from utils.generate_data import generate_tickets
+
+    with app.app_context():
+        db.create_all()
+        seed_database()
+        generate_tickets(ticket_count, days=180, seed=seed, verbose=False)
+
+
+def install_fake_ai(latency_ms):
+    """Replace the primary LLM call with a fixed-latency fake"""
+    from routes import ai
+
+    def fake_provider(user_message):
+        time.sleep(latency_ms / 1000)
+        return 'Try restarting the device. If that does not help, create a support ticket.'
+
+    ai.ai_agent._try_deepseek = fake_provider
+
+
+def start_server(app):
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def request(port, method, path, body=None, token=None):
+    """One HTTP request; returns (status, latency seconds, queries)"""
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    start = time.perf_counter()
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - start
+        return response.status, elapsed, int(response.getheader('X-Query-Count') or 0)
+    finally:
+        conn.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_endpoint(port, name, concurrency, duration, token):
+    """Drive one endpoint with concurrent clients for duration seconds"""
+    method, path, body, needs_token = ENDPOINTS[name]
+    latencies, queries, errors = [], [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            try:
+                status, elapsed, query_count = request(port, method, path, body, token if needs_token else None)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                if status >= 400:
+                    errors[0] += 1
+                latencies.append(elapsed)
+                queries.append(query_count)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput_rps': round(len(latencies) / wall, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries_per_request': round(statistics.mean(queries), 2) if queries else 0,
+    }
+
+
+def compare(results, baseline_path):
+    """Print throughput and p95 changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['endpoints']
+    print(f"\nCompared with {baseline_path}:")
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        rps_change = (current['throughput_rps'] / before['throughput_rps'] - 1) * 100 if before['throughput_rps'] else 0
+        p95_change = (current['p95_ms'] / before['p95_ms'] - 1) * 100 if before['p95_ms'] else 0
+        flag = '  ⚠️ regression' if rps_change < -10 or p95_change > 10 else ''
+        print(f"  {name:<16} throughput {rps_change:+6.1f}%  p95 {p95_change:+6.1f}%  "
+              f"queries {before['queries_per_request']} -> {current['queries_per_request']}{flag}")
+
+
+def run_benchmark(args, workdir):
+    configure_environment(args, workdir)
+
+    from app import app
+    print(f"🌱 Building database with {args.tickets} tickets in {workdir}")
+    start = time.perf_counter()
+    build_database(app, args.tickets, args.seed)
+    print(f"✓ Database ready in {time.perf_counter() - start:.1f}s")
+
+    install_fake_ai(args.ai_latency_ms)
+    server = start_server(app)
+    port = server.server_port
+
+    request(port, 'GET', '/api/health')
+    login = ENDPOINTS['login'][2]
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('POST', '/api/login', body=json.dumps(login), headers={'Content-Type': 'application/json'})
+    token = json.loads(conn.getresponse().read()).get('token')
+    conn.close()
+
+    print(f"🚀 Server on port {port}; {args.concurrency} clients x {args.duration}s per endpoint\n")
+    print(f"{'endpoint':<16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}")
+    results = {}
+    try:
+        for name in args.endpoints.split(','):
+            if name not in ENDPOINTS:
+                print(f"✗ Unknown endpoint: {name}")
+                continue
+            stats = run_endpoint(port, name, args.concurrency, args.duration, token)
+            results[name] = stats
+            print(f"{name:<16} {stats['throughput_rps']:>8} {stats['p50_ms']:>8} {stats['p95_ms']:>8} "
+                  f"{stats['p99_ms']:>8} {stats['queries_per_request']:>8} {stats['errors']:>7}")
+    finally:
+        server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'timestamp': datetime.utcnow().isoformat(),
+                'python': platform.python_version(),
+                'parameters': vars(args),
+                'endpoints': results
+            }, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=5000, help='synthetic tickets to generate')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients per endpoint')
+    parser.add_argument('--duration', type=float, default=5, help='seconds per endpoint')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='comma-separated endpoint names')
+    parser.add_argument('--ai-latency-ms', type=float, default=300, help='latency of the fake AI provider')
+    parser.add_argument('--bcrypt-rounds', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--compare', help='previous results JSON to compare against')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='ict-bench-') as workdir:
+        run_benchmark(args, workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from database import db
+
+class IndexGeneration(db.Model):
+    """Version of an index every worker keeps in memory; workers rebuild theirs when it moves"""
+    __tablename__ = 'index_generations'
+
+    name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def current(cls, name):
+        return db.session.query(cls.generation).filter(cls.name == name).scalar() or 0
+
+    @classmethod
+    def bump(cls, name):
+        """Move an index to its next generation and commit; returns the new generation"""
+        bumped = db.session.execute(
+            update(cls).where(cls.name == name)
+            .values(generation=cls.generation + 1, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not bumped:
+            try:
+                db.session.add(cls(name=name, generation=1))
+                db.session.commit()
+                return 1
+            except IntegrityError:
+                db.session.rollback()  # Another worker created it first
+                return cls.bump(name)
+        db.session.commit()
+        return cls.current(name)
+
+    def __repr__(self):
+        return f'<IndexGeneration {self.name}={self.generation}>'
@@ -0,0 +1,27 @@
+from datetime import datetime
+from database import db
+
+class MigrationCheckpoint(db.Model):
+    __tablename__ = 'migration_checkpoints'
+
+    name = db.Column(db.String(100), primary_key=True)
+    last_key = db.Column(db.Integer)  # Highest primary key already processed
+    rows_processed = db.Column(db.Integer, default=0)
+    rows_changed = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), default='running')  # running, completed
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'last_key': self.last_key,
+            'rows_processed': self.rows_processed,
+            'rows_changed': self.rows_changed,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<MigrationCheckpoint {self.name} at {self.last_key}>'
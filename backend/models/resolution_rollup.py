@@ -0,0 +1,29 @@
+from database import db
+
+class ResolutionRollup(db.Model):
+    __tablename__ = 'resolution_rollups'
+    __table_args__ = (
+        db.Index('ix_resolution_rollups_bucket', 'granularity', 'bucket_start'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(10), nullable=False)  # hour, day, month
+    bucket_start = db.Column(db.DateTime, nullable=False)  # Start of the hour/day/month the tickets were resolved in
+    building_id = db.Column(db.Integer, db.ForeignKey('buildings.id'))
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'))
+    issue_type = db.Column(db.String(100))
+    priority = db.Column(db.String(20))
+    count = db.Column(db.Integer, nullable=False, default=0)
+    sum_seconds = db.Column(db.Float, nullable=False, default=0.0)  # Total resolution time
+    sketch = db.Column(db.Text)  # Serialized QuantileSketch of resolution times in seconds
+
+    def __repr__(self):
+        return f'<ResolutionRollup {self.granularity} {self.bucket_start} n={self.count}>'
+
+
+# Nullable group columns are coalesced: SQLite treats NULLs in a unique index as distinct
+NO_ID, NO_TEXT = db.literal_column('0'), db.literal_column("''")
+db.Index('uq_resolution_rollup_group', ResolutionRollup.granularity, ResolutionRollup.bucket_start,
+         db.func.coalesce(ResolutionRollup.building_id, NO_ID), db.func.coalesce(ResolutionRollup.department_id, NO_ID),
+         db.func.coalesce(ResolutionRollup.issue_type, NO_TEXT), db.func.coalesce(ResolutionRollup.priority, NO_TEXT),
+         unique=True)
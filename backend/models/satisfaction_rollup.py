@@ -0,0 +1,28 @@
+from database import db
+
+class SatisfactionRollup(db.Model):
+    __tablename__ = 'satisfaction_rollups'
+    id = db.Column(db.Integer, primary_key=True)
+    bucket_start = db.Column(db.DateTime, nullable=False, index=True)  # Day the ratings were submitted
+    building_id = db.Column(db.Integer, db.ForeignKey('buildings.id'))
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'))
+    assigned_to = db.Column(db.String(100))
+    count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum_squares = db.Column(db.Integer, nullable=False, default=0)
+    # Histogram of 1-5 star ratings
+    rating_1 = db.Column(db.Integer, nullable=False, default=0)
+    rating_2 = db.Column(db.Integer, nullable=False, default=0)
+    rating_3 = db.Column(db.Integer, nullable=False, default=0)
+    rating_4 = db.Column(db.Integer, nullable=False, default=0)
+    rating_5 = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<SatisfactionRollup {self.bucket_start} n={self.count}>'
+
+
+# Nullable group columns are coalesced: SQLite treats NULLs in a unique index as distinct
+NO_ID, NO_TEXT = db.literal_column('0'), db.literal_column("''")
+db.Index('uq_satisfaction_rollup_group', SatisfactionRollup.bucket_start,
+         db.func.coalesce(SatisfactionRollup.building_id, NO_ID), db.func.coalesce(SatisfactionRollup.department_id, NO_ID),
+         db.func.coalesce(SatisfactionRollup.assigned_to, NO_TEXT), unique=True)
@@ -0,0 +1,29 @@
+from datetime import datetime
+from database import db
+
+class SlaTarget(db.Model):
+    __tablename__ = 'sla_targets'
+    __table_args__ = (
+        db.UniqueConstraint('priority', 'department_id', name='uq_sla_target'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    priority = db.Column(db.String(20), nullable=False)  # low, medium, high, urgent
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'))  # None applies to every department
+    hours = db.Column(db.Float, nullable=False)  # Time allowed from creation to resolution
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    department = db.relationship('Department')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'priority': self.priority,
+            'department_id': self.department_id,
+            'department_name': self.department.name if self.department else None,
+            'hours': self.hours,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<SlaTarget {self.priority} department={self.department_id} {self.hours}h>'
@@ -3,6 +3,10 @@ from database import db
 
 class SupportTicket(db.Model):
     __tablename__ = 'support_tickets'
+    __table_args__ = (
+        db.Index('ix_support_tickets_status_due_at', 'status', 'due_at'),  # SLA breach scans
+        db.Index('ix_support_tickets_queue', 'department_id', 'status', 'priority', 'created_at'),  # claim-next
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     building_id = db.Column(db.Integer, db.ForeignKey('buildings.id'), nullable=False)
@@ -13,20 +17,32 @@ class SupportTicket(db.Model):
     contact_person = db.Column(db.String(100))
     phone_number = db.Column(db.String(20))
     priority = db.Column(db.String(20), default='medium')  # low, medium, high, urgent
-    status = db.Column(db.String(20), default='pending')  # pending, in_progress, resolved, closed
-    assigned_to = db.Column(db.String(100))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, in_progress, resolved, closed
+    assigned_to = db.Column(db.String(100))  # Assignee's username, kept in step with assigned_to_id
+    assigned_to_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     resolved_at = db.Column(db.DateTime)
     notes = db.Column(db.Text)
     rating = db.Column(db.Integer)  # 1-5 star rating
     rating_comment = db.Column(db.Text)  # Optional comment with rating
     rated_at = db.Column(db.DateTime)  # When the rating was submitted
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey('support_tickets.id'))  # Likely duplicate of this open ticket
+    suggested_priority = db.Column(db.String(20))  # Auto-triage suggestion
+    suggested_issue_type = db.Column(db.String(100))  # Auto-triage suggestion (normalized)
+    due_at = db.Column(db.DateTime)  # SLA deadline for resolution
+    breached_at = db.Column(db.DateTime)  # When the SLA scanner found the deadline missed
     
     # Relationships
     building = db.relationship('Building', backref='tickets')
     floor = db.relationship('Floor', backref='tickets')
     department = db.relationship('Department', backref='tickets')
+    assignee = db.relationship('User', foreign_keys=[assigned_to_id])
+    
+    @classmethod
+    def with_names(cls):
+        """Ticket query that loads the building, floor and department to_dict shows in the same SELECT"""
+        return cls.query.options(db.joinedload(cls.building), db.joinedload(cls.floor), db.joinedload(cls.department))
     
     def to_dict(self):
         return {
@@ -44,6 +60,7 @@ class SupportTicket(db.Model):
             'priority': self.priority,
             'status': self.status,
             'assigned_to': self.assigned_to,
+            'assigned_to_id': self.assigned_to_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
@@ -51,6 +68,11 @@ class SupportTicket(db.Model):
             'rating': self.rating,
             'rating_comment': self.rating_comment,
             'rated_at': self.rated_at.isoformat() if self.rated_at else None,
+            'duplicate_of_id': self.duplicate_of_id,
+            'suggested_priority': self.suggested_priority,
+            'suggested_issue_type': self.suggested_issue_type,
+            'due_at': self.due_at.isoformat() if self.due_at else None,
+            'breached_at': self.breached_at.isoformat() if self.breached_at else None,
             'notification': self._get_notification_message()
         }
     
@@ -0,0 +1,15 @@
+from datetime import datetime
+from database import db
+
+class TokenRevocation(db.Model):
+    __tablename__ = 'token_revocations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), index=True)  # Revokes a single token
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    issued_before = db.Column(db.DateTime)  # Revokes every token of user_id issued before this time
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # When the entry can be forgotten
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<TokenRevocation {self.jti or f"user {self.user_id}"}>'
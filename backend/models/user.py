@@ -1,13 +1,24 @@
 from datetime import datetime
 from database import db
-import bcrypt
+from services.passwords import password_hasher, needs_rehash
 import jwt
 import os
+import time
+import uuid
 from datetime import datetime, timedelta
 
+# Roles each role is allowed to act as
+ROLE_HIERARCHY = {
+    'ADMIN': ['ADMIN', 'AGENT', 'VIEWER'],
+    'AGENT': ['AGENT', 'VIEWER'],
+    'VIEWER': ['VIEWER']
+}
+
 class User(db.Model):
     __tablename__ = 'users'
     
+    TOKEN_LIFETIME = timedelta(hours=24)
+    
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
@@ -19,18 +30,22 @@ class User(db.Model):
     last_login = db.Column(db.DateTime)
     failed_login_attempts = db.Column(db.Integer, default=0)
     locked_until = db.Column(db.DateTime)
+    assignment_load = db.Column(db.Integer, nullable=False, default=0)  # Priority-weighted open tickets assigned
     
     # Relationship
     department = db.relationship('Department', backref='users')
     
     def set_password(self, password):
-        """Hash password using bcrypt"""
-        salt = bcrypt.gensalt()
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hash password using bcrypt (in the password worker pool)"""
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        """Verify password against hash (in the password worker pool)"""
+        return password_hasher.verify(password, self.password_hash)
+    
+    def password_needs_rehash(self):
+        """Check if the stored hash uses an outdated bcrypt work factor"""
+        return needs_rehash(self.password_hash)
     
     def generate_token(self):
         """Generate JWT token for user session"""
@@ -38,7 +53,9 @@ class User(db.Model):
             'user_id': self.id,
             'username': self.username,
             'role': self.role,
-            'exp': datetime.utcnow() + timedelta(hours=24)
+            'jti': uuid.uuid4().hex,
+            'iat': time.time(),
+            'exp': datetime.utcnow() + self.TOKEN_LIFETIME
         }
         return jwt.encode(payload, os.getenv('JWT_SECRET_KEY', 'your-secret-key'), algorithm='HS256')
     
@@ -62,12 +79,7 @@ class User(db.Model):
     
     def has_permission(self, required_role):
         """Check if user has required role permission"""
-        role_hierarchy = {
-            'ADMIN': ['ADMIN', 'AGENT', 'VIEWER'],
-            'AGENT': ['AGENT', 'VIEWER'],
-            'VIEWER': ['VIEWER']
-        }
-        return required_role in role_hierarchy.get(self.role, [])
+        return required_role in ROLE_HIERARCHY.get(self.role, [])
     
     def to_dict(self):
         return {
@@ -79,7 +91,8 @@ class User(db.Model):
             'active': self.active,
             'must_change_password': self.must_change_password,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None
+            'last_login': self.last_login.isoformat() if self.last_login else None,
+            'assignment_load': self.assignment_load
         }
     
     def __repr__(self):
@@ -0,0 +1,15 @@
+from database import db
+
+class VolumeRollup(db.Model):
+    __tablename__ = 'volume_rollups'
+    __table_args__ = (
+        db.Index('uq_volume_rollup_bucket', 'bucket_start', 'building_id', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    bucket_start = db.Column(db.DateTime, nullable=False, index=True)  # Start of the hour the tickets were created in
+    building_id = db.Column(db.Integer, db.ForeignKey('buildings.id'), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<VolumeRollup {self.bucket_start} building={self.building_id} n={self.count}>'
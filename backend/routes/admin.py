@@ -1,61 +1,29 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file
 from database import db
+from services.ticket_search import update_ticket_index
+from services.resolution_analytics import resolution_sample, record_resolution_change
+from services.duplicate_detector import update_duplicate_index, rebuild_duplicate_index, generation_check_seconds
 from models.user import User
 from models.support_ticket import SupportTicket
 from models.department import Department
 from models.building import Building
 from models.floor import Floor
+from models.sla_target import SlaTarget
+from models.outbox_event import OutboxEvent
+from models.job import Job
 from datetime import datetime
-import secrets
-import string
-import jwt
-import os
-from functools import wraps
+from services.auth import token_required, admin_required, agent_or_admin_required, invalidate_principal
+from services.token_revocation import revocation_list
+from services.user_import import generate_password, parse_rows, import_users
+from services.slow_queries import slow_query_log, threshold_ms
+from services.profiler import profile_store
+from services.sla import DEFAULT_SLA_HOURS, reapply_targets
+from services.jobs import TASKS, enqueue, queue_stats
+from services.assignment import assignment_engine, assignment_sample, record_assignment_change
+from services.work_queue import claim_next
 
 admin_bp = Blueprint('admin', __name__)
 
-def token_required(f):
-    """Decorator to require valid JWT token"""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
-        
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-        
-        try:
-            data = jwt.decode(token, os.getenv('JWT_SECRET_KEY', 'your-secret-key'), algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
-            if not current_user or not current_user.active:
-                return jsonify({'message': 'Invalid token'}), 401
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Invalid token'}), 401
-        
-        return f(current_user, *args, **kwargs)
-    return decorated
-
-def admin_required(f):
-    """Decorator to require ADMIN role"""
-    @wraps(f)
-    def decorated(current_user, *args, **kwargs):
-        if not current_user.has_permission('ADMIN'):
-            return jsonify({'message': 'Admin access required'}), 403
-        return f(current_user, *args, **kwargs)
-    return decorated
-
-def agent_or_admin_required(f):
-    """Decorator to require agent or admin role"""
-    @wraps(f)
-    def decorated(current_user, *args, **kwargs):
-        if not current_user.has_permission('ADMIN') and not current_user.has_permission('AGENT'):
-            return jsonify({'message': 'Agent or admin access required'}), 403
-        return f(current_user, *args, **kwargs)
-    return decorated
-
 # Ticket Management
 @admin_bp.route('/admin/tickets', methods=['GET'])
 @token_required
@@ -69,8 +37,9 @@ def get_tickets(current_user):
         department_id = request.args.get('department_id', type=int)
         building_id = request.args.get('building_id', type=int)
         assigned_to_id = request.args.get('assigned_to_id', type=int)
+        duplicate_of_id = request.args.get('duplicate_of_id', type=int)
         
-        query = SupportTicket.query
+        query = SupportTicket.with_names()
         
         if status:
             query = query.filter(SupportTicket.status == status)
@@ -80,6 +49,8 @@ def get_tickets(current_user):
             query = query.filter(SupportTicket.building_id == building_id)
         if assigned_to_id:
             query = query.filter(SupportTicket.assigned_to_id == assigned_to_id)
+        if duplicate_of_id:
+            query = query.filter(SupportTicket.duplicate_of_id == duplicate_of_id)
         
         tickets = query.order_by(SupportTicket.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
@@ -116,6 +87,8 @@ def update_ticket_status(current_user, ticket_id):
         if new_status not in valid_statuses:
             return jsonify({'error': 'Invalid status'}), 400
         
+        before = resolution_sample(ticket)
+        assignment_before = assignment_sample(ticket)
         ticket.status = new_status
         if notes:
             ticket.notes = notes
@@ -124,7 +97,11 @@ def update_ticket_status(current_user, ticket_id):
             ticket.resolved_at = datetime.utcnow()
         
         ticket.updated_at = datetime.utcnow()
+        record_resolution_change(before, ticket)
+        record_assignment_change(assignment_before, ticket)
         db.session.commit()
+        update_ticket_index(ticket)
+        update_duplicate_index(ticket)
         
         return jsonify({
             'message': 'Ticket status updated successfully',
@@ -135,6 +112,248 @@ def update_ticket_status(current_user, ticket_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/admin/tickets/claim-next', methods=['POST'])
+@token_required
+@agent_or_admin_required
+def claim_next_ticket(current_user):
+    """Claim the most urgent, oldest pending ticket in the caller's department"""
+    try:
+        department_id = current_user.department_id
+        if current_user.role == 'ADMIN':
+            department_id = request.args.get('department_id', department_id, type=int)
+        if not department_id:
+            return jsonify({'error': 'A department is required to claim tickets'}), 400
+        
+        ticket = claim_next(current_user, department_id)
+        if ticket is None:
+            return jsonify({'error': 'No pending tickets to claim'}), 404
+        update_ticket_index(ticket)
+        update_duplicate_index(ticket)
+        
+        return jsonify({
+            'message': 'Ticket claimed successfully',
+            'ticket': ticket.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/tickets/duplicates/reindex', methods=['POST'])
+@token_required
+@admin_required
+def reindex_duplicates(current_user):
+    """Rebuild the duplicate-detection index: this worker now, every other worker on its next check"""
+    try:
+        index = rebuild_duplicate_index()
+        return jsonify({
+            'message': 'Duplicate index rebuilt; other workers rebuild theirs within '
+                       f'{generation_check_seconds():g}s',
+            'open_tickets_indexed': len(index)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/slow-queries', methods=['GET'])
+@token_required
+@admin_required
+def get_slow_queries(current_user):
+    """Slowest statement shapes by total time (this worker, or every worker's log with ?source=log)"""
+    try:
+        limit = min(request.args.get('limit', 20, type=int), 200)
+        source = request.args.get('source', 'memory')
+        if source not in ('memory', 'log'):
+            return jsonify({'error': 'source must be memory or log'}), 400
+        return jsonify({
+            'threshold_ms': threshold_ms(),
+            'source': source,
+            'queries': slow_query_log.top(limit=limit, source=source)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/slow-queries', methods=['DELETE'])
+@token_required
+@admin_required
+def reset_slow_queries(current_user):
+    """Clear this worker's slow-query aggregates (the log file is kept)"""
+    slow_query_log.reset()
+    return jsonify({'message': 'Slow query statistics cleared'}), 200
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+@token_required
+@admin_required
+def get_profiles(current_user):
+    """Saved request profiles, newest first"""
+    try:
+        return jsonify({'profiles': profile_store.list()}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+@token_required
+@admin_required
+def download_profile(current_user, profile_id):
+    """Download a profile (.pstats for cProfile, collapsed stacks .folded for sampled)"""
+    metadata = profile_store.get(profile_id)
+    if not metadata:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(profile_store.path(metadata), as_attachment=True, download_name=metadata['file'])
+
+# SLA Management
+@admin_bp.route('/admin/sla-targets', methods=['GET'])
+@token_required
+@admin_required
+def get_sla_targets(current_user):
+    """Configured SLA targets and the built-in defaults per priority"""
+    try:
+        targets = SlaTarget.query.order_by(SlaTarget.priority, SlaTarget.department_id).all()
+        return jsonify({
+            'targets': [target.to_dict() for target in targets],
+            'defaults': DEFAULT_SLA_HOURS
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/sla-targets', methods=['PUT'])
+@token_required
+@admin_required
+def set_sla_target(current_user):
+    """Create or update the target for a priority, optionally for one department"""
+    try:
+        data = request.get_json() or {}
+        priority = data.get('priority')
+        department_id = data.get('department_id')
+        hours = data.get('hours')
+        
+        if priority not in DEFAULT_SLA_HOURS:
+            return jsonify({'error': f'priority must be one of {", ".join(DEFAULT_SLA_HOURS)}'}), 400
+        if not isinstance(hours, (int, float)) or hours <= 0:
+            return jsonify({'error': 'hours must be a positive number'}), 400
+        if department_id is not None and not Department.query.get(department_id):
+            return jsonify({'error': 'Department not found'}), 404
+        
+        target = SlaTarget.query.filter_by(priority=priority, department_id=department_id).first()
+        created = target is None
+        if created:
+            target = SlaTarget(priority=priority, department_id=department_id)
+            db.session.add(target)
+        target.hours = float(hours)
+        db.session.flush()
+        updated = reapply_targets(priority)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'SLA target saved',
+            'target': target.to_dict(),
+            'tickets_updated': updated
+        }), 201 if created else 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/sla-targets/<int:target_id>', methods=['DELETE'])
+@token_required
+@admin_required
+def delete_sla_target(current_user, target_id):
+    """Remove a target; its tickets fall back to the priority target or default"""
+    try:
+        target = SlaTarget.query.get(target_id)
+        if not target:
+            return jsonify({'error': 'SLA target not found'}), 404
+        
+        db.session.delete(target)
+        db.session.flush()
+        updated = reapply_targets(target.priority)
+        db.session.commit()
+        
+        return jsonify({'message': 'SLA target deleted', 'tickets_updated': updated}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/outbox', methods=['GET'])
+@token_required
+@agent_or_admin_required
+def get_outbox(current_user):
+    """Outbox events after a cursor, oldest first (e.g. ?topic=sla.breached&after_id=123)"""
+    try:
+        after_id = request.args.get('after_id', 0, type=int)
+        limit = min(request.args.get('limit', 100, type=int), 1000)
+        topic = request.args.get('topic')
+        
+        query = OutboxEvent.query.filter(OutboxEvent.id > after_id)
+        if topic:
+            query = query.filter(OutboxEvent.topic == topic)
+        events = query.order_by(OutboxEvent.id).limit(limit).all()
+        
+        return jsonify({
+            'events': [event.to_dict() for event in events],
+            'next_after_id': events[-1].id if events else after_id
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Background Jobs
+@admin_bp.route('/admin/jobs', methods=['GET'])
+@token_required
+@admin_required
+def get_jobs(current_user):
+    """Queue depth and age, counts per job and status, and the latest jobs (?status=, ?name=)"""
+    try:
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        query = Job.query
+        if request.args.get('status'):
+            query = query.filter(Job.status == request.args['status'])
+        if request.args.get('name'):
+            query = query.filter(Job.name == request.args['name'])
+        jobs = query.order_by(Job.id.desc()).limit(limit).all()
+        
+        return jsonify(dict(queue_stats(), jobs=[job.to_dict() for job in jobs])), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/jobs', methods=['POST'])
+@token_required
+@admin_required
+def create_job(current_user):
+    """Enqueue a registered job, e.g. {"name": "analytics.refresh_forecast", "delay": 0}"""
+    try:
+        data = request.get_json() or {}
+        if data.get('name') not in TASKS:
+            return jsonify({'error': f'Unknown job; registered: {", ".join(sorted(TASKS))}'}), 400
+        
+        job = enqueue(data['name'], data.get('payload'), delay=float(data.get('delay', 0)))
+        db.session.commit()
+        return jsonify({'message': 'Job queued', 'job': job.to_dict()}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/jobs/<int:job_id>/retry', methods=['POST'])
+@token_required
+@admin_required
+def retry_job(current_user, job_id):
+    """Queue a failed job again with a fresh set of attempts"""
+    try:
+        job = Job.query.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        if job.status != 'failed':
+            return jsonify({'error': 'Only failed jobs can be retried'}), 400
+        
+        job.status = 'queued'
+        job.attempts = 0
+        job.run_at = datetime.utcnow()
+        job.finished_at = None
+        db.session.commit()
+        return jsonify({'message': 'Job queued', 'job': job.to_dict()}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Department Management
 @admin_bp.route('/admin/departments', methods=['GET'])
 @token_required
@@ -223,7 +442,7 @@ def get_floors(current_user):
 def get_users(current_user):
     """Get all users"""
     try:
-        users = User.query.all()
+        users = User.query.options(db.joinedload(User.department)).all()
         return jsonify({
             'users': [user.to_dict() for user in users]
         }), 200
@@ -247,7 +466,7 @@ def create_user(current_user):
             return jsonify({'error': 'Username already exists'}), 400
         
         # Generate random password if not provided
-        password = data.get('password') or ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(8))
+        password = data.get('password') or generate_password()
         
         user = User(
             username=data['username'],
@@ -260,6 +479,7 @@ def create_user(current_user):
         
         db.session.add(user)
         db.session.commit()
+        assignment_engine.invalidate()
         
         return jsonify({
             'message': 'User created successfully',
@@ -271,6 +491,45 @@ def create_user(current_user):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/admin/users/import', methods=['POST'])
+@token_required
+@admin_required
+def import_users_endpoint(current_user):
+    """Bulk-create users from a CSV (with header) or NDJSON upload"""
+    try:
+        upload = request.files.get('file')
+        if upload:
+            body = upload.read()
+            is_json = upload.filename.lower().endswith(('.ndjson', '.jsonl', '.json'))
+            content_type = 'application/x-ndjson' if is_json else 'text/csv'
+        else:
+            body = request.get_data()
+            content_type = request.content_type
+        
+        if not body:
+            return jsonify({'error': 'CSV or NDJSON body is required'}), 400
+        
+        try:
+            rows = parse_rows(body, content_type)
+        except (ValueError, UnicodeDecodeError) as e:
+            return jsonify({'error': f'Could not parse import: {e}'}), 400
+        
+        created, report = import_users(rows)
+        assignment_engine.invalidate()
+        
+        return jsonify({
+            'message': f'Imported {created} of {len(rows)} users',
+            'created': created,
+            'failed': len(rows) - created,
+            'results': report
+        }), 200 if created == len(rows) else 207
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @admin_bp.route('/admin/users/<int:user_id>/reset-password', methods=['POST'])
 @token_required
 @admin_required
@@ -282,11 +541,13 @@ def reset_user_password(current_user, user_id):
             return jsonify({'error': 'User not found'}), 404
         
         # Generate new random password
-        new_password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(8))
+        new_password = generate_password()
         user.set_password(new_password)
         user.must_change_password = True
         
         db.session.commit()
+        invalidate_principal(user.id)
+        revocation_list.revoke_user_tokens(user.id)
         
         return jsonify({
             'message': 'Password reset successfully',
@@ -1,11 +1,18 @@
 from flask import Blueprint, request, jsonify
 from services.ai_agent import AIAgent
+from services.ticket_search import get_ticket_index
+from services.rate_limit import rate_limit
+from services.auth import current_principal
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 ai_bp = Blueprint('ai', __name__)
 ai_agent = AIAgent()
 
 @ai_bp.route('/ai/chat', methods=['POST'])
+@rate_limit('ai_chat')
 def ai_chat():
     """AI agent chat endpoint"""
     try:
@@ -15,14 +22,28 @@ def ai_chat():
         if not user_message:
             return jsonify({'error': 'Message is required'}), 400
         
+        # Look up similar resolved tickets (used as LLM context or offline answer)
+        try:
+            similar_tickets = get_ticket_index().search(user_message, k=3)
+        except Exception as e:
+            logger.warning(f"Resolved-ticket search failed: {e}")
+            similar_tickets = []
+        
+        # Other users' tickets are only referenced for agents and admins
+        principal = current_principal()
+        staff = principal is not None and principal.has_permission('AGENT')
+        
         # Get AI response
-        response = ai_agent.get_response(user_message)
+        response = ai_agent.get_response(user_message, similar_tickets, share_context=staff)
         
-        return jsonify({
+        result = {
             'response': response,
             'timestamp': datetime.now().isoformat(),
             'suggested_actions': ai_agent.get_quick_fixes(user_message.lower())
-        }), 200
+        }
+        if staff:
+            result['related_tickets'] = [doc['ticket_id'] for doc, score in similar_tickets]
+        return jsonify(result), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
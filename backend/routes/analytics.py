@@ -0,0 +1,183 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+from database import db
+from models.building import Building
+from models.department import Department
+from services.auth import token_required, agent_or_admin_required
+from services.resolution_analytics import resolution_stats, GROUP_FIELDS, GRANULARITIES
+from services.volume_forecast import volume_series, volume_forecast, HORIZON_HOURS
+from services.ticket_heatmap import heatmap_cache
+from services.satisfaction_analytics import satisfaction_stats, GROUP_FIELDS as SATISFACTION_FIELDS
+
+analytics_bp = Blueprint('analytics', __name__)
+
+GROUP_ALIASES = {'building': 'building_id', 'department': 'department_id', 'assignee': 'assigned_to'}
+MAX_RANGE = {'hour': timedelta(days=62), 'day': timedelta(days=3 * 366), 'month': timedelta(days=10 * 366)}
+
+
+def _parse_range(default_days=30):
+    """from/to query parameters (ISO dates or datetimes); defaults to the last default_days"""
+    now = datetime.utcnow()
+    end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else now
+    start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=default_days)
+    if start >= end:
+        raise ValueError('from must be before to')
+    return start, end
+
+
+def _add_names(rows):
+    """Add building_name / department_name next to their ids"""
+    if any('building_id' in row for row in rows):
+        names = dict(db.session.query(Building.id, Building.name))
+        for row in rows:
+            if 'building_id' in row:
+                row['building_name'] = names.get(row['building_id'])
+    if any('department_id' in row for row in rows):
+        names = dict(db.session.query(Department.id, Department.name))
+        for row in rows:
+            if 'department_id' in row:
+                row['department_name'] = names.get(row['department_id'])
+    return rows
+
+
+def _parse_group_by(fields):
+    """group_by query parameter as model fields; raises ValueError for unknown names"""
+    group_by = []
+    for name in filter(None, (request.args.get('group_by') or '').split(',')):
+        field = GROUP_ALIASES.get(name.strip(), name.strip())
+        if field not in fields:
+            raise ValueError(f'Cannot group by {name}')
+        group_by.append(field)
+    return group_by
+
+
+@analytics_bp.route('/analytics/resolution-times', methods=['GET'])
+@token_required
+@agent_or_admin_required
+def get_resolution_times(current_user):
+    """MTTR and p50/p90/p99 resolution times for any slice of resolved tickets"""
+    try:
+        start, end = _parse_range()
+
+        group_by = _parse_group_by(GROUP_FIELDS)
+
+        interval = request.args.get('interval')
+        if interval and interval not in GRANULARITIES:
+            return jsonify({'error': 'interval must be hour, day or month'}), 400
+        if interval and end - start > MAX_RANGE[interval]:
+            return jsonify({'error': f'Range too long for {interval} interval'}), 400
+
+        filters = {}
+        for field in GROUP_FIELDS:
+            value = request.args.get(field)
+            if value:
+                filters[field] = int(value) if field.endswith('_id') else value
+
+        groups = resolution_stats(start, end, group_by=group_by, filters=filters, interval=interval)
+        return jsonify({
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'group_by': group_by,
+            'interval': interval,
+            'groups': _add_names(groups)
+        }), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/analytics/ticket-volume', methods=['GET'])
+@token_required
+@agent_or_admin_required
+def get_ticket_volume(current_user):
+    """Tickets created per building and hour or day, with a forecast of the coming hours"""
+    try:
+        start, end = _parse_range(default_days=7)
+        interval = request.args.get('interval', 'hour')
+        if interval not in ('hour', 'day'):
+            return jsonify({'error': 'interval must be hour or day'}), 400
+        if end - start > MAX_RANGE[interval]:
+            return jsonify({'error': f'Range too long for {interval} interval'}), 400
+        forecast_hours = request.args.get('forecast_hours', HORIZON_HOURS, type=int)
+        if not 0 <= forecast_hours <= HORIZON_HOURS:
+            return jsonify({'error': f'forecast_hours must be between 0 and {HORIZON_HOURS}'}), 400
+
+        buildings = Building.query.order_by(Building.id)
+        building_id = request.args.get('building_id', type=int)
+        if building_id:
+            buildings = buildings.filter(Building.id == building_id)
+        buildings = buildings.all()
+        building_ids = [building.id for building in buildings]
+
+        series = volume_series(start, end, building_ids, interval)
+        forecast = volume_forecast(building_ids, forecast_hours, interval) if forecast_hours and building_ids else {}
+        return jsonify({
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'interval': interval,
+            'buildings': [{
+                'building_id': building.id,
+                'building_name': building.name,
+                'series': [{'bucket_start': bucket.isoformat(), 'count': int(count)}
+                           for bucket, count in series[building.id]],
+                'forecast': [{'bucket_start': bucket.isoformat(), 'expected': round(expected, 2),
+                              'low': round(low, 2), 'high': round(high, 2)}
+                             for bucket, expected, low, high in forecast.get(building.id, [])]
+            } for building in buildings]
+        }), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/analytics/satisfaction', methods=['GET'])
+@token_required
+@agent_or_admin_required
+def get_satisfaction(current_user):
+    """Average rating, spread and rating histogram for any slice of rated tickets"""
+    try:
+        start, end = _parse_range()
+        group_by = _parse_group_by(SATISFACTION_FIELDS)
+
+        interval = request.args.get('interval')
+        if interval and interval not in ('day', 'month'):
+            return jsonify({'error': 'interval must be day or month'}), 400
+
+        filters = {}
+        for field in SATISFACTION_FIELDS:
+            value = request.args.get('assignee' if field == 'assigned_to' else field)
+            if value:
+                filters[field] = int(value) if field.endswith('_id') else value
+
+        groups = satisfaction_stats(start, end, group_by=group_by, filters=filters, interval=interval)
+        return jsonify({
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'group_by': group_by,
+            'interval': interval,
+            'groups': _add_names(groups)
+        }), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/analytics/heatmap', methods=['GET'])
+@token_required
+@agent_or_admin_required
+def get_heatmap(current_user):
+    """Open and recent ticket counts for every building x floor x issue type"""
+    try:
+        hours = request.args.get('hours', 24, type=int)
+        if not 1 <= hours <= 24 * 7:
+            return jsonify({'error': 'hours must be between 1 and 168'}), 400
+        return jsonify(heatmap_cache.get(hours)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
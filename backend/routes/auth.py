@@ -1,47 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from models.user import User
 from database import db
-import jwt
-import os
-from datetime import datetime, timedelta
-from functools import wraps
+from services.rate_limit import rate_limit
+from services.auth import token_required, invalidate_principal
+from services.token_revocation import revocation_list
 
 auth_bp = Blueprint('auth', __name__)
 
-def token_required(f):
-    """Decorator to require valid JWT token"""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
-        
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-        
-        try:
-            data = jwt.decode(token, os.getenv('JWT_SECRET_KEY', 'your-secret-key'), algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
-            if not current_user or not current_user.active:
-                return jsonify({'message': 'Invalid token'}), 401
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Invalid token'}), 401
-        
-        return f(current_user, *args, **kwargs)
-    return decorated
-
-def admin_required(f):
-    """Decorator to require ADMIN role"""
-    @wraps(f)
-    def decorated(current_user, *args, **kwargs):
-        if not current_user.has_permission('ADMIN'):
-            return jsonify({'message': 'Admin access required'}), 403
-        return f(current_user, *args, **kwargs)
-    return decorated
+def _login_username():
+    """Username from the login body, for the per-user rate limit"""
+    data = request.get_json(silent=True) or {}
+    username = data.get('username')
+    return username if isinstance(username, str) else None
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('login', user_key=_login_username)
 def login():
     """User login endpoint"""
     data = request.get_json()
@@ -65,7 +38,9 @@ def login():
         db.session.commit()
         return jsonify({'message': 'Invalid credentials'}), 401
     
-    # Successful login
+    # Successful login; upgrade the hash if the configured work factor changed
+    if user.password_needs_rehash():
+        user.set_password(data['password'])
     user.reset_failed_attempts()
     db.session.commit()
     
@@ -98,8 +73,15 @@ def change_password(current_user):
     current_user.set_password(new_password)
     current_user.must_change_password = False
     db.session.commit()
+    invalidate_principal(current_user.id)
+    
+    # Sign out every existing session and hand this client a fresh token
+    revocation_list.revoke_user_tokens(current_user.id)
     
-    return jsonify({'message': 'Password changed successfully'}), 200
+    return jsonify({
+        'message': 'Password changed successfully',
+        'token': current_user.generate_token()
+    }), 200
 
 @auth_bp.route('/me', methods=['GET'])
 @token_required
@@ -112,5 +94,6 @@ def get_current_user(current_user):
 @auth_bp.route('/logout', methods=['POST'])
 @token_required
 def logout(current_user):
-    """Logout endpoint (client should discard token)"""
+    """Logout endpoint - revokes the presented token"""
+    revocation_list.revoke_token(g.token_payload)
     return jsonify({'message': 'Logout successful'}), 200 
\ No newline at end of file
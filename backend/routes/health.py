@@ -1,5 +1,6 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, Response
 from services.ai_agent import AIAgent
+from services.metrics import REGISTRY
 import os
 import time
 from datetime import datetime
@@ -30,4 +31,13 @@ def ai_health_check():
             'latency_ms': 0,
             'timestamp': datetime.now().isoformat(),
             'note': 'AI is available with fallback responses'
-        }), 200 
\ No newline at end of file
+        }), 200
+
+@health_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Request and AI provider metrics in Prometheus text format"""
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
@@ -1,10 +1,21 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from datetime import datetime, timedelta
 from models.support_ticket import SupportTicket
 from models.building import Building
 from models.department import Department
 from models.floor import Floor
+from models.user import User
 from database import db
+from services.ticket_search import update_ticket_index, remove_from_ticket_index
+from services.triage import get_triage_model
+from services.resolution_analytics import resolution_sample, record_resolution_change
+from services.volume_forecast import record_ticket_created
+from services.satisfaction_analytics import rating_sample, record_rating_change
+from services.sla import OPEN_STATUSES, assign_due_at
+from services.assignment import assign, assignment_sample, auto_assign, record_assignment_change
+from services.duplicate_detector import (
+    get_duplicate_index, minhash_signature, update_duplicate_index, remove_from_duplicate_index
+)
 
 tickets_bp = Blueprint('tickets', __name__)
 
@@ -53,6 +64,16 @@ def create_ticket():
             else:
                 return jsonify({'error': f'Floor not found: {data["floor"]} in building {data["building"]}'}), 400
         
+        # Flag likely duplicates of open tickets in the same building and issue type
+        duplicate_index = get_duplicate_index()
+        signature = minhash_signature(data['description'])
+        duplicate = duplicate_index.find(building_id, data['issue_type'], data['description'], signature=signature)
+        
+        # Suggest priority and issue type; the suggestion is used when no priority was given
+        triage_model = get_triage_model()
+        suggestion = triage_model.suggest(data['issue_type'], data['description']) if triage_model else {}
+        priority = data.get('priority') or suggestion.get('priority') or 'medium'
+        
         # Create new ticket
         ticket = SupportTicket(
             building_id=building_id,
@@ -62,17 +83,34 @@ def create_ticket():
             description=data['description'],
             contact_person=data.get('contact_person', ''),
             phone_number=data.get('phone_number', ''),
-            priority=data.get('priority', 'medium')
+            priority=priority,
+            duplicate_of_id=duplicate[0] if duplicate else None,
+            suggested_priority=suggestion.get('priority'),
+            suggested_issue_type=suggestion.get('issue_type'),
+            created_at=datetime.utcnow()
         )
         
+        assign_due_at(ticket)
         db.session.add(ticket)
+        record_ticket_created(ticket)
+        auto_assign(ticket)
         db.session.commit()
+        duplicate_index.add(ticket.id, building_id, ticket.issue_type, ticket.description, signature=signature)
+        
+        notification = f'Ticket #{ticket.id} created successfully. You will be notified when status changes.'
+        if duplicate:
+            notification += f' A similar issue is already being tracked as ticket #{duplicate[0]}.'
         
         return jsonify({
             'message': 'Ticket created successfully',
             'ticket_id': ticket.id,
             'status': 'pending',
-            'notification': f'Ticket #{ticket.id} created successfully. You will be notified when status changes.'
+            'duplicate_of': duplicate[0] if duplicate else None,
+            'priority': priority,
+            'suggested_priority': suggestion.get('priority'),
+            'suggested_issue_type': suggestion.get('issue_type'),
+            'assigned_to': ticket.assigned_to,
+            'notification': notification
         }), 201
         
     except Exception as e:
@@ -90,7 +128,7 @@ def get_tickets():
         priority = request.args.get('priority')
         search = request.args.get('search')  # Search in description and contact person
         
-        query = SupportTicket.query
+        query = SupportTicket.with_names()
         
         if status:
             query = query.filter(SupportTicket.status == status)
@@ -146,7 +184,7 @@ def get_tickets():
 def get_ticket(ticket_id):
     """Get a specific ticket by ID"""
     try:
-        ticket = SupportTicket.query.get(ticket_id)
+        ticket = SupportTicket.with_names().filter(SupportTicket.id == ticket_id).first()
         if not ticket:
             return jsonify({'error': 'Ticket not found'}), 404
         
@@ -174,6 +212,8 @@ def update_ticket_status(ticket_id):
         if new_status not in valid_statuses:
             return jsonify({'error': 'Invalid status'}), 400
         
+        before = resolution_sample(ticket)
+        assignment_before = assignment_sample(ticket)
         ticket.status = new_status
         if notes:
             ticket.notes = notes
@@ -182,7 +222,11 @@ def update_ticket_status(ticket_id):
             ticket.resolved_at = datetime.utcnow()
         
         ticket.updated_at = datetime.utcnow()
+        record_resolution_change(before, ticket)
+        record_assignment_change(assignment_before, ticket)
         db.session.commit()
+        update_ticket_index(ticket)
+        update_duplicate_index(ticket)
         
         return jsonify({
             'message': 'Ticket status updated successfully',
@@ -207,8 +251,14 @@ def assign_ticket(ticket_id):
         if not assigned_to_id:
             return jsonify({'error': 'Assigned user ID is required'}), 400
         
-        ticket.assigned_to_id = assigned_to_id
+        user = User.query.get(assigned_to_id)
+        if not user or not user.active or user.role not in ('AGENT', 'ADMIN'):
+            return jsonify({'error': 'Assignee must be an active agent or admin'}), 400
+        
+        before = rating_sample(ticket)
+        assign(ticket, user)
         ticket.updated_at = datetime.utcnow()
+        record_rating_change(before, ticket)
         db.session.commit()
         
         return jsonify({
@@ -242,14 +292,26 @@ def get_dashboard():
         }
         
         # Get recent tickets
-        recent_tickets = SupportTicket.query.order_by(
+        recent_tickets = SupportTicket.with_names().order_by(
             SupportTicket.created_at.desc()
         ).limit(5).all()
         
+        # SLA: open tickets past or near their deadline (served by the status/due_at index)
+        now = datetime.utcnow()
+        open_tickets = SupportTicket.with_names().filter(SupportTicket.status.in_(OPEN_STATUSES))
+        overdue = open_tickets.filter(SupportTicket.due_at <= now)
+        sla = {
+            'breached': overdue.count(),
+            'due_within_hour': open_tickets.filter(SupportTicket.due_at > now,
+                                                   SupportTicket.due_at <= now + timedelta(hours=1)).count(),
+            'most_overdue': [ticket.to_dict() for ticket in overdue.order_by(SupportTicket.due_at).limit(5)]
+        }
+        
         return jsonify({
             'status_counts': status_counts,
             'priority_counts': priority_counts,
             'recent_tickets': [ticket.to_dict() for ticket in recent_tickets],
+            'sla': sla,
             'total_tickets': sum(status_counts.values())
         }), 200
         
@@ -264,8 +326,17 @@ def delete_ticket(ticket_id):
         if not ticket:
             return jsonify({'error': 'Ticket not found'}), 404
         
+        record_resolution_change(resolution_sample(ticket), None)
+        record_ticket_created(ticket, -1)
+        record_rating_change(rating_sample(ticket), None)
+        record_assignment_change(assignment_sample(ticket), None)
+        # Tickets flagged as duplicates of this one lose the link instead of pointing at nothing
+        SupportTicket.query.filter(SupportTicket.duplicate_of_id == ticket_id).update(
+            {'duplicate_of_id': None}, synchronize_session=False)
         db.session.delete(ticket)
         db.session.commit()
+        remove_from_ticket_index(ticket_id)
+        remove_from_duplicate_index(ticket_id)
         
         return jsonify({
             'message': 'Ticket deleted successfully',
@@ -296,10 +367,12 @@ def rate_ticket(ticket_id):
             return jsonify({'error': 'Rating must be between 1 and 5'}), 400
         
         # Update ticket with rating
+        before = rating_sample(ticket)
         ticket.rating = rating
         ticket.rating_comment = comment
         ticket.rated_at = datetime.utcnow()
         
+        record_rating_change(before, ticket)
         db.session.commit()
         
         return jsonify({
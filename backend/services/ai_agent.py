@@ -3,12 +3,24 @@ import re
 import logging
 import time
 from dotenv import load_dotenv
+from services.intent_matcher import get_intent_matcher
+from services.metrics import AI_PROVIDER_CALLS, AI_PROVIDER_LATENCY, AI_RESPONSES
 
 # Load environment variables
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Markdown patterns stripped from provider responses
+MARKDOWN_PATTERNS = [
+    (re.compile(r'\*\*(.*?)\*\*'), r'\1'),      # Remove **bold**
+    (re.compile(r'\*(.*?)\*'), r'\1'),          # Remove *italic*
+    (re.compile(r'`(.*?)`'), r'\1'),            # Remove `code`
+    (re.compile(r'#+\s*'), ''),                 # Remove headers
+    (re.compile(r'\[(.*?)\]\(.*?\)'), r'\1'),    # Remove links
+]
+BLANK_LINES_PATTERN = re.compile(r'\n\s*\n')
+
 class AIAgent:
     def __init__(self):
         # Initialize API keys
@@ -47,15 +59,15 @@ A: "Let's fix your WiFi connection:
 Q: "What's your name?"
 A: "Hi! I'm GPO, your friendly ICT helper. How can I assist you today?"""
 
-        # Fallback responses
-        self.fallback_responses = {
-            'wifi': "For WiFi issues, try these steps:\n1. Restart your device\n2. Forget and reconnect to 'Teleposta_Guest'\n3. Move closer to the access point\n4. Contact ICT team if issues persist",
-            'printer': "For printer problems:\n1. Check if printer is powered on\n2. Ensure paper is loaded\n3. Restart the printer\n4. Contact ICT team for driver issues",
-            'projector': "For projector setup:\n1. Connect VGA/HDMI cable to laptop\n2. Press Windows + P to extend display\n3. Check projector power and input source\n4. Contact ICT team for assistance",
-            'computer': "For computer issues:\n1. Restart the computer\n2. Check all cables are connected\n3. Try a different power outlet\n4. Contact ICT team for hardware issues",
-            'email': "For email problems:\n1. Check your internet connection\n2. Clear browser cache and cookies\n3. Try a different browser\n4. Contact ICT team for account issues",
-            'software': "For software issues:\n1. Restart the application\n2. Check for updates\n3. Restart your computer\n4. Contact ICT team for installation help"
-        }
+        # Minimum BM25 score for a resolved ticket to be quoted as an offline answer
+        self.retrieval_min_score = float(os.getenv('AI_RETRIEVAL_MIN_SCORE', '1.0'))
+        
+        # Resolution notes of past tickets are only sent to external providers when opted in
+        self.share_ticket_context = os.getenv('AI_TICKET_CONTEXT', 'false').lower() in ('1', 'true', 'yes', 'on')
+        
+        # Keyword matcher for fallback responses and quick fixes (built once per process)
+        self.intent_matcher = get_intent_matcher()
+        self.fallback_responses = self.intent_matcher.responses
         
         # Initialize providers
         self._init_providers()
@@ -114,38 +126,18 @@ A: "Hi! I'm GPO, your friendly ICT helper. How can I assist you today?"""
             return text
         
         # Remove markdown formatting
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Remove **bold**
-        text = re.sub(r'\*(.*?)\*', r'\1', text)      # Remove *italic*
-        text = re.sub(r'`(.*?)`', r'\1', text)        # Remove `code`
-        text = re.sub(r'#+\s*', '', text)             # Remove headers
-        text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)  # Remove links
+        for pattern, replacement in MARKDOWN_PATTERNS:
+            text = pattern.sub(replacement, text)
         
         # Clean up whitespace
-        text = re.sub(r'\n\s*\n', '\n\n', text)
+        text = BLANK_LINES_PATTERN.sub('\n\n', text)
         text = text.strip()
         
         return text
     
     def get_fallback_response(self, user_message):
         """Get a fallback response based on keywords"""
-        message_lower = user_message.lower()
-        
-        if any(word in message_lower for word in ['wifi', 'internet', 'connection', 'network']):
-            return self.fallback_responses['wifi']
-        elif any(word in message_lower for word in ['printer', 'print', 'printing']):
-            return self.fallback_responses['printer']
-        elif any(word in message_lower for word in ['projector', 'display', 'screen', 'presentation']):
-            return self.fallback_responses['projector']
-        elif any(word in message_lower for word in ['computer', 'pc', 'laptop', 'desktop']):
-            return self.fallback_responses['computer']
-        elif any(word in message_lower for word in ['email', 'mail', 'outlook']):
-            return self.fallback_responses['email']
-        elif any(word in message_lower for word in ['software', 'program', 'application', 'app']):
-            return self.fallback_responses['software']
-        elif any(word in message_lower for word in ['name', 'who are you', 'hello', 'hi']):
-            return "Hi! I'm GPO, your friendly ICT helper. How can I assist you today?"
-        else:
-            return "I'm here to help with your ICT issues! Please provide more details about your problem, or contact the ICT team directly for immediate assistance."
+        return self.intent_matcher.get_response(user_message)
     
     def _try_deepseek(self, user_message):
         """Try DeepSeek API"""
@@ -241,57 +233,76 @@ A: "Hi! I'm GPO, your friendly ICT helper. How can I assist you today?"""
         
         return None
     
-    def get_response(self, user_message):
-        """Get AI response with fallback chain"""
-        logger.info(f"Processing user message: {user_message[:50]}...")
+    def _with_ticket_context(self, user_message, similar_tickets):
+        """Append resolution notes from similar past tickets to the user message
+
+        Only the issue type and the fix are sent, never the reporter's description.
+        """
+        if not similar_tickets:
+            return user_message
         
-        # Try DeepSeek first (Primary)
-        response = self._try_deepseek(user_message)
-        if response:
-            return response
+        context = "\n".join(
+            f"- {doc['issue_type']}: {doc['notes'][:300]}"
+            for doc, score in similar_tickets
+        )
+        return f"{user_message}\n\n(Similar issues resolved by the ICT team before:\n{context})"
+    
+    def get_ticket_answer(self, similar_tickets):
+        """Build an offline answer from the notes of similar resolved tickets"""
+        relevant = [doc for doc, score in (similar_tickets or []) if score >= self.retrieval_min_score]
+        if not relevant:
+            return None
         
-        # Try OpenAI second (Secondary)
-        response = self._try_openai(user_message)
-        if response:
-            return response
+        steps = "\n".join(f"{i}. {doc['notes'].strip()}" for i, doc in enumerate(relevant, 1))
+        return (
+            f"Here's what fixed similar issues reported before:\n{steps}\n\n"
+            "If this doesn't help, I can help you create a support ticket."
+        )
+    
+    def _call_provider(self, provider, client, attempt, message):
+        """Call one provider, recording its latency and outcome"""
+        start = time.perf_counter()
+        response = attempt(message)
+        if not response and client is None:
+            return None  # Not configured; nothing was called
+        AI_PROVIDER_CALLS.inc(provider=provider, outcome='success' if response else 'failure')
+        AI_PROVIDER_LATENCY.observe(time.perf_counter() - start, provider=provider)
+        return response
+    
+    def get_response(self, user_message, similar_tickets=None, share_context=False):
+        """Get AI response with fallback chain
+
+        similar_tickets are passed to the providers only when share_context is
+        set (an authenticated agent or admin asked) and AI_TICKET_CONTEXT is on;
+        otherwise they are used only for the offline answer.
+        """
+        logger.info(f"Processing user message: {user_message[:50]}...")
+        provider_message = user_message
+        if share_context and self.share_ticket_context:
+            provider_message = self._with_ticket_context(user_message, similar_tickets)
         
-        # Try Gemini third (Tertiary)
-        response = self._try_gemini(user_message)
+        # DeepSeek first (Primary), then OpenAI (Secondary), then Gemini (Tertiary)
+        for provider, client, attempt in (
+            ('deepseek', self.deepseek_client, self._try_deepseek),
+            ('openai', self.openai_client, self._try_openai),
+            ('gemini', self.gemini_model, self._try_gemini),
+        ):
+            response = self._call_provider(provider, client, attempt, provider_message)
+            if response:
+                AI_RESPONSES.inc(source=provider)
+                return response
+        
+        # Answer from resolved tickets, then canned fallback
+        response = self.get_ticket_answer(similar_tickets)
         if response:
+            logger.info("All AI providers failed, answering from resolved tickets")
+            AI_RESPONSES.inc(source='tickets')
             return response
         
-        # Use fallback response
         logger.info("All AI providers failed, using fallback response")
+        AI_RESPONSES.inc(source='fallback')
         return self.get_fallback_response(user_message)
     
     def get_quick_fixes(self, issue_type):
         """Get quick fixes for common issues"""
-        quick_fixes = {
-            'wifi': [
-                "1. Check if WiFi is enabled on your device",
-                "2. Try connecting to 'Teleposta_Guest' network",
-                "3. Restart your device",
-                "4. Contact ICT team if issues persist"
-            ],
-            'printer': [
-                "1. Check if printer is powered on",
-                "2. Ensure paper is loaded",
-                "3. Check for paper jams",
-                "4. Restart the printer",
-                "5. Contact ICT team for driver issues"
-            ],
-            'projector': [
-                "1. Connect VGA/HDMI cable to laptop",
-                "2. Press Windows + P to extend display",
-                "3. Check projector power and input source",
-                "4. Contact ICT team for setup assistance"
-            ],
-            'computer': [
-                "1. Restart the computer",
-                "2. Check all cables are connected",
-                "3. Try a different power outlet",
-                "4. Contact ICT team for hardware issues"
-            ]
-        }
-        
-        return quick_fixes.get(issue_type.lower(), ["Please contact the ICT team for assistance."])
+        return self.intent_matcher.get_quick_fixes(issue_type)
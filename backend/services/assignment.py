@@ -0,0 +1,206 @@
+import os
+import time
+import heapq
+import logging
+import itertools
+import threading
+from collections import namedtuple
+from sqlalchemy import case, event, func, select, update
+from sqlalchemy.orm import Session
+from database import db
+from models.user import User
+from models.support_ticket import SupportTicket
+from services.jobs import periodic
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('pending', 'in_progress')
+PRIORITY_WEIGHTS = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 5}
+
+AssignmentSample = namedtuple('AssignmentSample', ('agent_id', 'weight'))
+Agent = namedtuple('Agent', ('id', 'username', 'department_id'))
+
+# session.info keys: load changes waiting for commit, and whether a sync read them uncommitted
+PENDING_ADJUSTMENTS = 'assignment_adjustments'
+SYNCED_UNCOMMITTED = 'assignment_synced_uncommitted'
+
+
+def resync_seconds():
+    """How stale this process's view of agent loads may get (ASSIGNMENT_RESYNC_SECONDS)"""
+    return float(os.getenv('ASSIGNMENT_RESYNC_SECONDS', 30))
+
+
+def ticket_weight(ticket):
+    return PRIORITY_WEIGHTS.get(ticket.priority, PRIORITY_WEIGHTS['medium'])
+
+
+def assignment_sample(ticket):
+    """What a ticket adds to its assignee's load, or None if it is closed or unassigned"""
+    if ticket is None or ticket.status not in OPEN_STATUSES or not ticket.assigned_to_id:
+        return None
+    return AssignmentSample(ticket.assigned_to_id, ticket_weight(ticket))
+
+
+class AssignmentEngine:
+    """Least-loaded agent per department, from one min-heap per department
+
+    users.assignment_load is the authoritative load, changed only by atomic
+    increments in the same transaction as the ticket; the in-memory copy
+    follows once that transaction commits. Each process keeps the
+    loads in memory with a heap per department of (load, sequence, agent id);
+    entries are pushed on every change and stale ones dropped when they reach
+    the top, so picking and updating are O(log agents). Equal loads go to the
+    agent whose load changed longest ago. The in-memory view is reloaded from
+    the database every ASSIGNMENT_RESYNC_SECONDS to pick up other workers'
+    changes and new or deactivated agents.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._agents = {}   # agent id -> Agent
+        self._loads = {}    # agent id -> (load, sequence)
+        self._heaps = {}    # department id -> heap of (load, sequence, agent id)
+        self._sequence = itertools.count()
+        self._synced_at = 0.0
+
+    def sync(self):
+        """Reload active agents and their loads from the database"""
+        rows = db.session.query(User.id, User.username, User.department_id, User.assignment_load).filter(
+            User.role == 'AGENT', User.active.is_(True), User.department_id.isnot(None)
+        ).order_by(User.id).all()
+        # The rows already include this session's uncommitted load changes
+        if db.session.info.pop(PENDING_ADJUSTMENTS, None):
+            db.session.info[SYNCED_UNCOMMITTED] = True
+        with self._lock:
+            self._agents = {row.id: Agent(row.id, row.username, row.department_id) for row in rows}
+            self._loads = {row.id: (row.assignment_load or 0, next(self._sequence)) for row in rows}
+            self._heaps = {}
+            for agent_id, (load, sequence) in self._loads.items():
+                self._heaps.setdefault(self._agents[agent_id].department_id, []).append((load, sequence, agent_id))
+            for heap in self._heaps.values():
+                heapq.heapify(heap)
+            self._synced_at = time.time()
+
+    def invalidate(self):
+        """Reload on next use, e.g. after agents were added or changed"""
+        self._synced_at = 0.0
+
+    def _ensure_synced(self):
+        if time.time() - self._synced_at >= resync_seconds():
+            self.sync()
+
+    def pick(self, department_id):
+        """The least-loaded active agent in a department, or None"""
+        self._ensure_synced()
+        with self._lock:
+            heap = self._heaps.get(department_id)
+            while heap:
+                load, sequence, agent_id = heap[0]
+                if self._loads.get(agent_id) == (load, sequence):
+                    return self._agents[agent_id]
+                heapq.heappop(heap)  # Superseded by a newer entry
+            return None
+
+    def adjust(self, agent_id, delta):
+        """Record a load change for an agent in this process"""
+        with self._lock:
+            agent = self._agents.get(agent_id)
+            if agent is None:
+                return
+            entry = (self._loads[agent_id][0] + delta, next(self._sequence))
+            self._loads[agent_id] = entry
+            heap = self._heaps[agent.department_id]
+            heapq.heappush(heap, entry + (agent_id,))
+            if len(heap) > 4 * len(self._agents) + 16:
+                self._heaps[agent.department_id] = [
+                    self._loads[i] + (i,) for i in self._agents if self._agents[i].department_id == agent.department_id
+                ]
+                heapq.heapify(self._heaps[agent.department_id])
+
+    def loads(self):
+        with self._lock:
+            return {agent_id: load for agent_id, (load, _) in self._loads.items()}
+
+
+assignment_engine = AssignmentEngine()
+
+
+def _change_load(agent_id, delta):
+    db.session.execute(
+        update(User).where(User.id == agent_id)
+        .values(assignment_load=User.assignment_load + delta)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.info.setdefault(PENDING_ADJUSTMENTS, []).append((agent_id, delta))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_adjustments(session):
+    session.info.pop(SYNCED_UNCOMMITTED, None)
+    for agent_id, delta in session.info.pop(PENDING_ADJUSTMENTS, ()):
+        assignment_engine.adjust(agent_id, delta)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_adjustments(session, previous_transaction):
+    session.info.pop(PENDING_ADJUSTMENTS, None)
+    if session.info.pop(SYNCED_UNCOMMITTED, False):
+        assignment_engine.invalidate()
+
+
+def record_assignment_change(before, ticket):
+    """Update agent loads for a ticket change; call before committing it
+
+    The in-memory loads change when the transaction commits and not at all if
+    it rolls back.
+
+    before is assignment_sample(ticket) taken before the change (pass
+    ticket=None for a deletion).
+    """
+    after = assignment_sample(ticket)
+    if before == after:
+        return
+    if before:
+        _change_load(before.agent_id, -before.weight)
+    if after:
+        _change_load(after.agent_id, after.weight)
+
+
+def assign(ticket, agent):
+    """Assign a ticket to a user (or unassign with None) and update loads; call before committing"""
+    before = assignment_sample(ticket)
+    ticket.assigned_to_id = agent.id if agent else None
+    ticket.assigned_to = agent.username if agent else None
+    record_assignment_change(before, ticket)
+
+
+def auto_assign(ticket):
+    """Assign a new ticket to the least-loaded agent in its department; returns the agent or None"""
+    agent = assignment_engine.pick(ticket.department_id)
+    if agent is not None:
+        assign(ticket, agent)
+    return agent
+
+
+@periodic('assignment.recount', every=3600)
+def recount_loads():
+    """Recompute every user's load from the open tickets (repairs drift from direct database edits)
+
+    One correlated UPDATE, so it is atomic with respect to concurrent assignments.
+    """
+    weight = case(*[(SupportTicket.priority == p, w) for p, w in PRIORITY_WEIGHTS.items()],
+                  else_=PRIORITY_WEIGHTS['medium'])
+    actual = func.coalesce(
+        select(func.sum(weight))
+        .where(SupportTicket.assigned_to_id == User.id, SupportTicket.status.in_(OPEN_STATUSES))
+        .scalar_subquery(), 0)
+    changed = db.session.execute(
+        update(User).where(User.assignment_load != actual)
+        .values(assignment_load=actual)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    assignment_engine.invalidate()
+    if changed:
+        logger.warning(f"Assignment loads corrected for {changed} users")
+    return changed
@@ -0,0 +1,198 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+import jwt
+from flask import request, jsonify, g
+from database import db
+from models.user import ROLE_HIERARCHY, User
+from services.token_revocation import revocation_list
+
+PRINCIPAL_TTL = float(os.getenv('AUTH_CACHE_TTL', '30'))
+TOKEN_CACHE_SIZE = 10000
+
+
+class Principal:
+    """Cached identity of an authenticated user
+
+    Holds what authorization needs (id, role, active flag, department). Any other
+    attribute (to_dict, check_password, ...) transparently loads the User row, so
+    views can keep treating current_user as a User. Attribute writes go to the
+    User row too (the cached identity fields are updated as well).
+    """
+
+    FIELDS = ('id', 'username', 'role', 'active', 'department_id')
+
+    def __init__(self, id, username, role, active, department_id):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.active = active
+        self.department_id = department_id
+        self._user = None
+
+    def has_permission(self, required_role):
+        """Check if user has required role permission"""
+        return required_role in ROLE_HIERARCHY.get(self.role, [])
+
+    @property
+    def user(self):
+        """The full User row, loaded on first use"""
+        if self._user is None:
+            self._user = User.query.get(self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __setattr__(self, name, value):
+        if name == '_user' or name in self.FIELDS:
+            object.__setattr__(self, name, value)
+            if '_user' not in self.__dict__ or name == '_user':
+                return  # Still in __init__
+        setattr(self.user, name, value)
+
+
+class _TTLCache:
+    """Small thread-safe LRU cache with per-entry expiry"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_token_cache = _TTLCache(TOKEN_CACHE_SIZE)      # sha256(token) -> decoded payload
+_principal_cache = _TTLCache(TOKEN_CACHE_SIZE)  # user id -> Principal fields
+
+
+def jwt_secret():
+    return os.getenv('JWT_SECRET_KEY', 'your-secret-key')
+
+
+def decode_token(token):
+    """Decode and verify a JWT, caching the payload until the token expires"""
+    key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    payload = _token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(token, jwt_secret(), algorithms=['HS256'])
+        _token_cache.set(key, payload, payload.get('exp', time.time() + PRINCIPAL_TTL))
+    return payload
+
+
+def get_principal(user_id):
+    """Return the Principal for a user id, from cache or one narrow query"""
+    fields = _principal_cache.get(user_id)
+    if fields is None:
+        row = db.session.query(
+            User.id, User.username, User.role, User.active, User.department_id
+        ).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        fields = tuple(row)
+        _principal_cache.set(user_id, fields, time.time() + PRINCIPAL_TTL)
+    return Principal(*fields)
+
+
+def invalidate_principal(user_id):
+    """Drop a cached principal after its user's role, department or status changes"""
+    _principal_cache.pop(user_id)
+
+
+def _bearer_token():
+    header = request.headers.get('Authorization', '')
+    parts = header.split(' ')
+    if len(parts) == 2 and parts[0].lower() == 'bearer':
+        return parts[1]
+    return None
+
+
+def current_principal():
+    """Principal for the request's bearer token, or None if it is missing or invalid"""
+    token = _bearer_token()
+    if not token:
+        return None
+    try:
+        data = decode_token(token)
+        if revocation_list.is_revoked(data):
+            return None
+        principal = get_principal(data['user_id'])
+    except (jwt.InvalidTokenError, KeyError):
+        return None
+    return principal if principal and principal.active else None
+
+
+def token_required(f):
+    """Decorator to require valid JWT token"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = _bearer_token()
+        if not token:
+            return jsonify({'message': 'Token is missing'}), 401
+
+        try:
+            data = decode_token(token)
+            if revocation_list.is_revoked(data):
+                return jsonify({'message': 'Token has been revoked'}), 401
+            current_user = get_principal(data['user_id'])
+            if not current_user or not current_user.active:
+                return jsonify({'message': 'Invalid token'}), 401
+        except jwt.ExpiredSignatureError:
+            return jsonify({'message': 'Token has expired'}), 401
+        except (jwt.InvalidTokenError, KeyError):
+            return jsonify({'message': 'Invalid token'}), 401
+
+        g.token_payload = data
+        return f(current_user, *args, **kwargs)
+    return decorated
+
+
+def admin_required(f):
+    """Decorator to require ADMIN role"""
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        if not current_user.has_permission('ADMIN'):
+            return jsonify({'message': 'Admin access required'}), 403
+        return f(current_user, *args, **kwargs)
+    return decorated
+
+
+def agent_or_admin_required(f):
+    """Decorator to require agent or admin role"""
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        if not current_user.has_permission('ADMIN') and not current_user.has_permission('AGENT'):
+            return jsonify({'message': 'Agent or admin access required'}), 403
+        return f(current_user, *args, **kwargs)
+    return decorated
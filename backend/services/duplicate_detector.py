@@ -0,0 +1,187 @@
+import os
+import time
+import zlib
+import logging
+import threading
+import numpy as np
+from database import db
+from models.support_ticket import SupportTicket
+from models.index_generation import IndexGeneration
+from services.intent_matcher import tokenize
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('pending', 'in_progress')
+GENERATION_NAME = 'duplicates'
+
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 64
+BANDS = 16                      # 16 bands x 4 rows: candidates from ~50% similarity
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+MERSENNE_PRIME = (1 << 31) - 1
+
+# Fixed seed so every worker produces identical signatures
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def minhash_signature(text):
+    """MinHash signature of the text's character shingles, or None if too short"""
+    normalized = ' '.join(tokenize(text))
+    if len(normalized) < SHINGLE_SIZE:
+        return None
+
+    shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    permuted = (hashes[:, None] * _PERM_A + _PERM_B) % MERSENNE_PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def generation_check_seconds():
+    """How often a worker checks whether its index was asked to rebuild (DUPLICATE_GENERATION_CHECK_SECONDS)"""
+    return float(os.getenv('DUPLICATE_GENERATION_CHECK_SECONDS', 10))
+
+
+def partition_key(building_id, issue_type):
+    """Tickets are only compared within the same building and issue type"""
+    return (building_id, (issue_type or '').strip().lower())
+
+
+class DuplicateIndex:
+    """MinHash/LSH index of open tickets, partitioned by building and issue type"""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold if threshold is not None else float(os.getenv('DUPLICATE_THRESHOLD', '0.6'))
+        self._lock = threading.Lock()
+        self.signatures = {}    # ticket id -> (partition, signature)
+        self.buckets = {}       # (partition, band, band bytes) -> set of ticket ids
+
+    def __len__(self):
+        return len(self.signatures)
+
+    @staticmethod
+    def _band_keys(partition, signature):
+        for band in range(BANDS):
+            chunk = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+            yield (partition, band, chunk.tobytes())
+
+    def add(self, ticket_id, building_id, issue_type, description, signature=None):
+        """Index an open ticket"""
+        signature = signature if signature is not None else minhash_signature(description)
+        if signature is None:
+            return
+        partition = partition_key(building_id, issue_type)
+        with self._lock:
+            self._discard(ticket_id)
+            self.signatures[ticket_id] = (partition, signature)
+            for key in self._band_keys(partition, signature):
+                self.buckets.setdefault(key, set()).add(ticket_id)
+
+    def add_ticket(self, ticket):
+        """Index a SupportTicket model instance"""
+        self.add(ticket.id, ticket.building_id, ticket.issue_type, ticket.description)
+
+    def remove(self, ticket_id):
+        """Drop a ticket that is no longer open"""
+        with self._lock:
+            self._discard(ticket_id)
+
+    def _discard(self, ticket_id):
+        entry = self.signatures.pop(ticket_id, None)
+        if entry is None:
+            return
+        partition, signature = entry
+        for key in self._band_keys(partition, signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(ticket_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def find(self, building_id, issue_type, description, signature=None, exclude_id=None):
+        """Return (ticket id, estimated similarity) of the closest open duplicate, or None"""
+        signature = signature if signature is not None else minhash_signature(description)
+        if signature is None:
+            return None
+        partition = partition_key(building_id, issue_type)
+
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(partition, signature):
+                candidates.update(self.buckets.get(key, ()))
+            candidates.discard(exclude_id)
+
+            best = None
+            for candidate in candidates:
+                similarity = float(np.mean(self.signatures[candidate][1] == signature))
+                # Prefer the oldest ticket on ties so duplicates link to the original
+                if similarity >= self.threshold and (best is None or (similarity, -candidate) > (best[1], -best[0])):
+                    best = (candidate, similarity)
+            return best
+
+    def build_from_db(self, batch_size=1000):
+        """Index every open ticket"""
+        query = db.session.query(
+            SupportTicket.id,
+            SupportTicket.building_id,
+            SupportTicket.issue_type,
+            SupportTicket.description
+        ).filter(SupportTicket.status.in_(OPEN_STATUSES)).order_by(SupportTicket.id).yield_per(batch_size)
+
+        for ticket_id, building_id, issue_type, description in query:
+            self.add(ticket_id, building_id, issue_type, description)
+        return self
+
+
+_index = None
+_index_generation = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_duplicate_index():
+    """Return the process-wide index, building it from the database on first use
+
+    The index is rebuilt when the stored generation (index_generations) has
+    moved since it was built, checked every DUPLICATE_GENERATION_CHECK_SECONDS,
+    so a rebuild requested in one worker reaches every worker.
+    """
+    global _index, _index_generation, _checked_at
+    if _index is not None and time.time() - _checked_at < generation_check_seconds():
+        return _index
+    with _index_lock:
+        if _index is None or time.time() - _checked_at >= generation_check_seconds():
+            generation = IndexGeneration.current(GENERATION_NAME)
+            if _index is None or generation != _index_generation:
+                _index = DuplicateIndex().build_from_db()
+                _index_generation = generation
+                logger.info(f"Duplicate index built with {len(_index)} open tickets (generation {generation})")
+            _checked_at = time.time()
+    return _index
+
+
+def rebuild_duplicate_index():
+    """Rebuild this worker's index now and have every other worker rebuild on its next check"""
+    global _index, _index_generation, _checked_at
+    generation = IndexGeneration.bump(GENERATION_NAME)
+    index = DuplicateIndex().build_from_db()
+    with _index_lock:
+        _index, _index_generation, _checked_at = index, generation, time.time()
+    return index
+
+
+def update_duplicate_index(ticket):
+    """Keep the index current when a ticket opens, closes or is reopened"""
+    if _index is None:
+        return
+    if ticket.status in OPEN_STATUSES:
+        _index.add_ticket(ticket)
+    else:
+        _index.remove(ticket.id)
+
+
+def remove_from_duplicate_index(ticket_id):
+    """Drop a deleted ticket from the index"""
+    if _index is not None:
+        _index.remove(ticket_id)
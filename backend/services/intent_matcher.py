@@ -0,0 +1,122 @@
+import os
+import re
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KNOWLEDGE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'knowledge.json')
+
+# Words are matched on token boundaries, so 'hi' no longer matches inside 'this'
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class IntentMatcher:
+    """Weighted keyword/phrase index over the intents in the knowledge file
+
+    A message is tokenized once and matched against the whole keyword set with a
+    single set intersection, so the cost barely grows with the number of intents.
+    """
+
+    def __init__(self, knowledge):
+        self.default_response = knowledge.get('default_response', '')
+        self.default_quick_fixes = knowledge.get('default_quick_fixes', [])
+
+        self.intents = []          # intent ids in file order (used to break ties)
+        self.responses = {}        # intent id -> canned response
+        self.quick_fixes = {}      # intent id -> list of quick fix steps
+        self.term_weights = {}     # keyword or phrase -> [(intent position, weight)]
+
+        for position, intent in enumerate(knowledge.get('intents', [])):
+            intent_id = intent['id']
+            self.intents.append(intent_id)
+            self.responses[intent_id] = intent.get('response', self.default_response)
+            if intent.get('quick_fixes'):
+                self.quick_fixes[intent_id] = intent['quick_fixes']
+
+            terms = dict(intent.get('keywords', {}))
+            terms.update(intent.get('phrases', {}))
+            for term, weight in terms.items():
+                term = ' '.join(tokenize(term))
+                if term:
+                    self.term_weights.setdefault(term, []).append((position, weight))
+
+        # Single-word terms are looked up by set intersection; phrases are only
+        # checked when their first word appears in the message
+        self.keywords = frozenset(term for term in self.term_weights if ' ' not in term)
+        self.phrases_by_first_word = {}
+        for term in self.term_weights:
+            if ' ' in term:
+                self.phrases_by_first_word.setdefault(term.split(' ', 1)[0], []).append(term)
+
+    @classmethod
+    def from_file(cls, path=None):
+        """Build a matcher from a JSON knowledge file"""
+        path = path or os.getenv('AI_KNOWLEDGE_FILE', DEFAULT_KNOWLEDGE_FILE)
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def score(self, text):
+        """Return {intent position: score} for every intent hit by the text"""
+        scores = {}
+        tokens = tokenize(text)
+        if not tokens:
+            return scores
+
+        term_weights = self.term_weights
+        hits = list(self.keywords.intersection(tokens))
+
+        phrase_starts = self.phrases_by_first_word.keys() & set(tokens)
+        if phrase_starts:
+            padded = f" {' '.join(tokens)} "
+            for first_word in phrase_starts:
+                hits.extend(phrase for phrase in self.phrases_by_first_word[first_word] if f' {phrase} ' in padded)
+
+        for term in hits:
+            for position, weight in term_weights[term]:
+                scores[position] = scores.get(position, 0) + weight
+
+        return scores
+
+    def match(self, text):
+        """Return the best matching intent id, or None"""
+        scores = self.score(text)
+        if not scores:
+            return None
+        # Highest score wins; earlier intents in the knowledge file win ties
+        best = min(scores, key=lambda position: (-scores[position], position))
+        return self.intents[best]
+
+    def get_response(self, text):
+        """Return the canned response for the best matching intent"""
+        intent_id = self.match(text)
+        if intent_id is None:
+            return self.default_response
+        return self.responses[intent_id]
+
+    def get_quick_fixes(self, issue_type):
+        """Return quick fixes for an intent id, or for the intent the text matches"""
+        key = (issue_type or '').lower()
+        if key in self.quick_fixes:
+            return self.quick_fixes[key]
+        intent_id = self.match(key)
+        return self.quick_fixes.get(intent_id, self.default_quick_fixes)
+
+
+_matcher = None
+
+
+def get_intent_matcher():
+    """Return the process-wide matcher, building it on first use"""
+    global _matcher
+    if _matcher is None:
+        _matcher = IntentMatcher.from_file()
+        logger.info(f"Intent matcher loaded with {len(_matcher.intents)} intents")
+    return _matcher
@@ -0,0 +1,275 @@
+import os
+import json
+import time
+import random
+import socket
+import logging
+import threading
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from database import db
+from models.job import Job
+from services.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+REAP_SECONDS = 30
+
+JOBS_FINISHED = Counter('jobs_total', 'Job runs by outcome (succeeded, retried, failed)', ('name', 'outcome'))
+JOB_DURATION = Histogram('job_duration_seconds', 'Job run time', ('name',), buckets=JOB_BUCKETS)
+JOB_QUEUE_LATENCY = Histogram('job_queue_latency_seconds', 'Delay between a job being due and starting',
+                              ('name',), buckets=JOB_BUCKETS)
+
+TASKS = {}     # name -> (function, max_attempts)
+PERIODIC = {}  # name -> interval in seconds
+
+_wakeup = threading.Event()
+
+
+def task(name, max_attempts=5):
+    """Register a function as a job; it is called with the job's payload as keyword arguments"""
+    def decorator(fn):
+        TASKS[name] = (fn, max_attempts)
+        return fn
+    return decorator
+
+
+def periodic(name, every, max_attempts=1):
+    """Register a job that runs once every `every` seconds across all workers (0 disables)"""
+    def decorator(fn):
+        task(name, max_attempts)(fn)
+        if every and every > 0:
+            PERIODIC[name] = every
+        return fn
+    return decorator
+
+
+def enqueue(name, payload=None, delay=0, run_at=None, max_attempts=None, dedupe_key=None):
+    """Add a job to the session; workers see it once the caller commits"""
+    if name not in TASKS:
+        raise ValueError(f'Unknown job: {name}')
+    job = Job(
+        name=name,
+        payload=json.dumps(payload or {}),
+        status='queued',
+        run_at=run_at or datetime.utcnow() + timedelta(seconds=delay),
+        attempts=0,
+        max_attempts=max_attempts or TASKS[name][1],
+        dedupe_key=dedupe_key
+    )
+    db.session.add(job)
+    _wakeup.set()
+    return job
+
+
+def backoff_seconds(attempts):
+    """Exponential backoff with jitter before retry number `attempts` (JOB_BACKOFF_SECONDS base, 1h cap)"""
+    base = float(os.getenv('JOB_BACKOFF_SECONDS', 10))
+    return min(base * 2 ** (attempts - 1), 3600) * random.uniform(0.75, 1.25)
+
+
+class JobRunner:
+    """Worker threads that claim due jobs from the jobs table, plus a scheduler thread
+
+    A job is claimed with a conditional UPDATE (status still 'queued'), so any
+    number of threads and processes can share the table. Periodic jobs are
+    enqueued with a per-interval dedupe key, so each runs once per interval no
+    matter how many processes schedule it. Jobs whose worker died are requeued
+    after JOB_LOCK_TIMEOUT.
+    """
+
+    def __init__(self, app, workers=None):
+        self.app = app
+        self.workers = workers if workers is not None else int(os.getenv('JOB_WORKERS', 2))
+        self.poll_seconds = float(os.getenv('JOB_POLL_SECONDS', 1))
+        self.lock_timeout = float(os.getenv('JOB_LOCK_TIMEOUT', 300))
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self._stop = threading.Event()
+        self._threads = []
+        self._scheduled_slots = {}
+        self._last_reap = 0.0
+
+    def start(self):
+        for i in range(self.workers):
+            self._spawn(self._work, f'job-worker-{i}')
+        self._spawn(self._schedule, 'job-scheduler')
+        logger.info(f"Job runner started with {self.workers} workers ({self.worker_id})")
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _work(self):
+        owner = f'{self.worker_id}:{threading.current_thread().name}'
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    ran = self.run_next(owner)
+            except Exception as e:
+                logger.warning(f"Job worker error: {e}")
+                ran = False
+            if not ran:
+                _wakeup.wait(self.poll_seconds)
+                _wakeup.clear()
+
+    def _schedule(self):
+        while not self._stop.wait(1.0):
+            try:
+                with self.app.app_context():
+                    self.schedule_periodic()
+                    if time.time() - self._last_reap >= REAP_SECONDS:
+                        self.reap_stale()
+                        self._last_reap = time.time()
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Job scheduler error: {e}")
+
+    def claim(self, owner):
+        """Claim the next due job for owner, or return None"""
+        now = datetime.utcnow()
+        candidates = (db.session.query(Job.id)
+                      .filter(Job.status == 'queued', Job.run_at <= now)
+                      .order_by(Job.run_at)
+                      .limit(5)
+                      .all())
+        for job_id, in candidates:
+            claimed = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == 'queued')
+                .values(status='running', locked_by=owner, locked_at=now, started_at=now,
+                        attempts=Job.attempts + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return db.session.get(Job, job_id)
+        return None
+
+    def run_next(self, owner):
+        """Claim and run one job; returns False when nothing was due"""
+        job = self.claim(owner)
+        if job is None:
+            return False
+        job_id, name, attempts, max_attempts = job.id, job.name, job.attempts, job.max_attempts
+        JOB_QUEUE_LATENCY.observe(max((job.started_at - job.run_at).total_seconds(), 0), name=name)
+
+        start = time.perf_counter()
+        error = None
+        try:
+            fn = TASKS.get(name, (None,))[0]
+            if fn is None:
+                raise LookupError(f'No task registered as {name}')
+            fn(**json.loads(job.payload or '{}'))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            error = traceback.format_exc(limit=5)
+        JOB_DURATION.observe(time.perf_counter() - start, name=name)
+
+        now = datetime.utcnow()
+        if error is None:
+            outcome, values = 'succeeded', {'status': 'succeeded', 'finished_at': now, 'last_error': None}
+        elif attempts < max_attempts:
+            outcome, values = 'retried', {'status': 'queued', 'last_error': error,
+                                          'run_at': now + timedelta(seconds=backoff_seconds(attempts))}
+            logger.warning(f"Job {name} #{job_id} failed (attempt {attempts}/{max_attempts}), will retry")
+        else:
+            outcome, values = 'failed', {'status': 'failed', 'finished_at': now, 'last_error': error}
+            logger.error(f"Job {name} #{job_id} failed permanently:\n{error}")
+
+        # Only the current owner may finish the job; it may have been requeued as stale
+        db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'running', Job.locked_by == owner)
+            .values(locked_by=None, locked_at=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        JOBS_FINISHED.inc(name=name, outcome=outcome)
+        return True
+
+    def schedule_periodic(self):
+        """Enqueue each periodic job once per interval slot"""
+        for name, every in PERIODIC.items():
+            slot = int(time.time() // every)
+            if self._scheduled_slots.get(name) == slot:
+                continue
+            try:
+                enqueue(name, run_at=datetime.utcfromtimestamp(slot * every), dedupe_key=f'{name}@{slot}')
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()  # Another worker scheduled this slot
+            self._scheduled_slots[name] = slot
+
+    def reap_stale(self):
+        """Requeue (or fail) running jobs whose worker has not finished within JOB_LOCK_TIMEOUT"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lock_timeout)
+        stale = (Job.status == 'running', Job.locked_at < cutoff)
+        failed = db.session.execute(
+            update(Job).where(*stale, Job.attempts >= Job.max_attempts)
+            .values(status='failed', finished_at=datetime.utcnow(), locked_by=None, locked_at=None,
+                    last_error='Worker did not finish the job')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        requeued = db.session.execute(
+            update(Job).where(*stale)
+            .values(status='queued', locked_by=None, locked_at=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if failed or requeued:
+            logger.warning(f"Stale jobs: {requeued} requeued, {failed} failed")
+
+
+def queue_stats():
+    """Job counts by name and status, plus the depth and age of the due queue"""
+    now = datetime.utcnow()
+    counts = {}
+    for name, status, count in db.session.query(Job.name, Job.status, func.count()).group_by(Job.name, Job.status):
+        counts.setdefault(name, {})[status] = count
+    due, oldest = db.session.query(func.count(), func.min(Job.run_at)).filter(
+        Job.status == 'queued', Job.run_at <= now).one()
+    return {
+        'counts': counts,
+        'due': due,
+        'oldest_due_seconds': round((now - oldest).total_seconds(), 1) if oldest else None,
+        'running': db.session.query(func.count()).filter(Job.status == 'running').scalar(),
+        'periodic': PERIODIC
+    }
+
+
+@periodic('jobs.prune', every=3600)
+def prune_jobs():
+    """Delete finished jobs older than JOB_RETENTION_HOURS (default a week)"""
+    cutoff = datetime.utcnow() - timedelta(hours=float(os.getenv('JOB_RETENTION_HOURS', 168)))
+    Job.query.filter(Job.status.in_(('succeeded', 'failed')), Job.finished_at < cutoff).delete(
+        synchronize_session=False)
+
+
+def init_jobs(app):
+    """Start the job runner in this process with the first request (JOB_WORKERS=0 disables)
+
+    Scripts that only import the app do not run jobs; use
+    python -m utils.run_jobs for a dedicated worker process.
+    """
+    lock = threading.Lock()
+    runners = []
+
+    @app.before_request
+    def start_job_runner():
+        if runners or app.testing or int(os.getenv('JOB_WORKERS', 2)) <= 0:
+            return
+        with lock:
+            if not runners:
+                runners.append(JobRunner(app))
+                runners[0].start()
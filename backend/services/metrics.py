@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import bisect
+import logging
+import tempfile
+import threading
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+AI_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0)
+
+FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5))
+
+
+class _Shard:
+    """Values written by one thread; only that thread mutates it"""
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.values = {}      # (name, labels) -> number
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+
+class Registry:
+    """Process-wide metric store with per-thread shards
+
+    Recording touches only the calling thread's shard, so the hot path takes
+    no lock; shards are summed when metrics are collected. Shards of finished
+    threads are folded into a base shard so per-request threads don't pile up.
+
+    With METRICS_DIR set, each process also writes its totals there as
+    <pid>.json every METRICS_FLUSH_SECONDS, and collection merges the files of
+    every worker. Clear the directory when the deployment starts.
+    """
+
+    def __init__(self, directory=None):
+        self.metrics = {}
+        self.directory = directory if directory is not None else os.getenv('METRICS_DIR')
+        self._local = threading.local()
+        self._shards = []
+        self._base = _Shard(None)
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _Shard(threading.current_thread())
+            with self._lock:
+                if len(self._shards) > 2 * threading.active_count() + 8:
+                    self._fold_dead_shards()
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _fold_dead_shards(self):
+        """Merge shards of finished threads into the base shard (lock held)"""
+        alive = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+            else:
+                _merge(self._base.values, self._base.histograms, shard.values, shard.histograms)
+        self._shards = alive
+
+    def add(self, name, labels, amount):
+        values = self._shard().values
+        values[(name, labels)] = values.get((name, labels), 0) + amount
+
+    def observe(self, name, labels, value, buckets):
+        histograms = self._shard().histograms
+        entry = histograms.get((name, labels))
+        if entry is None:
+            entry = histograms[(name, labels)] = [0] * (len(buckets) + 3)
+        entry[bisect.bisect_left(buckets, value)] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    def local_totals(self):
+        """(values, histograms) summed over every thread of this process"""
+        with self._lock:
+            self._fold_dead_shards()
+            values, histograms = dict(self._base.values), {k: list(v) for k, v in self._base.histograms.items()}
+            for shard in self._shards:
+                _merge(values, histograms, shard.values.copy(), shard.histograms.copy())
+        return values, histograms
+
+    def flush(self, force=False):
+        """Write this process's totals to METRICS_DIR (at most every FLUSH_SECONDS)"""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_SECONDS:
+            return
+        self._last_flush = now
+        values, histograms = self.local_totals()
+        snapshot = {
+            'pid': os.getpid(),
+            'values': [[name, list(labels), value] for (name, labels), value in values.items()],
+            'histograms': [[name, list(labels), entry] for (name, labels), entry in histograms.items()],
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, os.path.join(self.directory, f'{os.getpid()}.json'))
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+
+    def collect(self):
+        """Totals for every metric, across worker processes when METRICS_DIR is set"""
+        values, histograms = self.local_totals()
+        if not self.directory:
+            return values, histograms
+
+        self.flush(force=True)
+        values, histograms = {}, {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(snapshot['pid'])
+            for name, labels, value in snapshot['values']:
+                # Gauges of exited workers no longer describe anything
+                if not alive and self.metrics.get(name) and self.metrics[name].kind == 'gauge':
+                    continue
+                key = (name, tuple(labels))
+                values[key] = values.get(key, 0) + value
+            _merge(values, histograms, {}, {(name, tuple(labels)): entry for name, labels, entry in snapshot['histograms']})
+        return values, histograms
+
+    def render(self):
+        """Prometheus text exposition format"""
+        values, histograms = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            if metric.kind == 'histogram':
+                for (metric_name, labels), entry in sorted(histograms.items()):
+                    if metric_name != name:
+                        continue
+                    base = _label_pairs(metric.labelnames, labels)
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float('inf'),), entry[:-2]):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(float(bound))
+                        lines.append(f'{name}_bucket{_format_labels(base + [("le", le)])} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(base)} {entry[-2]}')
+                    lines.append(f'{name}_count{_format_labels(base)} {entry[-1]}')
+            else:
+                for (metric_name, labels), value in sorted(values.items()):
+                    if metric_name == name:
+                        lines.append(f'{name}{_format_labels(_label_pairs(metric.labelnames, labels))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(values, histograms, more_values, more_histograms):
+    for key, value in more_values.items():
+        values[key] = values.get(key, 0) + value
+    for key, entry in more_histograms.items():
+        current = histograms.get(key)
+        if current is None:
+            histograms[key] = list(entry)
+        else:
+            for i, count in enumerate(entry):
+                current[i] += count
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def _label_pairs(labelnames, labels):
+    return list(zip(labelnames, labels))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=(), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def _labels(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(self.name, self._labels(labels), amount)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(self.name, self._labels(labels), amount)
+
+    def dec(self, amount=1, **labels):
+        self.registry.add(self.name, self._labels(labels), -amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=REQUEST_BUCKETS, registry=None):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labelnames, registry)
+
+    def observe(self, value, **labels):
+        self.registry.observe(self.name, self._labels(labels), value, self.buckets)
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = Counter('http_requests_total', 'HTTP requests by endpoint and status', ('method', 'endpoint', 'status'))
+HTTP_LATENCY = Histogram('http_request_duration_seconds', 'HTTP request latency', ('method', 'endpoint'))
+HTTP_IN_PROGRESS = Gauge('http_requests_in_progress', 'HTTP requests being served', ('method', 'endpoint'))
+HTTP_RESPONSE_SIZE = Histogram('http_response_size_bytes', 'HTTP response body size', ('method', 'endpoint'), buckets=SIZE_BUCKETS)
+AI_PROVIDER_CALLS = Counter('ai_provider_requests_total', 'AI provider calls by outcome', ('provider', 'outcome'))
+AI_PROVIDER_LATENCY = Histogram('ai_provider_duration_seconds', 'AI provider call latency', ('provider',), buckets=AI_BUCKETS)
+AI_RESPONSES = Counter('ai_responses_total', 'AI chat answers by source', ('source',))
+
+
+def _endpoint():
+    # Route names keep label cardinality bounded; unmatched URLs share one label
+    return request.endpoint or 'unmatched'
+
+
+def init_metrics(app):
+    """Register request instrumentation hooks on the app"""
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_endpoint = _endpoint()
+        HTTP_IN_PROGRESS.inc(method=request.method, endpoint=g.metrics_endpoint)
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        endpoint = g.metrics_endpoint
+        HTTP_REQUESTS.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+        HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, endpoint=endpoint)
+        if response.content_length is not None:
+            HTTP_RESPONSE_SIZE.observe(response.content_length, method=request.method, endpoint=endpoint)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        endpoint = g.pop('metrics_endpoint', None)
+        if endpoint is not None:
+            HTTP_IN_PROGRESS.dec(method=request.method, endpoint=endpoint)
+        REGISTRY.flush()
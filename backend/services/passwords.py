@@ -0,0 +1,126 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUNDS = 12
+DEFAULT_WORKERS = 2  # Per web process; several processes share the machine's cores
+
+
+def bcrypt_rounds():
+    """Configured bcrypt work factor (BCRYPT_ROUNDS)"""
+    return int(os.getenv('BCRYPT_ROUNDS', DEFAULT_ROUNDS))
+
+
+def start_method():
+    """Process pool start method: PASSWORD_POOL_START_METHOD, else forkserver where available, else spawn"""
+    configured = os.getenv('PASSWORD_POOL_START_METHOD')
+    if configured:
+        return configured
+    return 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+class PasswordHasher:
+    """Runs bcrypt off the request thread in a bounded worker pool
+
+    PASSWORD_POOL selects the pool: 'process' (default) keeps hashing out of the
+    web worker's interpreter entirely, 'thread' relies on bcrypt releasing the
+    GIL, and 'inline' hashes on the calling thread (scripts and debugging).
+    Process pools are started with forkserver (spawn where that is missing), not
+    fork: the pool is created lazily inside a multithreaded web process, and a
+    forked child can inherit locks held by other threads.
+    """
+
+    def __init__(self, mode=None, workers=None):
+        self.mode = (mode or os.getenv('PASSWORD_POOL', 'process')).lower()
+        self.workers = workers or int(os.getenv('PASSWORD_WORKERS', DEFAULT_WORKERS))
+        self._executor = None
+        self._lock = threading.Lock()
+        # Bound queued work so a login burst cannot grow the backlog without limit;
+        # batches may hold at most half of it, so logins never queue behind a whole import
+        self._slots = threading.BoundedSemaphore(self.workers * 4)
+        self._batch_slots = threading.BoundedSemaphore(self.workers * 2)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.mode == 'process':
+                        context = multiprocessing.get_context(start_method())
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+                    logger.info(f"Password hashing pool started ({self.mode}, {self.workers} workers)")
+        return self._executor
+
+    def _run(self, func, *args):
+        if self.mode == 'inline':
+            return func(*args)
+        with self._slots:
+            return self._get_executor().submit(func, *args).result()
+
+    def hash(self, password, rounds=None):
+        """Hash a password with the configured (or given) work factor"""
+        return self._run(_hash, password, rounds or bcrypt_rounds())
+
+    def verify(self, password, hashed):
+        """Check a password against a bcrypt hash"""
+        return self._run(_verify, password, hashed)
+
+    def hash_many(self, passwords, rounds=None):
+        """Hash a batch of passwords across every worker, within the same queue bound as logins"""
+        rounds = rounds or bcrypt_rounds()
+        if self.mode == 'inline':
+            return [_hash(password, rounds) for password in passwords]
+        executor = self._get_executor()
+
+        def release(future):
+            self._slots.release()
+            self._batch_slots.release()
+
+        futures = []
+        for password in passwords:
+            self._batch_slots.acquire()
+            self._slots.acquire()
+            try:
+                future = executor.submit(_hash, password, rounds)
+            except BaseException:
+                release(None)
+                raise
+            future.add_done_callback(release)
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+def hash_rounds(hashed):
+    """Work factor stored in a bcrypt hash ('$2b$12$...' -> 12)"""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed):
+    """True when a stored hash was made with a different work factor than configured"""
+    return hash_rounds(hashed) != bcrypt_rounds()
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import cProfile
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+from services.auth import current_principal
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROFILE_DIR = os.path.join(BACKEND_DIR, 'instance', 'profiles')
+PROFILE_HEADER = 'X-Profile'
+MODES = ('cprofile', 'sample')
+EXTENSIONS = {'cprofile': 'pstats', 'sample': 'folded'}
+
+
+def profile_dir():
+    return os.getenv('PROFILE_DIR', DEFAULT_PROFILE_DIR)
+
+
+def sample_rate():
+    """Fraction of live requests profiled with the sampling profiler (PROFILE_SAMPLE_RATE)"""
+    return float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval from a helper thread
+
+    The result is in collapsed-stack format ("outer;inner;leaf count" per line)
+    read by flamegraph.pl, speedscope and similar tools. The profiled thread
+    runs unmodified, so overhead stays low enough for live traffic.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 5)) / 1000
+        self.stacks = Counter()
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class ProfileStore:
+    """Profiles on disk: <id>.pstats or <id>.folded plus <id>.json metadata"""
+
+    def save(self, profiler, mode, metadata):
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        profile_id = uuid.uuid4().hex[:16]
+        path = os.path.join(directory, f'{profile_id}.{EXTENSIONS[mode]}')
+        if mode == 'cprofile':
+            profiler.dump_stats(path)
+        else:
+            profiler.dump(path)
+        metadata = dict(metadata, id=profile_id, mode=mode, file=os.path.basename(path))
+        with open(os.path.join(directory, f'{profile_id}.json'), 'w') as f:
+            json.dump(metadata, f)
+        self._prune(directory)
+        return profile_id
+
+    def _prune(self, directory):
+        """Keep the newest PROFILE_MAX_FILES profiles"""
+        limit = int(os.getenv('PROFILE_MAX_FILES', 100))
+        entries = sorted(
+            (os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.json')),
+            key=os.path.getmtime
+        )
+        for meta_path in entries[:-limit] if len(entries) > limit else []:
+            profile_id = os.path.basename(meta_path)[:-5]
+            for extension in ('json',) + tuple(EXTENSIONS.values()):
+                path = os.path.join(directory, f'{profile_id}.{extension}')
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def list(self):
+        directory = profile_dir()
+        if not os.path.isdir(directory):
+            return []
+        profiles = []
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(directory, name)) as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(profiles, key=lambda p: p.get('created_at', ''), reverse=True)
+
+    def get(self, profile_id):
+        """Metadata for one profile, or None (ids are hex only)"""
+        if not profile_id.isalnum():
+            return None
+        path = os.path.join(profile_dir(), f'{profile_id}.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def path(self, metadata):
+        return os.path.join(profile_dir(), metadata['file'])
+
+
+profile_store = ProfileStore()
+
+
+def _requested_mode():
+    """Profiling mode asked for by the request, if any ('1' means cProfile)"""
+    value = request.headers.get(PROFILE_HEADER) or request.args.get('_profile')
+    if not value:
+        return None
+    value = value.lower()
+    return value if value in MODES else 'cprofile'
+
+
+def init_profiler(app):
+    """Profile requests on demand (admins) or at random (PROFILE_SAMPLE_RATE)"""
+
+    @app.before_request
+    def start_profiler():
+        mode = _requested_mode()
+        trigger = 'admin'
+        if mode:
+            principal = current_principal()
+            if not principal or principal.role != 'ADMIN':
+                return None  # Ignored for everyone else
+        elif sample_rate() > 0 and random.random() < sample_rate():
+            mode, trigger = 'sample', 'random'
+        else:
+            return None
+
+        profiler = cProfile.Profile() if mode == 'cprofile' else SamplingProfiler()
+        try:
+            if mode == 'cprofile':
+                profiler.enable()
+            else:
+                profiler.start()
+        except ValueError as e:
+            # Another profiler is already active (cProfile is process-wide on 3.12+)
+            logger.warning(f"Request profiling skipped: {e}")
+            return None
+        g.profiler = (profiler, mode, trigger, time.perf_counter())
+
+    def stop(state):
+        profiler, mode = state[0], state[1]
+        if mode == 'cprofile':
+            profiler.disable()
+        else:
+            profiler.stop()
+
+    @app.after_request
+    def save_profile(response):
+        state = g.pop('profiler', None)
+        if state is None:
+            return response
+        stop(state)
+        profiler, mode, trigger, start = state
+
+        try:
+            profile_id = profile_store.save(profiler, mode, {
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+                'trigger': trigger,
+                'created_at': datetime.utcnow().isoformat()
+            })
+            if trigger == 'admin':
+                response.headers['X-Profile-Id'] = profile_id
+        except Exception as e:
+            logger.warning(f"Could not save request profile: {e}")
+        return response
+
+    @app.teardown_request
+    def discard_profile(exc):
+        # after_request did not run; make sure the profiler is not left running
+        state = g.pop('profiler', None)
+        if state is not None:
+            stop(state)
@@ -0,0 +1,104 @@
+import math
+import base64
+import numpy as np
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+MIN_VALUE = 1.0  # values below this (seconds) share one bucket
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative accuracy (DDSketch)
+
+    Values are counted in logarithmic buckets, so any quantile is within 1% of
+    the true value and two sketches merge by adding bucket counts. Counts can
+    also be subtracted, which lets rollups retract a reopened ticket.
+
+    Stored as "zero_count:first_key:counts" with the counts of consecutive
+    buckets packed as base64 int32, so thousands of stored sketches can be
+    merged with numpy (see merge_serialized).
+    """
+
+    __slots__ = ('bins', 'zero_count')
+
+    def __init__(self, bins=None, zero_count=0):
+        self.bins = bins or {}
+        self.zero_count = zero_count
+
+    @staticmethod
+    def key(value):
+        return math.ceil(math.log(value) / LOG_GAMMA)
+
+    def add(self, value, count=1):
+        if value < MIN_VALUE:
+            self.zero_count += count
+            return
+        self.add_key(self.key(value), count)
+
+    def add_key(self, k, count=1):
+        total = self.bins.get(k, 0) + count
+        if total:
+            self.bins[k] = total
+        else:
+            self.bins.pop(k, None)
+
+    def merge(self, other):
+        self.zero_count += other.zero_count
+        for k, count in other.bins.items():
+            self.add_key(k, count)
+        return self
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.bins.values())
+
+    def quantile(self, q):
+        """Approximate q-quantile (0..1), or None for an empty sketch"""
+        total = self.count
+        if total <= 0:
+            return None
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen > rank:
+                return 2 * GAMMA ** k / (GAMMA + 1)
+        return 2 * GAMMA ** max(self.bins) / (GAMMA + 1)
+
+    def serialize(self):
+        if not self.bins:
+            return f'{self.zero_count}:0:'
+        first = min(self.bins)
+        counts = np.zeros(max(self.bins) - first + 1, dtype='<i4')
+        for k, count in self.bins.items():
+            counts[k - first] = count
+        return f'{self.zero_count}:{first}:{base64.b64encode(counts.tobytes()).decode()}'
+
+    @staticmethod
+    def _unpack(text):
+        zero_count, first, packed = text.split(':', 2)
+        return int(zero_count), int(first), np.frombuffer(base64.b64decode(packed), dtype='<i4')
+
+    @classmethod
+    def deserialize(cls, text):
+        if not text:
+            return cls()
+        zero_count, first, counts = cls._unpack(text)
+        return cls({first + int(i): int(counts[i]) for i in np.flatnonzero(counts)}, zero_count)
+
+    @classmethod
+    def merge_serialized(cls, texts):
+        """One sketch from many serialized ones, summed with numpy"""
+        parts = [cls._unpack(text) for text in texts if text]
+        filled = [(first, counts) for _, first, counts in parts if counts.size]
+        zero_count = sum(part[0] for part in parts)
+        if not filled:
+            return cls(zero_count=zero_count)
+        low = min(first for first, _ in filled)
+        totals = np.zeros(max(first + counts.size for first, counts in filled) - low, dtype=np.int64)
+        for first, counts in filled:
+            totals[first - low:first - low + counts.size] += counts
+        return cls({low + int(i): int(totals[i]) for i in np.flatnonzero(totals)}, zero_count)
@@ -0,0 +1,157 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+_local = threading.local()
+
+
+def repeat_threshold():
+    """Executions of one statement shape per request before an N+1 warning"""
+    return int(os.getenv('QUERY_REPEAT_THRESHOLD', 10))
+
+
+def headers_enabled():
+    """X-Query-Count / X-DB-Time headers: on outside production unless overridden"""
+    value = os.getenv('QUERY_STATS_HEADERS')
+    if value is not None:
+        return value.lower() in TRUE_VALUES
+    return os.getenv('FLASK_ENV', 'production') != 'production'
+
+
+class QueryCollector:
+    """Counts and times the SQL statements run on one thread"""
+
+    def __init__(self, keep_statements=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.statements = [] if keep_statements else None
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        # Statements are already parameterized, so the text is the shape
+        self.shapes[statement] += 1
+        if self.statements is not None:
+            self.statements.append((statement, seconds))
+
+    def repeated(self, threshold):
+        """Statement shapes executed more than threshold times"""
+        return [(statement, n) for statement, n in self.shapes.most_common() if n > threshold]
+
+
+def _collectors():
+    stack = getattr(_local, 'collectors', None)
+    if stack is None:
+        stack = _local.collectors = []
+    return stack
+
+
+_observers = []
+
+
+def on_statement(fn):
+    """Register fn(conn, cursor, statement, parameters, executemany, seconds) to run after
+    every statement with its duration; every consumer shares one set of timing listeners"""
+    _observers.append(fn)
+    return fn
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    for collector in _collectors():
+        collector.record(statement, elapsed)
+    for observer in _observers:
+        observer(conn, cursor, statement, parameters, executemany, elapsed)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # after_cursor_execute never runs for a failed statement; drop its start time
+    # so the next statement on this connection is not timed from it
+    conn = context.connection
+    if conn is not None and conn.info.get('query_start'):
+        conn.info['query_start'].pop()
+
+
+@contextmanager
+def capture_queries(keep_statements=True):
+    """Collect every statement run on this thread inside the block
+
+        with capture_queries() as queries:
+            client.get('/api/tickets')
+        assert queries.count <= 3
+    """
+    collector = QueryCollector(keep_statements=keep_statements)
+    _collectors().append(collector)
+    try:
+        yield collector
+    finally:
+        _collectors().remove(collector)
+
+
+def assert_query_budget(client, method, path, budget, **kwargs):
+    """Pytest helper: request path with a Flask test client and fail if it runs
+    more than budget statements; returns the response
+
+        def test_ticket_list_budget(client):
+            assert_query_budget(client, 'GET', '/api/tickets', 3)
+    """
+    with capture_queries() as queries:
+        response = client.open(path, method=method, **kwargs)
+    if queries.count > budget:
+        listing = '\n'.join(f'  {seconds * 1000:7.2f} ms  {statement}' for statement, seconds in queries.statements)
+        raise AssertionError(f'{method} {path} ran {queries.count} queries (budget {budget}):\n{listing}')
+    return response
+
+
+def init_query_stats(app):
+    """Count queries per request, add debug headers and warn about N+1 patterns"""
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = QueryCollector()
+        _collectors().append(g.query_stats)
+
+    @app.after_request
+    def report_query_stats(response):
+        collector = g.pop('query_stats', None)
+        if collector is None:
+            return response
+        if collector in _collectors():
+            _collectors().remove(collector)
+
+        for statement, n in collector.repeated(repeat_threshold()):
+            logger.warning(f"Possible N+1 in {request.method} {request.path} ({request.endpoint}): "
+                           f"statement ran {n} times: {' '.join(statement.split())[:300]}")
+
+        if headers_enabled():
+            response.headers['X-Query-Count'] = str(collector.count)
+            response.headers['X-DB-Time'] = f'{collector.seconds * 1000:.2f}'
+        return response
+
+    @app.teardown_request
+    def discard_query_stats(exc):
+        # after_request is skipped for some failures; never leak a collector
+        collector = g.pop('query_stats', None)
+        if collector is not None and collector in _collectors():
+            _collectors().remove(collector)
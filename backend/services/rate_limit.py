@@ -0,0 +1,211 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from functools import wraps
+from flask import request, jsonify
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'rate_limits.db')
+
+# Per-route limits as "<requests>/<period>"; override with RATE_LIMIT_<NAME>_<SCOPE>, e.g.
+# RATE_LIMIT_LOGIN_IP=50/minute, or "off" to disable a bucket
+DEFAULT_LIMITS = {
+    'login': {'ip': '30/minute', 'user': '10/minute'},
+    'ai_chat': {'ip': '20/minute', 'user': None},
+}
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(value):
+    """Parse '10/minute' (or '10/minutes', '10/60') into (capacity, refill tokens per second)
+
+    Raises ValueError for anything else.
+    """
+    if not value or value.strip().lower() in ('off', 'none', '0'):
+        return None
+    count, _, period = value.strip().partition('/')
+    period = period.strip().lower()
+    try:
+        seconds = PERIODS.get(period) or PERIODS.get(period.rstrip('s')) or float(period or 1)
+        capacity = float(count)
+    except ValueError:
+        raise ValueError(f'Invalid rate limit {value!r}, expected e.g. 10/minute') from None
+    if capacity <= 0 or seconds <= 0:
+        raise ValueError(f'Invalid rate limit {value!r}, expected e.g. 10/minute')
+    return capacity, capacity / seconds
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryBackend:
+    """Token buckets held in this process"""
+
+    def __init__(self, max_keys=100000):
+        self._lock = threading.Lock()
+        self._buckets = {}   # key -> [tokens, updated]
+        self.max_keys = max_keys
+
+    def consume(self, key, capacity, rate, cost=1.0):
+        """Take cost tokens; returns (allowed, seconds until allowed)"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            tokens = capacity if bucket is None else _refill(bucket[0], bucket[1], now, capacity, rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            if bucket is None and len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = [tokens, now]
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def _prune(self, now, idle_seconds=3600):
+        """Forget buckets that have been idle (and therefore refilled) for a while"""
+        stale = [key for key, (_, updated) in self._buckets.items() if now - updated > idle_seconds]
+        for key in stale:
+            del self._buckets[key]
+
+
+class SQLiteBackend:
+    """Token buckets in a SQLite file shared by every worker process on the host"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('RATE_LIMIT_DB', DEFAULT_SQLITE_PATH)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        self._calls = 0
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key, capacity, rate, cost=1.0):
+        """Take cost tokens; returns (allowed, seconds until allowed)"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = capacity if row is None else _refill(row[0], row[1], now, capacity, rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                'INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                (key, tokens, now)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        self._calls += 1
+        if self._calls % 1000 == 0:
+            conn.execute('DELETE FROM buckets WHERE updated < ?', (now - 3600,))
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the configured backend (RATE_LIMIT_BACKEND=memory|sqlite)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if os.getenv('RATE_LIMIT_BACKEND', 'memory').lower() == 'sqlite':
+                    _backend = SQLiteBackend()
+                else:
+                    _backend = MemoryBackend()
+                logger.info(f"Rate limiting using {type(_backend).__name__}")
+    return _backend
+
+
+_invalid_overrides = set()
+
+
+def get_limit(name, scope):
+    """Limit for a route and scope ('ip' or 'user'), honouring env overrides
+
+    A malformed override is logged once and the default limit used instead.
+    """
+    variable = f'RATE_LIMIT_{name.upper()}_{scope.upper()}'
+    override = os.getenv(variable)
+    if override is not None:
+        try:
+            return parse_limit(override)
+        except ValueError as e:
+            if (variable, override) not in _invalid_overrides:
+                _invalid_overrides.add((variable, override))
+                logger.error(f"{variable}: {e}; using the default limit")
+    return parse_limit(DEFAULT_LIMITS.get(name, {}).get(scope))
+
+
+def client_ip():
+    """Client address, taken from X-Forwarded-For only when behind a trusted proxy"""
+    if os.getenv('RATE_LIMIT_TRUST_PROXY', 'false').lower() == 'true' and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or 'unknown'
+
+
+def _too_many_requests(retry_after):
+    retry_after = max(1, int(retry_after + 0.999))
+    response = jsonify({
+        'error': 'Too many requests, please try again later',
+        'message': 'Too many requests, please try again later',
+        'retry_after': retry_after
+    })
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
+
+def rate_limit(name, user_key=None):
+    """Decorator applying the per-IP and per-user token buckets configured for name
+
+    user_key is a callable returning the user identifier for the request (or None);
+    it runs before the view, so it must not touch the database.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'false':
+                return f(*args, **kwargs)
+
+            backend = get_backend()
+            checks = [('ip', client_ip())]
+            if user_key is not None:
+                user = user_key()
+                if user:
+                    checks.append(('user', str(user).lower()))
+
+            for scope, identity in checks:
+                limit = get_limit(name, scope)
+                if limit is None:
+                    continue
+                allowed, retry_after = backend.consume(f'{name}:{scope}:{identity}', *limit)
+                if not allowed:
+                    logger.warning(f"Rate limit exceeded for {name} ({scope}={identity})")
+                    return _too_many_requests(retry_after)
+
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
@@ -0,0 +1,232 @@
+import sqlite3
+from collections import namedtuple
+from datetime import timedelta
+from sqlalchemy import and_, delete, event, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from database import db
+from models.resolution_rollup import ResolutionRollup
+from services.quantile_sketch import MIN_VALUE, QuantileSketch
+
+RESOLVED_STATUSES = ('resolved', 'closed')
+GRANULARITIES = ('hour', 'day', 'month')
+GROUP_FIELDS = ('building_id', 'department_id', 'issue_type', 'priority')
+QUANTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+
+# INSERT ... ON CONFLICT DO UPDATE constructs for the backends rollups support
+UPSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+ResolutionSample = namedtuple('ResolutionSample', ('resolved_at',) + GROUP_FIELDS + ('seconds',))
+
+
+def floor_time(moment, granularity):
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_time(moment, granularity):
+    """Start of the bucket after the one starting at moment"""
+    if granularity == 'hour':
+        return moment + timedelta(hours=1)
+    if granularity == 'day':
+        return moment + timedelta(days=1)
+    return (moment.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def ceil_time(moment, granularity):
+    start = floor_time(moment, granularity)
+    return start if start == moment else next_time(start, granularity)
+
+
+def cover(start, end, levels=('month', 'day', 'hour')):
+    """Fewest rollup buckets covering [start, end): whole months, then days, then hours at the edges"""
+    if start >= end:
+        return []
+    granularity = levels[0]
+    if len(levels) == 1:
+        return [(granularity, start, end)]
+    first, last = ceil_time(start, granularity), floor_time(end, granularity)
+    if first >= last:
+        return cover(start, end, levels[1:])
+    return cover(start, first, levels[1:]) + [(granularity, first, last)] + cover(last, end, levels[1:])
+
+
+def resolution_sample(ticket):
+    """What a ticket contributes to the rollups, or None if it is not resolved"""
+    if ticket is None or ticket.status not in RESOLVED_STATUSES or not ticket.resolved_at or not ticket.created_at:
+        return None
+    seconds = max(0.0, (ticket.resolved_at - ticket.created_at).total_seconds())
+    return ResolutionSample(ticket.resolved_at, ticket.building_id, ticket.department_id,
+                            ticket.issue_type, ticket.priority, seconds)
+
+
+@event.listens_for(Engine, 'connect')
+def _register_sketch_merge(dbapi_connection, connection_record):
+    """sketch_merge(a, b) in SQL, so rollup upserts can add to a stored sketch"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function(
+            'sketch_merge', 2, lambda a, b: QuantileSketch.merge_serialized((a, b)).serialize(), deterministic=True)
+
+
+def increment_rollup(model, keys, deltas, sketches=None):
+    """Add deltas to the rollup row for keys with one atomic upsert; call before committing
+
+    INSERT ... ON CONFLICT DO UPDATE with column-relative increments, so
+    concurrent writers neither collide inserting a new bucket nor lose each
+    other's updates. sketches maps sketch columns to serialized QuantileSketch
+    values to merge in. On SQLite they are merged inside the upsert by the
+    sketch_merge SQL function; on PostgreSQL the upsert leaves them alone and
+    the row, which it has locked until commit, is then read, merged and
+    written back. The conflict target is the model's unique index, which
+    coalesces nullable group columns since SQLite treats NULLs in a unique
+    index as distinct. A row whose count drops to zero is deleted.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in UPSERTS:
+        raise NotImplementedError(f'Rollups need SQLite or PostgreSQL, not {dialect}')
+    table = model.__table__
+    sketches = sketches or {}
+    in_sql = dialect == 'sqlite'
+    target = next(index for index in table.indexes if index.unique)
+    stmt = UPSERTS[dialect](table).values(**keys, **deltas, **(sketches if in_sql else {}))
+    updates = {column: table.c[column] + stmt.excluded[column] for column in deltas}
+    if in_sql:
+        updates.update({column: func.sketch_merge(table.c[column], stmt.excluded[column]) for column in sketches})
+    db.session.execute(stmt.on_conflict_do_update(index_elements=list(target.expressions), set_=updates))
+
+    where = [table.c[column].is_not_distinct_from(value) for column, value in keys.items()]
+    if sketches and not in_sql:
+        stored = db.session.execute(select(*[table.c[column] for column in sketches]).where(*where)).one()
+        db.session.execute(update(table).where(*where).values({
+            column: QuantileSketch.merge_serialized((old, value)).serialize()
+            for old, (column, value) in zip(stored, sketches.items())}))
+    if deltas['count'] < 0:
+        db.session.execute(delete(table).where(*where, table.c.count <= 0))
+
+
+def _apply(sample, sign):
+    groups = {field: getattr(sample, field) for field in GROUP_FIELDS}
+    sketch = QuantileSketch()
+    sketch.add(sample.seconds, sign)
+    for granularity in GRANULARITIES:
+        increment_rollup(
+            ResolutionRollup,
+            dict(granularity=granularity, bucket_start=floor_time(sample.resolved_at, granularity), **groups),
+            dict(count=sign, sum_seconds=sign * sample.seconds),
+            sketches={'sketch': sketch.serialize()})
+
+
+def record_resolution_change(before, ticket):
+    """Update the rollups for a ticket change; call before committing it
+
+    before is resolution_sample(ticket) taken before the change (pass ticket=None
+    for a deletion). Reopened tickets are retracted, re-resolved ones moved.
+    """
+    after = resolution_sample(ticket)
+    if before == after:
+        return
+    if before:
+        _apply(before, -1)
+    if after:
+        _apply(after, 1)
+
+
+def resolution_stats(start, end, group_by=(), filters=None, interval=None):
+    """MTTR and resolution-time percentiles for tickets resolved in [start, end)
+
+    Without interval the range is covered by the fewest month, day and hour
+    rollups; with interval ('hour', 'day' or 'month') one row per bucket is
+    returned for each group.
+    """
+    start = floor_time(start, 'hour')
+    end = ceil_time(end, 'hour')
+    if interval:
+        ranges = [(interval, floor_time(start, interval), ceil_time(end, interval))]
+    else:
+        ranges = cover(start, end)
+    if not ranges:
+        return []
+
+    query = db.session.query(
+        ResolutionRollup.bucket_start, ResolutionRollup.count, ResolutionRollup.sum_seconds,
+        ResolutionRollup.sketch, *[getattr(ResolutionRollup, field) for field in group_by]
+    ).filter(or_(*[
+        and_(ResolutionRollup.granularity == granularity,
+             ResolutionRollup.bucket_start >= first,
+             ResolutionRollup.bucket_start < last)
+        for granularity, first, last in ranges
+    ]))
+    for field, value in (filters or {}).items():
+        query = query.filter(getattr(ResolutionRollup, field) == value)
+
+    groups = {}
+    for row in query:
+        key = tuple(getattr(row, field) for field in group_by)
+        if interval:
+            key += (row.bucket_start,)
+        entry = groups.get(key)
+        if entry is None:
+            entry = groups[key] = [0, 0.0, []]
+        entry[0] += row.count
+        entry[1] += row.sum_seconds
+        entry[2].append(row.sketch)
+
+    results = []
+    for key, (count, total_seconds, sketches) in groups.items():
+        sketch = QuantileSketch.merge_serialized(sketches)
+        result = dict(zip(group_by, key))
+        if interval:
+            result['bucket_start'] = key[-1].isoformat()
+        result['count'] = count
+        result['mttr_hours'] = round(total_seconds / count / 3600, 2) if count else None
+        for name, q in QUANTILES:
+            value = sketch.quantile(q)
+            result[f'{name}_hours'] = round(value / 3600, 2) if value is not None else None
+        results.append(result)
+    results.sort(key=lambda r: (r.get('bucket_start', ''), -r['count']))
+    return results
+
+
+def rebuild_resolution_rollups(batch_size=5000):
+    """Recompute every rollup from the tickets; returns the number of tickets counted"""
+    from models.support_ticket import SupportTicket
+
+    aggregates = {}
+    tickets = 0
+    query = (db.session.query(SupportTicket.created_at, SupportTicket.resolved_at,
+                              *[getattr(SupportTicket, field) for field in GROUP_FIELDS])
+             .filter(SupportTicket.status.in_(RESOLVED_STATUSES),
+                     SupportTicket.resolved_at.isnot(None),
+                     SupportTicket.created_at.isnot(None))
+             .yield_per(batch_size))
+    for row in query:
+        tickets += 1
+        seconds = max(0.0, (row.resolved_at - row.created_at).total_seconds())
+        bucket = QuantileSketch.key(seconds) if seconds >= MIN_VALUE else None
+        groups = tuple(getattr(row, field) for field in GROUP_FIELDS)
+        for granularity in GRANULARITIES:
+            key = (granularity, floor_time(row.resolved_at, granularity)) + groups
+            entry = aggregates.get(key)
+            if entry is None:
+                entry = aggregates[key] = [0, 0.0, QuantileSketch()]
+            entry[0] += 1
+            entry[1] += seconds
+            if bucket is None:
+                entry[2].zero_count += 1
+            else:
+                entry[2].add_key(bucket)
+
+    ResolutionRollup.query.delete()
+    mappings = [
+        dict(zip(('granularity', 'bucket_start') + GROUP_FIELDS, key),
+             count=count, sum_seconds=total, sketch=sketch.serialize())
+        for key, (count, total, sketch) in aggregates.items()
+    ]
+    for i in range(0, len(mappings), batch_size):
+        db.session.execute(ResolutionRollup.__table__.insert(), mappings[i:i + batch_size])
+    db.session.commit()
+    return tickets
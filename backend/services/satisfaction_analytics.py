@@ -0,0 +1,126 @@
+import math
+from collections import Counter, namedtuple
+from sqlalchemy import func
+from database import db
+from models.satisfaction_rollup import SatisfactionRollup
+from services.resolution_analytics import floor_time, increment_rollup
+
+GROUP_FIELDS = ('building_id', 'department_id', 'assigned_to')
+RATINGS = range(1, 6)
+HISTOGRAM_COLUMNS = tuple(f'rating_{rating}' for rating in RATINGS)
+SUM_COLUMNS = ('count', 'rating_sum', 'rating_sum_squares') + HISTOGRAM_COLUMNS
+
+RatingSample = namedtuple('RatingSample', ('rated_at',) + GROUP_FIELDS + ('rating',))
+
+
+def rating_sample(ticket):
+    """What a ticket contributes to the rollups, or None if it is not rated"""
+    if ticket is None or not ticket.rating or not ticket.rated_at:
+        return None
+    return RatingSample(ticket.rated_at, ticket.building_id, ticket.department_id, ticket.assigned_to, ticket.rating)
+
+
+def _apply(sample, sign):
+    deltas = dict.fromkeys(SUM_COLUMNS, 0)
+    deltas.update({'count': sign, 'rating_sum': sign * sample.rating,
+                   'rating_sum_squares': sign * sample.rating ** 2, f'rating_{sample.rating}': sign})
+    increment_rollup(SatisfactionRollup,
+                     dict(bucket_start=floor_time(sample.rated_at, 'day'),
+                          **{field: getattr(sample, field) for field in GROUP_FIELDS}),
+                     deltas)
+
+
+def record_rating_change(before, ticket):
+    """Update the rollups for a ticket change; call before committing it
+
+    before is rating_sample(ticket) taken before the change (pass ticket=None
+    for a deletion), so a re-rated ticket moves instead of counting twice.
+    """
+    after = rating_sample(ticket)
+    if before == after:
+        return
+    if before:
+        _apply(before, -1)
+    if after:
+        _apply(after, 1)
+
+
+def summarize(sums):
+    """Count, mean, standard deviation, histogram and share of 4-5 star ratings"""
+    count = sums['count']
+    histogram = {str(rating): sums[f'rating_{rating}'] for rating in RATINGS}
+    if not count:
+        return {'count': 0, 'average': None, 'stddev': None, 'satisfied_pct': None, 'histogram': histogram}
+    mean = sums['rating_sum'] / count
+    variance = max(sums['rating_sum_squares'] / count - mean ** 2, 0.0)
+    return {
+        'count': count,
+        'average': round(mean, 2),
+        'stddev': round(math.sqrt(variance), 2),
+        'satisfied_pct': round(100 * (sums['rating_4'] + sums['rating_5']) / count, 1),
+        'histogram': histogram
+    }
+
+
+def satisfaction_stats(start, end, group_by=(), filters=None, interval=None):
+    """Rating statistics for ratings submitted in [start, end), per group
+
+    Summed in SQL over daily rollups; with interval ('day' or 'month') one row
+    per bucket is returned for each group.
+    """
+    columns = [getattr(SatisfactionRollup, field) for field in group_by]
+    if interval:
+        columns.append(SatisfactionRollup.bucket_start)
+    query = (db.session.query(*columns, *[func.sum(getattr(SatisfactionRollup, c)) for c in SUM_COLUMNS])
+             .filter(SatisfactionRollup.bucket_start >= floor_time(start, 'day'),
+                     SatisfactionRollup.bucket_start < end))
+    for field, value in (filters or {}).items():
+        query = query.filter(getattr(SatisfactionRollup, field) == value)
+    if columns:
+        query = query.group_by(*columns)
+
+    groups = {}
+    for row in query:
+        key = tuple(row[:len(columns)])
+        if interval:
+            key = key[:-1] + (floor_time(key[-1], interval),)
+        sums = groups.setdefault(key, Counter())
+        sums.update({column: value or 0 for column, value in zip(SUM_COLUMNS, row[len(columns):])})
+
+    results = []
+    for key, sums in groups.items():
+        result = dict(zip(group_by, key))
+        if interval:
+            result['bucket_start'] = key[-1].isoformat()
+        result.update(summarize(sums))
+        if result['count'] or not columns:
+            results.append(result)
+    results.sort(key=lambda r: (r.get('bucket_start', ''), -r['count']))
+    return results
+
+
+def rebuild_satisfaction_rollups(batch_size=5000):
+    """Recompute every rollup from the tickets; returns the number of ratings counted"""
+    from models.support_ticket import SupportTicket
+
+    aggregates = {}
+    query = (db.session.query(SupportTicket.rated_at, *[getattr(SupportTicket, field) for field in GROUP_FIELDS],
+                              SupportTicket.rating)
+             .filter(SupportTicket.rating.between(1, 5), SupportTicket.rated_at.isnot(None))
+             .yield_per(batch_size))
+    for row in query:
+        key = (floor_time(row.rated_at, 'day'),) + tuple(getattr(row, field) for field in GROUP_FIELDS)
+        sums = aggregates.get(key)
+        if sums is None:
+            sums = aggregates[key] = dict.fromkeys(SUM_COLUMNS, 0)
+        sums['count'] += 1
+        sums['rating_sum'] += row.rating
+        sums['rating_sum_squares'] += row.rating ** 2
+        sums[f'rating_{row.rating}'] += 1
+
+    SatisfactionRollup.query.delete()
+    mappings = [dict(zip(('bucket_start',) + GROUP_FIELDS, key), **sums) for key, sums in aggregates.items()]
+    for i in range(0, len(mappings), batch_size):
+        db.session.execute(SatisfactionRollup.__table__.insert(), mappings[i:i + batch_size])
+    db.session.commit()
+    return sum(sums['count'] for sums in aggregates.values())
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import or_, update
+from database import db
+from models.sla_target import SlaTarget
+from models.outbox_event import OutboxEvent
+from models.support_ticket import SupportTicket
+from services.metrics import Counter
+from services.jobs import periodic
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('pending', 'in_progress')
+DEFAULT_SLA_HOURS = {'urgent': 4, 'high': 8, 'medium': 24, 'low': 72}
+BREACH_TOPIC = 'sla.breached'
+FULL_SCAN_SECONDS = 3600
+
+SLA_BREACHES = Counter('sla_breaches_total', 'Tickets found past their SLA deadline', ('priority',))
+
+
+def scan_interval():
+    """Seconds between breach scan jobs (SLA_SCAN_SECONDS, 0 disables)"""
+    return float(os.getenv('SLA_SCAN_SECONDS', 60))
+
+
+def target_hours(priority, department_id):
+    """Hours allowed for a ticket: department target, else priority target, else the default"""
+    targets = sorted(SlaTarget.query.filter(
+        SlaTarget.priority == priority,
+        or_(SlaTarget.department_id == department_id, SlaTarget.department_id.is_(None))
+    ), key=lambda target: target.department_id is None)
+    if targets:
+        return targets[0].hours
+    return DEFAULT_SLA_HOURS.get(priority, DEFAULT_SLA_HOURS['medium'])
+
+
+def assign_due_at(ticket):
+    """Set ticket.due_at from its creation time and SLA target; call before committing"""
+    created_at = ticket.created_at or datetime.utcnow()
+    ticket.due_at = created_at + timedelta(hours=target_hours(ticket.priority, ticket.department_id))
+
+
+def reapply_targets(priority):
+    """Recompute due_at for open tickets of a priority after its targets changed
+
+    Tickets whose new deadline is still ahead are no longer marked breached.
+    Returns the number of tickets updated; the caller commits.
+    """
+    now = datetime.utcnow()
+    tickets = SupportTicket.query.filter(SupportTicket.status.in_(OPEN_STATUSES),
+                                         SupportTicket.priority == priority).all()
+    for ticket in tickets:
+        assign_due_at(ticket)
+        if ticket.breached_at and ticket.due_at > now:
+            ticket.breached_at = None
+    breach_scanner.request_full_scan()
+    return len(tickets)
+
+
+class BreachScanner:
+    """Marks open tickets whose due_at has passed and publishes one outbox event each
+
+    Scans read only the (status, due_at) index range between the previous scan
+    and now. A full scan of every overdue open ticket runs on the first call and
+    then hourly, to catch deadlines moved into the past or reopened tickets.
+    Claiming with a conditional UPDATE keeps several workers from publishing a
+    breach twice.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.watermark = None
+        self.last_full_scan = 0.0
+
+    def request_full_scan(self):
+        self.last_full_scan = 0.0
+
+    def scan(self, now=None):
+        """Find newly breached tickets, commit their events; returns the breached ticket ids"""
+        with self._lock:
+            now = now or datetime.utcnow()
+            query = db.session.query(
+                SupportTicket.id, SupportTicket.priority, SupportTicket.status, SupportTicket.due_at,
+                SupportTicket.building_id, SupportTicket.department_id, SupportTicket.issue_type
+            ).filter(SupportTicket.status.in_(OPEN_STATUSES),
+                     SupportTicket.due_at <= now,
+                     SupportTicket.breached_at.is_(None))
+            full_scan = self.watermark is None or time.time() - self.last_full_scan >= FULL_SCAN_SECONDS
+            if not full_scan:
+                query = query.filter(SupportTicket.due_at > self.watermark)
+
+            breached = []
+            for row in query.all():
+                claimed = db.session.execute(
+                    update(SupportTicket)
+                    .where(SupportTicket.id == row.id, SupportTicket.breached_at.is_(None))
+                    .values(breached_at=now)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if not claimed:
+                    continue
+                db.session.add(OutboxEvent(topic=BREACH_TOPIC, payload=json.dumps({
+                    'ticket_id': row.id,
+                    'priority': row.priority,
+                    'status': row.status,
+                    'building_id': row.building_id,
+                    'department_id': row.department_id,
+                    'issue_type': row.issue_type,
+                    'due_at': row.due_at.isoformat(),
+                    'breached_at': now.isoformat(),
+                    'overdue_minutes': round((now - row.due_at).total_seconds() / 60)
+                })))
+                breached.append(row)
+            db.session.commit()
+
+            self.watermark = now
+            if full_scan:
+                self.last_full_scan = time.time()
+            for row in breached:
+                SLA_BREACHES.inc(priority=row.priority)
+                logger.warning(f"SLA breached: ticket #{row.id} ({row.priority}, {row.status}) was due {row.due_at}")
+            return [row.id for row in breached]
+
+
+breach_scanner = BreachScanner()
+
+
+@periodic('sla.scan_breaches', every=scan_interval())
+def scan_breaches():
+    breach_scanner.scan()
@@ -0,0 +1,182 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import WatchedFileHandler
+from flask import has_request_context, request
+from services.query_stats import on_statement
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LOG_PATH = os.path.join(BACKEND_DIR, 'instance', 'slow_queries.log')
+PLAN_TTL_SECONDS = 300
+MAX_TRACKED_STATEMENTS = 500
+
+# Literals and expanded IN lists are folded so one query shape is one entry
+WHITESPACE = re.compile(r'\s+')
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+def threshold_ms():
+    """Statements slower than this are logged (SLOW_QUERY_MS, default 200; negative disables)"""
+    return float(os.getenv('SLOW_QUERY_MS', 200))
+
+
+def normalize_sql(statement):
+    text = WHITESPACE.sub(' ', statement).strip()
+    text = STRING_LITERAL.sub('?', text)
+    text = NUMBER_LITERAL.sub('?', text)
+    return PLACEHOLDER_LIST.sub('(?, ...)', text)
+
+
+def _value_shape(value):
+    if isinstance(value, str):
+        return f'str[{len(value)}]'
+    if isinstance(value, (list, tuple)):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany=False):
+    """Types (and string lengths) of the bound parameters, never their values"""
+    if executemany:
+        rows = list(parameters or [])
+        return {'executemany': len(rows), 'row': parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: _value_shape(value) for key, value in parameters.items()}
+    return [_value_shape(value) for value in (parameters or ())]
+
+
+class SlowQueryLog:
+    """Slow statements: a JSON-lines log shared by all workers plus per-process aggregates"""
+
+    def __init__(self):
+        self.stats = {}   # normalized sql -> aggregate
+        self.plans = {}   # normalized sql -> (captured at, plan)
+        self._lock = threading.Lock()
+        self._log = None
+
+    def _logger(self):
+        if self._log is None:
+            with self._lock:
+                if self._log is None:
+                    path = os.getenv('SLOW_QUERY_LOG', DEFAULT_LOG_PATH)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    # Every worker process appends to the same file, so rotation is left
+                    # to logrotate; the handler reopens the file once it has been moved
+                    handler = WatchedFileHandler(path)
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    log = logging.getLogger('slow_queries')
+                    log.setLevel(logging.INFO)
+                    log.propagate = False
+                    log.addHandler(handler)
+                    self._log = log
+        return self._log
+
+    def _plan(self, cursor, dialect, normalized, statement, parameters, executemany):
+        """EXPLAIN QUERY PLAN for SQLite SELECTs, cached per statement shape"""
+        if dialect != 'sqlite' or executemany or not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        cached = self.plans.get(normalized)
+        if cached and time.time() - cached[0] < PLAN_TTL_SECONDS:
+            return cached[1]
+        try:
+            explain = cursor.connection.cursor()
+            try:
+                explain.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ())
+                plan = [row[-1] for row in explain.fetchall()]
+            finally:
+                explain.close()
+        except Exception as e:
+            plan = [f'unavailable: {e}']
+        self.plans[normalized] = (time.time(), plan)
+        return plan
+
+    def record(self, cursor, dialect, statement, parameters, executemany, seconds):
+        normalized = normalize_sql(statement)
+        endpoint = request.endpoint if has_request_context() else threading.current_thread().name
+        entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'duration_ms': round(seconds * 1000, 2),
+            'endpoint': endpoint,
+            'sql': normalized,
+            'params': parameter_shape(parameters, executemany),
+            'plan': self._plan(cursor, dialect, normalized, statement, parameters, executemany),
+        }
+        try:
+            self._logger().info(json.dumps(entry, default=str))
+        except Exception as e:
+            logger.warning(f"Could not write slow query log: {e}")
+
+        with self._lock:
+            stats = self.stats.get(normalized)
+            if stats is None:
+                if len(self.stats) >= MAX_TRACKED_STATEMENTS:
+                    # Drop the cheapest statement to keep memory bounded
+                    del self.stats[min(self.stats, key=lambda sql: self.stats[sql]['total_ms'])]
+                stats = self.stats[normalized] = {'sql': normalized, 'count': 0, 'total_ms': 0.0,
+                                                  'max_ms': 0.0, 'endpoints': {}}
+            stats['count'] += 1
+            stats['total_ms'] += entry['duration_ms']
+            stats['max_ms'] = max(stats['max_ms'], entry['duration_ms'])
+            stats['endpoints'][endpoint] = stats['endpoints'].get(endpoint, 0) + 1
+            stats['last_params'] = entry['params']
+            stats['plan'] = entry['plan'] or stats.get('plan')
+
+    def top(self, limit=20, source='memory'):
+        """Statements ordered by total slow time, from this process or the log files"""
+        if source == 'log':
+            stats = self._aggregate_log()
+        else:
+            with self._lock:
+                stats = {sql: dict(s, endpoints=dict(s['endpoints'])) for sql, s in self.stats.items()}
+        offenders = sorted(stats.values(), key=lambda s: s['total_ms'], reverse=True)[:limit]
+        for s in offenders:
+            s['total_ms'] = round(s['total_ms'], 2)
+            s['avg_ms'] = round(s['total_ms'] / s['count'], 2) if s['count'] else 0.0
+        return offenders
+
+    def _aggregate_log(self):
+        """Aggregate every worker's entries from the log and its rotated copies (path.1, path.2, ...)"""
+        path = os.getenv('SLOW_QUERY_LOG', DEFAULT_LOG_PATH)
+        files = [path] + [f'{path}.{i}' for i in range(1, int(os.getenv('SLOW_QUERY_LOG_BACKUPS', 5)) + 1)]
+        stats = {}
+        for filename in files:
+            if not os.path.exists(filename):
+                continue
+            with open(filename) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    s = stats.setdefault(entry['sql'], {'sql': entry['sql'], 'count': 0, 'total_ms': 0.0,
+                                                        'max_ms': 0.0, 'endpoints': {}})
+                    s['count'] += 1
+                    s['total_ms'] += entry['duration_ms']
+                    s['max_ms'] = max(s['max_ms'], entry['duration_ms'])
+                    s['endpoints'][entry['endpoint']] = s['endpoints'].get(entry['endpoint'], 0) + 1
+                    s.setdefault('last_params', entry['params'])
+                    s['plan'] = s.get('plan') or entry.get('plan')
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.plans.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+@on_statement
+def _check_duration(conn, cursor, statement, parameters, executemany, seconds):
+    limit = threshold_ms()
+    if limit >= 0 and seconds * 1000 >= limit:
+        slow_query_log.record(cursor, conn.dialect.name, statement, parameters, executemany, seconds)
@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import case, event, func, or_
+from sqlalchemy.orm import Session
+from database import db
+from models.building import Building
+from models.floor import Floor
+from models.support_ticket import SupportTicket
+
+OPEN_STATUSES = ('pending', 'in_progress')
+
+
+def heatmap_ttl():
+    """Seconds a heatmap is served before it is recomputed (HEATMAP_TTL); ticket writes clear it sooner"""
+    return float(os.getenv('HEATMAP_TTL', 10))
+
+
+def ticket_heatmap(recent_hours=24):
+    """Open and recently created tickets per building x floor x issue type
+
+    All counts come from one grouped query over the open or recent tickets;
+    every floor is listed, including those without tickets.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=recent_hours)
+    is_open = SupportTicket.status.in_(OPEN_STATUSES)
+    is_recent = SupportTicket.created_at >= cutoff
+    rows = (db.session.query(
+                SupportTicket.building_id, SupportTicket.floor_id, SupportTicket.issue_type,
+                func.sum(case((is_open, 1), else_=0)), func.sum(case((is_recent, 1), else_=0)))
+            .filter(or_(is_open, is_recent))
+            .group_by(SupportTicket.building_id, SupportTicket.floor_id, SupportTicket.issue_type))
+
+    floors = {}
+    buildings = []
+    for building_id, name in db.session.query(Building.id, Building.name).order_by(Building.id):
+        buildings.append({'building_id': building_id, 'building_name': name, 'open': 0, 'recent': 0, 'floors': []})
+    by_building = {building['building_id']: building for building in buildings}
+    for floor_id, building_id, label in db.session.query(Floor.id, Floor.building_id, Floor.label).order_by(Floor.id):
+        floor = floors[floor_id] = {'floor_id': floor_id, 'floor_label': label, 'open': 0, 'recent': 0, 'issue_types': {}}
+        if building_id in by_building:
+            by_building[building_id]['floors'].append(floor)
+
+    issue_types = set()
+    for building_id, floor_id, issue_type, open_count, recent_count in rows:
+        floor, building = floors.get(floor_id), by_building.get(building_id)
+        if floor is None or building is None:
+            continue
+        issue_types.add(issue_type)
+        floor['issue_types'][issue_type] = {'open': int(open_count), 'recent': int(recent_count)}
+        for cell in (floor, building):
+            cell['open'] += int(open_count)
+            cell['recent'] += int(recent_count)
+
+    return {
+        'generated_at': datetime.utcnow().isoformat(),
+        'recent_hours': recent_hours,
+        'issue_types': sorted(issue_types),
+        'buildings': buildings
+    }
+
+
+class HeatmapCache:
+    """Heatmaps by recent window, kept for HEATMAP_TTL or until a ticket is written"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # recent_hours -> (expires_at, heatmap)
+        self._generation = 0
+
+    def get(self, recent_hours=24):
+        entry = self._entries.get(recent_hours)
+        if entry and entry[0] > time.time():
+            return entry[1]
+        generation = self._generation
+        heatmap = ticket_heatmap(recent_hours)
+        with self._lock:
+            # Don't cache a result that a concurrent ticket write may have made stale
+            if generation == self._generation:
+                self._entries[recent_hours] = (time.time() + heatmap_ttl(), heatmap)
+        return heatmap
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+heatmap_cache = HeatmapCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_ticket_writes(session, flush_context):
+    if any(isinstance(obj, SupportTicket) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['tickets_written'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('tickets_written', False):
+        heatmap_cache.invalidate()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_ticket_writes(session, previous_transaction):
+    session.info.pop('tickets_written', None)
@@ -0,0 +1,278 @@
+import os
+import math
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from database import db
+from models.support_ticket import SupportTicket
+from services.intent_matcher import tokenize
+
+logger = logging.getLogger(__name__)
+
+RESOLVED_STATUSES = ('resolved', 'closed')
+COMPACT_DEAD_FRACTION = 0.25  # Rebuild postings once this share of rows is retired
+COMPACT_MIN_DEAD = 256
+SYNC_OVERLAP = timedelta(seconds=5)  # Re-read recent changes in case of clock skew between workers
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by can cannot for from has have i in is it its me my no not of on or our
+please so that the their there this to was we were when which will with you your
+""".split())
+
+
+def resync_seconds():
+    """How stale this process's index may get relative to other workers' changes (TICKET_INDEX_RESYNC_SECONDS)"""
+    return float(os.getenv('TICKET_INDEX_RESYNC_SECONDS', 60))
+
+
+def _eligible():
+    return (SupportTicket.status.in_(RESOLVED_STATUSES),
+            SupportTicket.notes.isnot(None),
+            SupportTicket.notes != '')
+
+
+def _terms(text):
+    """Tokenize text for indexing, dropping stop words"""
+    return [token for token in tokenize(text) if token not in STOP_WORDS]
+
+
+class ResolvedTicketIndex:
+    """Incremental BM25 index over resolved tickets' issue type, description and notes
+
+    Postings are kept as plain lists so tickets can be added one at a time; each
+    term's postings are converted to NumPy arrays on first query and cached until
+    the term changes, so scoring a query is a handful of vectorized operations.
+    A re-indexed or removed ticket's row is masked out and its terms' document
+    frequencies decremented; once a quarter of the rows are dead the postings
+    are compacted. sync_from_db() applies changes other processes made since
+    the last build or sync.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+
+        self.ticket_ids = []       # row -> ticket id
+        self.documents = []        # row -> dict shown in answers (None once replaced)
+        self.lengths = []          # row -> document length in terms
+        self.row_terms = []        # row -> distinct terms (None once replaced)
+        self.rows_by_ticket = {}   # ticket id -> current row
+        self.unindexed = set()     # resolved tickets whose notes have no searchable terms
+        self.postings = {}         # term -> ([rows], [term frequencies])
+        self.doc_freqs = {}        # term -> live documents containing it
+        self.live_count = 0
+        self.total_length = 0
+        self.synced_at = None      # Changes made after this are not in the index yet
+
+        self._arrays = {}          # term -> (rows array, tf array)
+        self._length_array = None
+        self._live_mask = None
+
+    def __len__(self):
+        return self.live_count
+
+    def add(self, ticket_id, issue_type, description, notes):
+        """Index (or re-index) a resolved ticket"""
+        terms = _terms(f"{issue_type or ''} {description or ''} {notes or ''}")
+
+        with self._lock:
+            self._retire(ticket_id)
+            if not terms:
+                self.unindexed.add(ticket_id)
+                return
+            self.unindexed.discard(ticket_id)
+
+            row = len(self.ticket_ids)
+            self.ticket_ids.append(ticket_id)
+            self.documents.append({
+                'ticket_id': ticket_id,
+                'issue_type': issue_type,
+                'description': description,
+                'notes': notes
+            })
+            self.lengths.append(len(terms))
+            self.rows_by_ticket[ticket_id] = row
+            self.live_count += 1
+            self.total_length += len(terms)
+
+            frequencies = {}
+            for term in terms:
+                frequencies[term] = frequencies.get(term, 0) + 1
+            self.row_terms.append(tuple(frequencies))
+            for term, tf in frequencies.items():
+                rows, tfs = self.postings.setdefault(term, ([], []))
+                rows.append(row)
+                tfs.append(tf)
+                self.doc_freqs[term] = self.doc_freqs.get(term, 0) + 1
+                self._arrays.pop(term, None)
+
+            self._length_array = None
+            self._live_mask = None
+
+    def add_ticket(self, ticket):
+        """Index a SupportTicket model instance"""
+        self.add(ticket.id, ticket.issue_type, ticket.description, ticket.notes)
+
+    def remove(self, ticket_id):
+        """Drop a ticket from the index (reopened or deleted)"""
+        with self._lock:
+            self._retire(ticket_id)
+            self.unindexed.discard(ticket_id)
+
+    def _retire(self, ticket_id):
+        """Hide a ticket's previous row; its postings stay, masked out, until compaction"""
+        row = self.rows_by_ticket.pop(ticket_id, None)
+        if row is None:
+            return
+        self.documents[row] = None
+        self.live_count -= 1
+        self.total_length -= self.lengths[row]
+        for term in self.row_terms[row]:
+            self.doc_freqs[term] -= 1
+        self.row_terms[row] = None
+        self._live_mask = None
+
+        dead = len(self.ticket_ids) - self.live_count
+        if dead >= COMPACT_MIN_DEAD and dead > COMPACT_DEAD_FRACTION * len(self.ticket_ids):
+            self._compact()
+
+    def _compact(self):
+        """Renumber the live rows and drop dead rows from every posting list"""
+        live = [row for row, terms in enumerate(self.row_terms) if terms is not None]
+        new_rows = {row: i for i, row in enumerate(live)}
+        self.ticket_ids = [self.ticket_ids[row] for row in live]
+        self.documents = [self.documents[row] for row in live]
+        self.lengths = [self.lengths[row] for row in live]
+        self.row_terms = [self.row_terms[row] for row in live]
+        self.rows_by_ticket = {ticket_id: new_rows[row] for ticket_id, row in self.rows_by_ticket.items()}
+
+        postings = {}
+        for term, (rows, tfs) in self.postings.items():
+            if not self.doc_freqs.get(term):
+                self.doc_freqs.pop(term, None)
+                continue
+            kept = [(new_rows[row], tf) for row, tf in zip(rows, tfs) if row in new_rows]
+            postings[term] = ([row for row, _ in kept], [tf for _, tf in kept])
+        self.postings = postings
+        self._arrays = {}
+        self._length_array = None
+        self._live_mask = None
+
+    def _term_arrays(self, term):
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            rows, tfs = self.postings[term]
+            arrays = (np.array(rows, dtype=np.int64), np.array(tfs, dtype=np.float64))
+            self._arrays[term] = arrays
+        return arrays
+
+    def search(self, query, k=3):
+        """Return up to k (document, score) pairs, best first"""
+        with self._lock:
+            query_terms = [term for term in set(_terms(query)) if self.doc_freqs.get(term)]
+            if not query_terms or not self.live_count:
+                return []
+            if self._length_array is None:
+                self._length_array = np.array(self.lengths, dtype=np.float64)
+            if self._live_mask is None:
+                self._live_mask = np.array([doc is not None for doc in self.documents])
+
+            row_count = len(self.ticket_ids)
+            average_length = self.total_length / self.live_count
+            norm = self.k1 * (1 - self.b + self.b * self._length_array / average_length)
+            scores = np.zeros(row_count)
+
+            for term in query_terms:
+                rows, tfs = self._term_arrays(term)
+                df = self.doc_freqs[term]
+                idf = math.log(1 + (self.live_count - df + 0.5) / (df + 0.5))
+                scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm[rows])
+
+            scores[~self._live_mask] = 0
+            k = min(k, row_count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.documents[row], float(scores[row])) for row in top if scores[row] > 0]
+
+    def build_from_db(self, batch_size=1000):
+        """Index every resolved ticket that has resolution notes"""
+        self.synced_at = datetime.utcnow()
+        query = db.session.query(
+            SupportTicket.id,
+            SupportTicket.issue_type,
+            SupportTicket.description,
+            SupportTicket.notes
+        ).filter(*_eligible()).order_by(SupportTicket.id).yield_per(batch_size)
+
+        for ticket_id, issue_type, description, notes in query:
+            self.add(ticket_id, issue_type, description, notes)
+        return self
+
+    def sync_from_db(self, batch_size=1000):
+        """Apply tickets changed since the last build or sync
+
+        Returns False when the index no longer matches the database in size,
+        i.e. tickets were deleted elsewhere, and needs a full rebuild.
+        """
+        started = datetime.utcnow()
+        query = db.session.query(
+            SupportTicket.id,
+            SupportTicket.status,
+            SupportTicket.issue_type,
+            SupportTicket.description,
+            SupportTicket.notes
+        ).filter(SupportTicket.updated_at >= self.synced_at - SYNC_OVERLAP).yield_per(batch_size)
+
+        for ticket_id, status, issue_type, description, notes in query:
+            if status in RESOLVED_STATUSES and notes:
+                self.add(ticket_id, issue_type, description, notes)
+            else:
+                self.remove(ticket_id)
+        self.synced_at = started
+        expected = db.session.query(SupportTicket.id).filter(*_eligible()).count()
+        with self._lock:
+            return self.live_count + len(self.unindexed) == expected
+
+
+_index = None
+_synced_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_ticket_index():
+    """Return the process-wide index, building it from the database on first use
+
+    Every TICKET_INDEX_RESYNC_SECONDS it picks up tickets other workers
+    changed, and is rebuilt if tickets were deleted.
+    """
+    global _index, _synced_at
+    if _index is not None and time.time() - _synced_at < resync_seconds():
+        return _index
+    with _index_lock:
+        if _index is None:
+            _index = ResolvedTicketIndex().build_from_db()
+            logger.info(f"Resolved-ticket index built with {len(_index)} tickets")
+        elif time.time() - _synced_at >= resync_seconds() and not _index.sync_from_db():
+            _index = ResolvedTicketIndex().build_from_db()
+            logger.info(f"Resolved-ticket index rebuilt with {len(_index)} tickets after deletions")
+        _synced_at = time.time()
+    return _index
+
+
+def update_ticket_index(ticket):
+    """Keep the index current when a ticket's status or notes change"""
+    if _index is None:
+        return
+    if ticket.status in RESOLVED_STATUSES and ticket.notes:
+        _index.add_ticket(ticket)
+    else:
+        _index.remove(ticket.id)
+
+
+def remove_from_ticket_index(ticket_id):
+    """Drop a deleted ticket from the index"""
+    if _index is not None:
+        _index.remove(ticket_id)
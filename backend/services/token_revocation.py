@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from database import db
+from models.user import User
+from models.token_revocation import TokenRevocation
+
+logger = logging.getLogger(__name__)
+
+SYNC_INTERVAL = float(os.getenv('REVOCATION_SYNC_SECONDS', '5'))
+
+
+def _epoch(dt):
+    return (dt - datetime(1970, 1, 1)).total_seconds()
+
+
+class RevocationList:
+    """In-memory view of the token_revocations table
+
+    Checking a token is two dict lookups. Other workers' revocations are picked
+    up by an incremental sync (rows with id > last seen) at most every
+    SYNC_INTERVAL seconds, so normal requests never query the table.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.revoked = {}       # jti -> expiry (epoch seconds)
+        self.watermarks = {}    # user id -> (tokens issued before, expiry) in epoch seconds
+        self.last_id = 0
+        self.next_sync = 0.0
+
+    def is_revoked(self, payload):
+        """True if the decoded token was revoked individually or by a user watermark"""
+        if time.time() >= self.next_sync:
+            self.sync()
+
+        jti = payload.get('jti')
+        if jti is not None and jti in self.revoked:
+            return True
+
+        watermark = self.watermarks.get(payload.get('user_id'))
+        if watermark is not None:
+            issued_at = payload.get('iat')
+            return issued_at is None or issued_at < watermark[0]
+        return False
+
+    def sync(self):
+        """Load revocations written since the last sync and forget expired ones"""
+        now = time.time()
+        with self._lock:
+            if now < self.next_sync:
+                return
+            self.next_sync = now + SYNC_INTERVAL
+
+            rows = db.session.query(
+                TokenRevocation.id,
+                TokenRevocation.jti,
+                TokenRevocation.user_id,
+                TokenRevocation.issued_before,
+                TokenRevocation.expires_at
+            ).filter(
+                TokenRevocation.id > self.last_id,
+                TokenRevocation.expires_at > datetime.utcnow()
+            ).order_by(TokenRevocation.id).all()
+
+            for row_id, jti, user_id, issued_before, expires_at in rows:
+                self._remember(jti, user_id, issued_before and _epoch(issued_before), _epoch(expires_at))
+                self.last_id = row_id
+
+            self.revoked = {jti: exp for jti, exp in self.revoked.items() if exp > now}
+            self.watermarks = {uid: mark for uid, mark in self.watermarks.items() if mark[1] > now}
+
+    def _remember(self, jti, user_id, issued_before, expires_at):
+        if jti:
+            self.revoked[jti] = expires_at
+        elif user_id is not None and issued_before is not None:
+            current = self.watermarks.get(user_id)
+            if current is None or current[0] < issued_before:
+                self.watermarks[user_id] = (issued_before, expires_at)
+
+    def revoke_token(self, payload):
+        """Revoke one token (logout) until it would have expired anyway"""
+        jti = payload.get('jti')
+        if not jti:
+            # Tokens issued before jti existed can only be revoked per user
+            return self.revoke_user_tokens(payload['user_id'])
+
+        expires_at = datetime.utcfromtimestamp(payload['exp'])
+        db.session.add(TokenRevocation(jti=jti, user_id=payload.get('user_id'), expires_at=expires_at))
+        self._purge_expired_rows()
+        db.session.commit()
+        with self._lock:
+            self._remember(jti, None, None, _epoch(expires_at))
+
+    def revoke_user_tokens(self, user_id):
+        """Revoke every token the user holds now (password change or reset)"""
+        issued_before = datetime.utcnow()
+        expires_at = issued_before + User.TOKEN_LIFETIME
+        db.session.add(TokenRevocation(user_id=user_id, issued_before=issued_before, expires_at=expires_at))
+        self._purge_expired_rows()
+        db.session.commit()
+        with self._lock:
+            self._remember(None, user_id, _epoch(issued_before), _epoch(expires_at))
+
+    @staticmethod
+    def _purge_expired_rows():
+        TokenRevocation.query.filter(TokenRevocation.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,179 @@
+import os
+import zlib
+import logging
+import threading
+import numpy as np
+from services.intent_matcher import tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'triage_model.npz')
+NUM_FEATURES = 1 << 16
+VALID_PRIORITIES = ('low', 'medium', 'high', 'urgent')
+
+
+def normalize_issue_type(issue_type):
+    """Canonical form used as the issue_type label"""
+    return ' '.join(tokenize(issue_type))
+
+
+def hash_features(text):
+    """Hashed unigram and bigram feature indices for the text"""
+    tokens = tokenize(text)
+    grams = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+    return np.fromiter((zlib.crc32(g.encode('utf-8')) % NUM_FEATURES for g in grams), dtype=np.int64, count=len(grams))
+
+
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over hashed text features"""
+
+    def __init__(self, classes, class_log_prior, feature_log_prob):
+        self.classes = list(classes)
+        self.class_log_prior = class_log_prior
+        self.feature_log_prob = feature_log_prob   # (classes, NUM_FEATURES)
+
+    @classmethod
+    def train(cls, texts, labels, alpha=1.0, min_count=1):
+        """Fit from parallel lists of texts and labels; rare labels are dropped"""
+        counts = {}
+        for label in labels:
+            counts[label] = counts.get(label, 0) + 1
+        classes = sorted(label for label, count in counts.items() if label and count >= min_count)
+        if not classes:
+            return None
+
+        class_index = {label: i for i, label in enumerate(classes)}
+        feature_counts = np.zeros((len(classes), NUM_FEATURES), dtype=np.float64)
+        class_counts = np.zeros(len(classes), dtype=np.float64)
+
+        for text, label in zip(texts, labels):
+            row = class_index.get(label)
+            if row is None:
+                continue
+            class_counts[row] += 1
+            np.add.at(feature_counts[row], hash_features(text), 1)
+
+        smoothed = feature_counts + alpha
+        feature_log_prob = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+        class_log_prior = np.log(class_counts) - np.log(class_counts.sum())
+        return cls(classes, class_log_prior, feature_log_prob.astype(np.float32))
+
+    def predict(self, text):
+        """Return (label, probability) for a single text"""
+        features = hash_features(text)
+        scores = self.class_log_prior + self.feature_log_prob[:, features].sum(axis=1)
+        best = int(np.argmax(scores))
+        probabilities = np.exp(scores - scores[best])
+        return self.classes[best], float(1.0 / probabilities.sum())
+
+    def predict_batch(self, texts):
+        """Return the predicted label for every text in one vectorized pass"""
+        if not texts:
+            return []
+        feature_lists = [hash_features(text) for text in texts]
+        lengths = np.array([len(f) for f in feature_lists])
+        all_features = np.concatenate(feature_lists) if lengths.sum() else np.zeros(0, dtype=np.int64)
+
+        scores = np.tile(self.class_log_prior[:, None], (1, len(texts)))
+        nonempty = lengths > 0
+        if nonempty.any():
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+            sums = np.add.reduceat(self.feature_log_prob[:, all_features], offsets, axis=1)
+            scores[:, nonempty] += sums
+        return [self.classes[i] for i in np.argmax(scores, axis=0)]
+
+
+class TriageModel:
+    """Priority and issue-type classifiers trained from historical tickets"""
+
+    def __init__(self, priority_model, issue_type_model):
+        self.priority_model = priority_model
+        self.issue_type_model = issue_type_model
+
+    @staticmethod
+    def ticket_text(issue_type, description):
+        return f"{issue_type or ''} {description or ''}"
+
+    def suggest(self, issue_type, description):
+        """Return {'priority': ..., 'issue_type': ...} suggestions for one ticket"""
+        text = self.ticket_text(issue_type, description)
+        suggestion = {'priority': None, 'issue_type': None}
+        if self.priority_model:
+            suggestion['priority'] = self.priority_model.predict(text)[0]
+        if self.issue_type_model:
+            suggestion['issue_type'] = self.issue_type_model.predict(description or issue_type)[0]
+        return suggestion
+
+    def suggest_batch(self, rows):
+        """Suggestions for a list of (issue_type, description) pairs"""
+        texts = [self.ticket_text(issue_type, description) for issue_type, description in rows]
+        priorities = self.priority_model.predict_batch(texts) if self.priority_model else [None] * len(rows)
+        issue_types = (
+            self.issue_type_model.predict_batch([description or issue_type for issue_type, description in rows])
+            if self.issue_type_model else [None] * len(rows)
+        )
+        return [{'priority': p, 'issue_type': t} for p, t in zip(priorities, issue_types)]
+
+    def save(self, path=None):
+        path = path or os.getenv('TRIAGE_MODEL_PATH', DEFAULT_MODEL_PATH)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {}
+        for name, model in (('priority', self.priority_model), ('issue_type', self.issue_type_model)):
+            if model:
+                arrays[f'{name}_classes'] = np.array(model.classes)
+                arrays[f'{name}_prior'] = model.class_log_prior
+                arrays[f'{name}_log_prob'] = model.feature_log_prob
+        np.savez_compressed(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or os.getenv('TRIAGE_MODEL_PATH', DEFAULT_MODEL_PATH)
+        with np.load(path) as data:
+            models = []
+            for name in ('priority', 'issue_type'):
+                if f'{name}_classes' in data:
+                    models.append(NaiveBayesClassifier(
+                        [str(c) for c in data[f'{name}_classes']],
+                        data[f'{name}_prior'],
+                        data[f'{name}_log_prob']
+                    ))
+                else:
+                    models.append(None)
+        return cls(*models)
+
+
+def train_triage_model(rows, min_count=5):
+    """Train from (issue_type, description, priority) rows"""
+    rows = list(rows)
+    texts = [TriageModel.ticket_text(issue_type, description) for issue_type, description, priority in rows]
+    priorities = [priority if priority in VALID_PRIORITIES else None for issue_type, description, priority in rows]
+    descriptions = [description or '' for issue_type, description, priority in rows]
+    issue_types = [normalize_issue_type(issue_type) for issue_type, description, priority in rows]
+
+    return TriageModel(
+        NaiveBayesClassifier.train(texts, priorities, min_count=min_count),
+        NaiveBayesClassifier.train(descriptions, issue_types, min_count=min_count)
+    )
+
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+
+def get_triage_model():
+    """Return the trained model, or None if it has not been trained yet"""
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                try:
+                    _model = TriageModel.load()
+                    logger.info("Triage model loaded")
+                except FileNotFoundError:
+                    logger.info("No triage model found - run 'python -m utils.train_triage' to enable suggestions")
+                except Exception as e:
+                    logger.error(f"Failed to load triage model: {e}")
+                _model_loaded = True
+    return _model
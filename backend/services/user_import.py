@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+import secrets
+import string
+from database import db
+from models.user import User
+from models.department import Department
+from services.passwords import password_hasher
+
+VALID_ROLES = ('ADMIN', 'AGENT', 'VIEWER')
+MAX_IMPORT_ROWS = 10000
+INSERT_BATCH_SIZE = 500
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+
+
+def generate_password(length=8):
+    """Random temporary password"""
+    return ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(length))
+
+
+def parse_rows(body, content_type):
+    """Parse a CSV (with header) or NDJSON body into a list of dicts
+
+    Raises ValueError naming the line of any NDJSON line that is not a JSON object.
+    """
+    text = body.decode('utf-8-sig') if isinstance(body, bytes) else body
+    if 'json' in (content_type or ''):
+        rows = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f'line {number}: {e}') from None
+            if not isinstance(row, dict):
+                raise ValueError(f'line {number}: expected a JSON object, got {type(row).__name__}')
+            rows.append(row)
+        return rows
+    return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+
+
+def _as_bool(value, default):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def import_users(rows):
+    """Create users from parsed rows; returns (created count, per-row report)
+
+    Usernames are checked against existing users in one query per 500 names,
+    passwords are hashed in parallel by the password pool and users are inserted
+    in batches within a single transaction.
+    """
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise ValueError(f'Import is limited to {MAX_IMPORT_ROWS} rows')
+
+    departments = {name.lower(): dept_id for dept_id, name in db.session.query(Department.id, Department.name)}
+    department_ids = set(departments.values())
+
+    names = list({str(row.get('username') or '').strip() for row in rows} - {''})
+    existing = set()
+    for i in range(0, len(names), 500):
+        chunk = names[i:i + 500]
+        existing.update(name for (name,) in db.session.query(User.username).filter(User.username.in_(chunk)))
+
+    report = []
+    pending = []      # (report entry, user mapping, plain password)
+    seen = set()
+
+    for number, row in enumerate(rows, 1):
+        username = str(row.get('username') or '').strip()
+        entry = {'row': number, 'username': username}
+        report.append(entry)
+
+        role = str(row.get('role') or 'VIEWER').strip().upper()
+        department = row.get('department_id') or row.get('department')
+        department_id = None
+        if department not in (None, ''):
+            if str(department).isdigit() and int(department) in department_ids:
+                department_id = int(department)
+            else:
+                department_id = departments.get(str(department).strip().lower())
+
+        error = None
+        if not username:
+            error = 'Username is required'
+        elif username in existing:
+            error = 'Username already exists'
+        elif username in seen:
+            error = 'Duplicate username in import'
+        elif role not in VALID_ROLES:
+            error = f'Invalid role: {role}'
+        elif department not in (None, '') and department_id is None:
+            error = f'Department not found: {department}'
+
+        if error:
+            entry.update({'status': 'error', 'error': error})
+            continue
+
+        seen.add(username)
+        password = str(row.get('password') or '')
+        if not password:
+            password = generate_password()
+            entry['temporary_password'] = password
+
+        pending.append((entry, {
+            'username': username,
+            'role': role,
+            'department_id': department_id,
+            'active': _as_bool(row.get('active'), True),
+            'must_change_password': _as_bool(row.get('must_change_password'), True)
+        }, password))
+
+    hashes = password_hasher.hash_many([password for _, _, password in pending])
+    mappings = []
+    for (entry, mapping, _), password_hash in zip(pending, hashes):
+        mapping['password_hash'] = password_hash
+        mappings.append(mapping)
+        entry['status'] = 'created'
+
+    try:
+        for i in range(0, len(mappings), INSERT_BATCH_SIZE):
+            db.session.bulk_insert_mappings(User, mappings[i:i + INSERT_BATCH_SIZE])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(mappings), report
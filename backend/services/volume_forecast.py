@@ -0,0 +1,196 @@
+import os
+import math
+import time
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+import numpy as np
+from database import db
+from models.volume_rollup import VolumeRollup
+from services.resolution_analytics import floor_time, increment_rollup
+from services.jobs import periodic
+
+WEEK_HOURS = 168
+HISTORY_WEEKS = 12
+HORIZON_HOURS = 168
+LEVEL_SMOOTHING = 0.3     # weight of the latest week in the weekly level
+TREND_SMOOTHING = 0.1
+TREND_DAMPING = 0.9
+SEASON_SMOOTHING = 0.2    # weight of the latest week in the weekday x hour profile
+Z_90 = 1.645              # two-sided 90% band
+
+
+def forecast_ttl():
+    """Seconds a computed forecast is served before it is recomputed (FORECAST_TTL)"""
+    return float(os.getenv('FORECAST_TTL', 300))
+
+
+def record_ticket_created(ticket, sign=1):
+    """Count a new ticket in its hourly bucket (sign=-1 on deletion); call before committing"""
+    if ticket.created_at is None:
+        return
+    increment_rollup(VolumeRollup,
+                     dict(bucket_start=floor_time(ticket.created_at, 'hour'), building_id=ticket.building_id),
+                     dict(count=sign))
+
+
+def hourly_counts(start, end, building_ids):
+    """Tickets created per hour in [start, end) as a (buildings, hours) array"""
+    hours = math.ceil((end - start).total_seconds() / 3600)
+    index = {building_id: i for i, building_id in enumerate(building_ids)}
+    counts = np.zeros((len(building_ids), hours))
+    rows = (db.session.query(VolumeRollup.bucket_start, VolumeRollup.building_id, VolumeRollup.count)
+            .filter(VolumeRollup.bucket_start >= start, VolumeRollup.bucket_start < end,
+                    VolumeRollup.building_id.in_(building_ids)))
+    for bucket_start, building_id, count in rows:
+        counts[index[building_id], int((bucket_start - start).total_seconds() // 3600)] = count
+    return counts
+
+
+def seasonal_forecast(history, horizon=HORIZON_HOURS):
+    """Expected hourly counts for every row of history, shape (series, horizon)
+
+    history holds whole weeks of hourly counts ending where the forecast
+    starts. Weekly totals get a damped Holt level and trend; each week is
+    split over its 168 weekday x hour slots by exponentially weighted shares
+    of past weeks. Every step works on all series at once.
+    """
+    series, weeks = history.shape[0], history.shape[1] // WEEK_HOURS
+    by_week = history[:, -weeks * WEEK_HOURS:].reshape(series, weeks, WEEK_HOURS)
+    totals = by_week.sum(axis=2)
+
+    level, trend = totals[:, 0], np.zeros(series)
+    for week in range(1, weeks):
+        previous = level
+        level = LEVEL_SMOOTHING * totals[:, week] + (1 - LEVEL_SMOOTHING) * (level + TREND_DAMPING * trend)
+        trend = TREND_SMOOTHING * (level - previous) + (1 - TREND_SMOOTHING) * TREND_DAMPING * trend
+
+    weights = (1 - SEASON_SMOOTHING) ** np.arange(weeks - 1, -1, -1)
+    weighted = np.einsum('swh,w->sh', by_week, weights)
+    shares = weighted / np.maximum(weighted.sum(axis=1, keepdims=True), 1e-9)
+
+    ahead = np.arange(horizon) // WEEK_HOURS + 1
+    damping = np.cumsum(TREND_DAMPING ** np.arange(1, ahead[-1] + 1))[ahead - 1]
+    weekly = np.maximum(level[:, None] + damping[None, :] * trend[:, None], 0)
+    return weekly * shares[:, np.arange(horizon) % WEEK_HOURS]
+
+
+def forecast_bands(history, horizon=HORIZON_HOURS):
+    """Expected counts with a 90% band, each shaped (series, horizon)
+
+    Ticket arrivals are roughly Poisson but burstier; the overdispersion is
+    estimated by forecasting the last history week from the ones before it.
+    """
+    expected = seasonal_forecast(history, horizon)
+    dispersion = np.ones(history.shape[0])
+    if history.shape[1] >= 3 * WEEK_HOURS:
+        predicted = seasonal_forecast(history[:, :-WEEK_HOURS], WEEK_HOURS)
+        residuals = history[:, -WEEK_HOURS:] - predicted
+        dispersion = np.maximum((residuals ** 2).mean(axis=1) / np.maximum(predicted.mean(axis=1), 1e-9), 1)
+    spread = Z_90 * np.sqrt(dispersion[:, None] * expected)
+    return expected, np.maximum(expected - spread, 0), expected + spread
+
+
+class ForecastCache:
+    """Latest forecast for every building, recomputed after FORECAST_TTL"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._forecast = None
+
+    def refresh(self):
+        """Recompute all buildings' forecasts starting at the current hour"""
+        from models.building import Building
+
+        start = floor_time(datetime.utcnow(), 'hour')
+        building_ids = [building_id for building_id, in db.session.query(Building.id).order_by(Building.id)]
+        history = hourly_counts(start - timedelta(weeks=HISTORY_WEEKS), start, building_ids)
+        expected, low, high = forecast_bands(history)
+        forecast = {
+            'start': start,
+            'generated_at': time.time(),
+            'buildings': {building_id: (expected[i], low[i], high[i]) for i, building_id in enumerate(building_ids)}
+        }
+        with self._lock:
+            self._forecast = forecast
+        return forecast
+
+    def get(self):
+        forecast = self._forecast
+        if (forecast is None or time.time() - forecast['generated_at'] > forecast_ttl()
+                or forecast['start'] != floor_time(datetime.utcnow(), 'hour')):
+            forecast = self.refresh()
+        return forecast
+
+    def clear(self):
+        with self._lock:
+            self._forecast = None
+
+
+forecast_cache = ForecastCache()
+
+
+@periodic('analytics.refresh_forecast', every=forecast_ttl())
+def refresh_forecast():
+    """Recompute forecasts in the background so requests rarely pay for it"""
+    forecast_cache.refresh()
+
+
+def volume_series(start, end, building_ids, interval='hour'):
+    """Created-ticket counts per building as {building_id: [(bucket_start, count), ...]}"""
+    start = floor_time(start, 'hour')
+    counts = hourly_counts(start, end, building_ids)
+    buckets = [start + timedelta(hours=i) for i in range(counts.shape[1])]
+    return {building_id: _bucket(buckets, counts[i], interval) for i, building_id in enumerate(building_ids)}
+
+
+def volume_forecast(building_ids, hours=HORIZON_HOURS, interval='hour'):
+    """Forecast per building as {building_id: [(bucket_start, expected, low, high), ...]}"""
+    forecast = forecast_cache.get()
+    buckets = [forecast['start'] + timedelta(hours=i) for i in range(min(hours, HORIZON_HOURS))]
+    results = {}
+    for building_id in building_ids:
+        if building_id not in forecast['buildings']:
+            continue
+        expected, low, high = (values[:len(buckets)] for values in forecast['buildings'][building_id])
+        # Bands of summed buckets add in variance, not in width
+        variances = ((high - expected) / Z_90) ** 2
+        rows = zip(_bucket(buckets, expected, interval), _bucket(buckets, variances, interval))
+        results[building_id] = [
+            (bucket_start, total, max(total - Z_90 * np.sqrt(variance), 0), total + Z_90 * np.sqrt(variance))
+            for (bucket_start, total), (_, variance) in rows
+        ]
+    return results
+
+
+def _bucket(buckets, values, interval):
+    """Sum hourly values into hour or day buckets"""
+    if interval == 'hour':
+        return [(bucket, float(value)) for bucket, value in zip(buckets, values)]
+    days = Counter()
+    for bucket, value in zip(buckets, values):
+        days[floor_time(bucket, 'day')] += float(value)
+    return sorted(days.items())
+
+
+def rebuild_volume_rollups(batch_size=5000):
+    """Recompute every hourly volume bucket from the tickets; returns the number of tickets counted"""
+    from models.support_ticket import SupportTicket
+
+    counts = Counter()
+    query = (db.session.query(SupportTicket.created_at, SupportTicket.building_id)
+             .filter(SupportTicket.created_at.isnot(None))
+             .yield_per(batch_size))
+    for created_at, building_id in query:
+        counts[(created_at.replace(minute=0, second=0, microsecond=0), building_id)] += 1
+
+    VolumeRollup.query.delete()
+    mappings = [
+        {'bucket_start': bucket_start, 'building_id': building_id, 'count': count}
+        for (bucket_start, building_id), count in counts.items()
+    ]
+    for i in range(0, len(mappings), batch_size):
+        db.session.execute(VolumeRollup.__table__.insert(), mappings[i:i + batch_size])
+    db.session.commit()
+    forecast_cache.clear()
+    return sum(counts.values())
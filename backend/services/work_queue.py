@@ -0,0 +1,85 @@
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+from sqlalchemy import update
+from database import db
+from models.support_ticket import SupportTicket
+from services.assignment import AssignmentSample, record_assignment_change, ticket_weight
+from services.metrics import Counter
+
+PRIORITY_ORDER = ('urgent', 'high', 'medium', 'low')
+CANDIDATES = 8   # Tickets read per attempt; losing a race moves on to the next one
+MAX_ROUNDS = 5
+
+TICKET_CLAIMS = Counter('ticket_claims_total', 'claim-next requests by outcome (claimed, empty)', ('outcome',))
+CLAIM_CONFLICTS = Counter('ticket_claim_conflicts_total', 'Tickets another agent claimed first during claim-next')
+
+# SQLite has one writer per database, so claims are serialized per process
+# anyway; claimers that queue here get it in turn instead of sleeping in
+# SQLite's busy handler, which cut p99 latency tenfold at 16 agents. Claims
+# from other processes still wait in the busy handler.
+_sqlite_claim_lock = threading.Lock()
+
+
+def _candidates(department_id):
+    """The oldest pending tickets of the most urgent priority that has any
+
+    One query per priority, each an index range scan on
+    (department_id, status, priority, created_at).
+    """
+    for priority in PRIORITY_ORDER:
+        rows = (db.session.query(SupportTicket.id, SupportTicket.assigned_to_id)
+                .filter(SupportTicket.department_id == department_id,
+                        SupportTicket.status == 'pending',
+                        SupportTicket.priority == priority)
+                .order_by(SupportTicket.created_at, SupportTicket.id)
+                .limit(CANDIDATES)
+                .all())
+        if rows:
+            return rows
+    return []
+
+
+def claim_next(user, department_id):
+    """Move the most urgent, oldest pending ticket in a department to in_progress for user
+
+    Any pending ticket is claimable, including ones auto-assigned to another
+    agent when they were created; their load moves to user in the same
+    transaction, as with assign(). Each candidate is taken with a conditional
+    UPDATE ... RETURNING that matches only while the ticket is still pending
+    and assigned as it was read, so two agents can never claim the same
+    ticket and the loser of a race moves on to the next candidate instead of
+    retrying it. Commits and returns the ticket, or None when nothing is left
+    to claim.
+    """
+    lock = _sqlite_claim_lock if db.engine.dialect.name == 'sqlite' else nullcontext()
+    with lock:
+        return _claim_next(user, department_id)
+
+
+def _claim_next(user, department_id):
+    for _ in range(MAX_ROUNDS):
+        candidates = _candidates(department_id)
+        if not candidates:
+            break
+        for ticket_id, previous_id in candidates:
+            unchanged = (SupportTicket.assigned_to_id == previous_id if previous_id
+                         else SupportTicket.assigned_to_id.is_(None))
+            ticket = db.session.scalars(
+                update(SupportTicket)
+                .where(SupportTicket.id == ticket_id, SupportTicket.status == 'pending', unchanged)
+                .values(status='in_progress', assigned_to_id=user.id, assigned_to=user.username,
+                        updated_at=datetime.utcnow())
+                .returning(SupportTicket)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if ticket is None:
+                CLAIM_CONFLICTS.inc()
+                continue
+            before = AssignmentSample(previous_id, ticket_weight(ticket)) if previous_id else None
+            record_assignment_change(before, ticket)
+            db.session.commit()
+            TICKET_CLAIMS.inc(outcome='claimed')
+            return ticket
+    TICKET_CLAIMS.inc(outcome='empty')
+    return None
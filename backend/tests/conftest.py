@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# The app reads its configuration at import time
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='ict-tests-'), 'test.db')}"
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+os.environ['JOB_WORKERS'] = '0'
+os.environ['BCRYPT_ROUNDS'] = '4'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    from database import db
+    from utils.seed_data import seed_database
+    from utils.generate_data import generate_tickets
+
+    app.testing = True
+    with app.app_context():
+        db.create_all()
+        seed_database()
+        generate_tickets(500, days=30, verbose=False)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def admin_headers(app):
+    from utils.seed_data import ADMIN_USERNAME, ADMIN_PASSWORD
+
+    response = app.test_client().post('/api/login', json={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
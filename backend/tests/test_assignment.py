@@ -0,0 +1,142 @@
+"""Agent loads: changed with the ticket's transaction, kept in memory only once it commits"""
+import pytest
+
+
+@pytest.fixture
+def department(app):
+    """A department of its own with two agents and no tickets"""
+    from database import db
+    from models.department import Department
+    from models.user import User
+    from services.assignment import assignment_engine
+
+    with app.app_context():
+        department = Department(name=f'Assignment Test {Department.query.count()}')
+        db.session.add(department)
+        db.session.flush()
+        agents = [User(username=f'assign_agent_{department.id}_{i}', role='AGENT', department_id=department.id)
+                  for i in range(2)]
+        for agent in agents:
+            agent.set_password('Assign@agent1')
+        db.session.add_all(agents)
+        db.session.commit()
+        assignment_engine.invalidate()
+        yield department.id, [agent.id for agent in agents]
+        db.session.rollback()
+
+
+def new_ticket(department_id, priority='high'):
+    from database import db
+    from models.floor import Floor
+    from models.support_ticket import SupportTicket
+
+    floor = Floor.query.first()
+    ticket = SupportTicket(building_id=floor.building_id, floor_id=floor.id, department_id=department_id,
+                           issue_type='Network', description='assignment test', priority=priority, status='pending')
+    db.session.add(ticket)
+    return ticket
+
+
+def stored_load(user_id):
+    from database import db
+    from models.user import User
+
+    return db.session.query(User.assignment_load).filter(User.id == user_id).scalar()
+
+
+def test_rollback_leaves_loads_unchanged(department):
+    from database import db
+    from services.assignment import assignment_engine, auto_assign
+
+    department_id, agents = department
+    agent = auto_assign(new_ticket(department_id))
+    assert agent.id in agents
+    # Nothing changes in memory before the commit
+    assert assignment_engine.loads()[agent.id] == 0
+    db.session.rollback()
+
+    assert assignment_engine.loads()[agent.id] == 0
+    assert stored_load(agent.id) == 0
+
+
+def test_commit_applies_loads_in_memory_and_database(department):
+    from database import db
+    from services.assignment import PRIORITY_WEIGHTS, assignment_engine, auto_assign
+
+    department_id, agents = department
+    first = auto_assign(new_ticket(department_id, 'urgent'))
+    db.session.commit()
+    second = auto_assign(new_ticket(department_id, 'low'))
+    db.session.commit()
+
+    # The least-loaded agent gets the next ticket
+    assert {first.id, second.id} == set(agents)
+    assert assignment_engine.loads()[first.id] == stored_load(first.id) == PRIORITY_WEIGHTS['urgent']
+    assert assignment_engine.loads()[second.id] == stored_load(second.id) == PRIORITY_WEIGHTS['low']
+    assert auto_assign(new_ticket(department_id)).id == second.id
+    db.session.rollback()
+
+
+def test_sync_inside_a_rolled_back_transaction_is_discarded(department):
+    from database import db
+    from services.assignment import assignment_engine, auto_assign
+
+    department_id, agents = department
+    agent = auto_assign(new_ticket(department_id))
+    # A resync inside the transaction reads the uncommitted load
+    assignment_engine.sync()
+    assert assignment_engine.loads()[agent.id] > 0
+    db.session.rollback()
+
+    assignment_engine.pick(department_id)
+    assert assignment_engine.loads()[agent.id] == 0
+
+
+def test_routes_move_loads_with_the_ticket(app, client, department):
+    from database import db
+    from models.support_ticket import SupportTicket
+    from services.assignment import PRIORITY_WEIGHTS
+
+    department_id, agents = department
+    floor_id, building_id = db.session.query(SupportTicket.floor_id, SupportTicket.building_id).first()
+    created = []
+    for priority in ('urgent', 'high'):
+        response = client.post('/api/tickets', json={
+            'building': building_id, 'floor': floor_id, 'department': department_id, 'issue_type': 'Network',
+            'description': f'assignment route test {priority}', 'priority': priority})
+        assert response.status_code == 201
+        created.append(response.get_json()['ticket_id'])
+
+    with app.app_context():
+        owners = {ticket.id: ticket.assigned_to_id for ticket in SupportTicket.query.filter(SupportTicket.id.in_(created))}
+        assert set(owners.values()) == set(agents)
+        assert stored_load(owners[created[0]]) == PRIORITY_WEIGHTS['urgent']
+
+    # Reassigning moves the load; resolving and deleting release it
+    target = owners[created[1]]
+    assert client.put(f'/api/tickets/{created[0]}/assign', json={'assigned_to_id': target}).status_code == 200
+    with app.app_context():
+        assert stored_load(owners[created[0]]) == 0
+        assert stored_load(target) == PRIORITY_WEIGHTS['urgent'] + PRIORITY_WEIGHTS['high']
+
+    assert client.put(f'/api/tickets/{created[0]}/status', json={'status': 'resolved'}).status_code == 200
+    assert client.delete(f'/api/tickets/{created[1]}').status_code == 200
+    with app.app_context():
+        assert stored_load(target) == 0
+
+
+def test_recount_repairs_drift(department):
+    from database import db
+    from models.user import User
+    from services.assignment import PRIORITY_WEIGHTS, assignment_engine, auto_assign, recount_loads
+
+    department_id, agents = department
+    agent = auto_assign(new_ticket(department_id, 'medium'))
+    db.session.commit()
+    db.session.query(User).filter(User.id.in_(agents)).update({'assignment_load': 40}, synchronize_session=False)
+    db.session.commit()
+
+    assert recount_loads() >= 2
+    assert stored_load(agent.id) == PRIORITY_WEIGHTS['medium']
+    assert assignment_engine.loads()[agent.id] == PRIORITY_WEIGHTS['medium']
+    assert recount_loads() == 0
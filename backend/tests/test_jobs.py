@@ -0,0 +1,186 @@
+"""Job runner: claiming, retries with backoff, reaping stale jobs and periodic scheduling"""
+import threading
+from datetime import datetime, timedelta
+import pytest
+from services import jobs
+from services.jobs import JobRunner, backoff_seconds, enqueue
+
+calls = []
+
+
+def record(**kwargs):
+    calls.append(kwargs)
+
+
+def fail(**kwargs):
+    calls.append(kwargs)
+    raise RuntimeError('job failed on purpose')
+
+
+@pytest.fixture(autouse=True)
+def isolated_jobs(app, monkeypatch):
+    """Test tasks registered, no other jobs in the table"""
+    from database import db
+    from models.job import Job
+
+    monkeypatch.setitem(jobs.TASKS, 'test.record', (record, 5))
+    monkeypatch.setitem(jobs.TASKS, 'test.fail', (fail, 3))
+    calls.clear()
+    with app.app_context():
+        Job.query.delete()
+        db.session.commit()
+        yield
+        db.session.rollback()
+        Job.query.delete()
+        db.session.commit()
+
+
+@pytest.fixture
+def runner(app):
+    return JobRunner(app, workers=0)
+
+
+def add(name, **kwargs):
+    from database import db
+
+    job = enqueue(name, **kwargs)
+    db.session.commit()
+    return job.id
+
+
+def test_claim_takes_due_jobs_once(runner):
+    from database import db
+    from models.job import Job
+
+    later = add('test.record', delay=3600)
+    due = add('test.record')
+
+    job = runner.claim('worker-a')
+    assert job.id == due
+    assert (job.status, job.attempts, job.locked_by) == ('running', 1, 'worker-a')
+    assert runner.claim('worker-b') is None
+    assert db.session.get(Job, later).status == 'queued'
+
+
+def test_concurrent_claims_never_share_a_job(app, runner):
+    ids = {add('test.record') for _ in range(30)}
+    claimed = []
+    barrier = threading.Barrier(6)
+
+    def work(owner):
+        with app.app_context():
+            barrier.wait()
+            while (job := runner.claim(owner)) is not None:
+                claimed.append(job.id)
+
+    threads = [threading.Thread(target=work, args=(f'worker-{i}',)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(ids)
+
+
+def test_run_next_passes_the_payload(runner):
+    from database import db
+    from models.job import Job
+
+    job_id = add('test.record', payload={'ticket_id': 7})
+    assert runner.run_next('worker-a')
+    assert not runner.run_next('worker-a')
+
+    assert calls == [{'ticket_id': 7}]
+    job = db.session.get(Job, job_id)
+    db.session.refresh(job)
+    assert (job.status, job.locked_by, job.last_error) == ('succeeded', None, None)
+    assert job.finished_at is not None
+
+
+def test_failed_job_retries_with_backoff_then_fails(runner, monkeypatch):
+    from database import db
+    from models.job import Job
+
+    monkeypatch.setenv('JOB_BACKOFF_SECONDS', '10')
+    job_id = add('test.fail')
+
+    for attempt in (1, 2):
+        before = datetime.utcnow()
+        assert runner.run_next('worker-a')
+        job = db.session.get(Job, job_id)
+        db.session.refresh(job)
+        assert (job.status, job.attempts) == ('queued', attempt)
+        assert 'job failed on purpose' in job.last_error
+        delay = (job.run_at - before).total_seconds()
+        assert 0.75 * 10 * 2 ** (attempt - 1) - 1 <= delay <= 1.25 * 10 * 2 ** (attempt - 1) + 1
+        # Not due until the backoff has passed
+        assert not runner.run_next('worker-a')
+        job.run_at = datetime.utcnow()
+        db.session.commit()
+
+    assert runner.run_next('worker-a')
+    job = db.session.get(Job, job_id)
+    db.session.refresh(job)
+    assert (job.status, job.attempts) == ('failed', 3)
+    assert len(calls) == 3
+
+
+def test_backoff_grows_and_is_capped(monkeypatch):
+    monkeypatch.setenv('JOB_BACKOFF_SECONDS', '10')
+    for attempts, base in ((1, 10), (2, 20), (4, 80), (20, 3600)):
+        for _ in range(20):
+            assert 0.75 * base <= backoff_seconds(attempts) <= 1.25 * base
+
+
+def test_reap_requeues_or_fails_stale_jobs(runner):
+    from database import db
+    from models.job import Job
+
+    stale = datetime.utcnow() - timedelta(seconds=runner.lock_timeout + 60)
+    retry = add('test.record')
+    spent = add('test.record', max_attempts=1)
+    fresh = add('test.record')
+    for job_id, locked_at in ((retry, stale), (spent, stale), (fresh, datetime.utcnow())):
+        job = db.session.get(Job, job_id)
+        job.status, job.attempts, job.locked_by, job.locked_at = 'running', 1, 'dead-worker', locked_at
+    db.session.commit()
+
+    runner.reap_stale()
+
+    statuses = {job.id: (job.status, job.locked_by) for job in Job.query.populate_existing()}
+    assert statuses[retry] == ('queued', None)
+    assert statuses[spent] == ('failed', None)
+    assert statuses[fresh] == ('running', 'dead-worker')
+
+
+def test_requeued_job_is_not_finished_by_its_old_owner(runner, monkeypatch):
+    """A worker whose job was reaped while it ran must not mark it succeeded"""
+    from database import db
+    from models.job import Job
+
+    def reaped_while_running(**kwargs):
+        runner.lock_timeout = -1
+        runner.reap_stale()
+
+    monkeypatch.setitem(jobs.TASKS, 'test.slow', (reaped_while_running, 5))
+    job_id = add('test.slow')
+    assert runner.run_next('worker-a')
+
+    job = db.session.get(Job, job_id)
+    db.session.refresh(job)
+    assert (job.status, job.locked_by, job.finished_at) == ('queued', None, None)
+
+
+def test_periodic_jobs_are_scheduled_once_per_slot(app, monkeypatch):
+    from models.job import Job
+
+    monkeypatch.setattr(jobs, 'PERIODIC', {'test.record': 3600})
+    first, second = JobRunner(app, workers=0), JobRunner(app, workers=0)
+
+    first.schedule_periodic()
+    second.schedule_periodic()
+    first.schedule_periodic()
+
+    scheduled = Job.query.filter_by(name='test.record').all()
+    assert len(scheduled) == 1
+    assert scheduled[0].run_at <= datetime.utcnow()
@@ -0,0 +1,69 @@
+"""SQL statements per request for the main list and detail endpoints
+
+Budgets do not grow with the number of rows returned, so a lazy load per row
+(an N+1) fails these tests. Authenticated endpoints allow two extra statements
+for the token revocation check and the principal lookup when it is not cached.
+"""
+import pytest
+from services.query_stats import assert_query_budget
+
+AUTH = 2
+
+
+@pytest.fixture(scope='module', autouse=True)
+def users_in_every_department(app):
+    from database import db
+    from models.department import Department
+    from models.user import User
+
+    with app.app_context():
+        for department in Department.query.all():
+            if not User.query.filter_by(username=f'budget_agent_{department.id}').first():
+                user = User(username=f'budget_agent_{department.id}', role='AGENT', department_id=department.id)
+                user.set_password('Budget@agent1')
+                db.session.add(user)
+        db.session.commit()
+
+
+def test_ticket_list(client):
+    response = assert_query_budget(client, 'GET', '/api/tickets', 5)
+    assert len(response.get_json()['tickets']) >= 100
+
+
+def test_ticket_list_filtered(client):
+    assert_query_budget(client, 'GET', '/api/tickets?status=resolved&priority=high', 5)
+
+
+def test_ticket_detail(client):
+    response = assert_query_budget(client, 'GET', '/api/tickets/1', 1)
+    assert response.get_json()['ticket']['building_name']
+
+
+def test_dashboard(client):
+    assert_query_budget(client, 'GET', '/api/dashboard', 13)
+
+
+def test_admin_ticket_list(client, admin_headers):
+    response = assert_query_budget(client, 'GET', '/api/admin/tickets?per_page=100', 2 + AUTH,
+                                   headers=admin_headers)
+    assert len(response.get_json()['tickets']) == 100
+
+
+def test_admin_user_list(client, admin_headers):
+    response = assert_query_budget(client, 'GET', '/api/admin/users', 1 + AUTH, headers=admin_headers)
+    assert len({user['department_name'] for user in response.get_json()['users']}) > 1
+
+
+def test_failed_statement_does_not_leak_timer(app):
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from database import db
+    from services.query_stats import capture_queries
+
+    with app.app_context(), db.engine.connect() as conn:
+        with capture_queries() as queries:
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM no_such_table'))
+            conn.execute(text('SELECT 1'))
+        assert conn.info.get('query_start') == []
+        assert queries.count == 1
@@ -0,0 +1,109 @@
+"""Token buckets: limits, refill over time and the 429 returned by rate-limited routes"""
+import pytest
+from services import rate_limit
+from services.rate_limit import MemoryBackend, SQLiteBackend, get_limit, parse_limit
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, 'monotonic', clock)
+    monkeypatch.setattr(rate_limit.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path, clock):
+    if request.param == 'sqlite':
+        return SQLiteBackend(str(tmp_path / 'rate_limits.db'))
+    return MemoryBackend()
+
+
+def test_parse_limit():
+    assert parse_limit('10/minute') == (10.0, 10 / 60)
+    assert parse_limit('5/hours') == (5.0, 5 / 3600)
+    assert parse_limit('3/30') == (3.0, 0.1)
+    assert parse_limit('off') is None
+    assert parse_limit(None) is None
+    for value in ('ten/minute', '10/fortnight', '-1/minute'):
+        with pytest.raises(ValueError):
+            parse_limit(value)
+
+
+def test_bucket_allows_capacity_then_refills(backend, clock):
+    capacity, rate = parse_limit('3/minute')
+
+    assert [backend.consume('k', capacity, rate)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = backend.consume('k', capacity, rate)
+    assert not allowed
+    assert retry_after == pytest.approx(20.0)
+
+    clock.now += 19
+    assert not backend.consume('k', capacity, rate)[0]
+    clock.now += 2
+    assert backend.consume('k', capacity, rate)[0]
+    assert not backend.consume('k', capacity, rate)[0]
+
+    # An idle bucket refills to capacity and no further
+    clock.now += 3600
+    assert [backend.consume('k', capacity, rate)[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_buckets_are_per_key(backend, clock):
+    assert backend.consume('a', 1, 1)[0]
+    assert not backend.consume('a', 1, 1)[0]
+    assert backend.consume('b', 1, 1)[0]
+
+
+def test_sqlite_buckets_are_shared_between_instances(tmp_path, clock):
+    path = str(tmp_path / 'shared.db')
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+
+    assert first.consume('k', 2, 0.1)[0]
+    assert second.consume('k', 2, 0.1)[0]
+    assert not first.consume('k', 2, 0.1)[0]
+
+
+def test_memory_backend_prunes_idle_buckets(clock):
+    backend = MemoryBackend(max_keys=2)
+    backend.consume('a', 1, 1)
+    clock.now += 7200
+    backend.consume('b', 1, 1)
+    backend.consume('c', 1, 1)
+
+    assert set(backend._buckets) == {'b', 'c'}
+
+
+def test_overrides(monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_LOGIN_IP', '2/second')
+    assert get_limit('login', 'ip') == (2.0, 2.0)
+    monkeypatch.setenv('RATE_LIMIT_LOGIN_IP', 'off')
+    assert get_limit('login', 'ip') is None
+    monkeypatch.setenv('RATE_LIMIT_LOGIN_IP', 'lots')
+    assert get_limit('login', 'ip') == parse_limit(rate_limit.DEFAULT_LIMITS['login']['ip'])
+    assert get_limit('ai_chat', 'user') is None
+
+
+def test_route_returns_429_with_retry_after(client, monkeypatch, clock):
+    monkeypatch.setattr(rate_limit, '_backend', MemoryBackend())
+    monkeypatch.setenv('RATE_LIMIT_ENABLED', 'true')
+    monkeypatch.setenv('RATE_LIMIT_LOGIN_IP', '2/minute')
+    credentials = {'username': 'nobody', 'password': 'wrong'}
+
+    assert client.post('/api/login', json=credentials).status_code == 401
+    assert client.post('/api/login', json=credentials).status_code == 401
+    response = client.post('/api/login', json=credentials)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+    assert response.get_json()['retry_after'] == 30
+
+    clock.now += 30
+    assert client.post('/api/login', json=credentials).status_code == 401
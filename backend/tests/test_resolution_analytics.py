@@ -0,0 +1,112 @@
+"""Resolution-time rollups kept by the ticket routes must match a rebuild from the tickets"""
+from datetime import datetime
+import pytest
+from services.quantile_sketch import QuantileSketch
+
+
+@pytest.fixture(scope='module', autouse=True)
+def rebuilt(app):
+    # Generated tickets are written in bulk without touching the rollups
+    from services.resolution_analytics import rebuild_resolution_rollups
+
+    with app.app_context():
+        rebuild_resolution_rollups()
+
+
+def snapshot():
+    """Every rollup row with its sketch decoded, in a stable order"""
+    from models.resolution_rollup import ResolutionRollup
+
+    rows = []
+    for row in ResolutionRollup.query.all():
+        sketch = QuantileSketch.deserialize(row.sketch)
+        rows.append((row.granularity, row.bucket_start, row.building_id, row.department_id, row.issue_type,
+                     row.priority, row.count, round(row.sum_seconds, 3), sketch.zero_count,
+                     tuple(sorted(sketch.bins.items()))))
+    return sorted(rows, key=repr)
+
+
+def assert_matches_rebuild():
+    from services.resolution_analytics import rebuild_resolution_rollups
+
+    live = snapshot()
+    rebuild_resolution_rollups()
+    assert live == snapshot()
+
+
+def ticket_ids(statuses, limit):
+    from models.support_ticket import SupportTicket
+
+    return [ticket.id for ticket in SupportTicket.query.filter(SupportTicket.status.in_(statuses))
+            .order_by(SupportTicket.id.desc()).limit(limit)]
+
+
+def test_route_changes_match_rebuild(app, client):
+    with app.app_context():
+        opened = ticket_ids(('pending', 'in_progress'), 6)
+        resolved = ticket_ids(('resolved', 'closed'), 4)
+
+    for ticket_id in opened:
+        assert client.put(f'/api/tickets/{ticket_id}/status', json={'status': 'resolved'}).status_code == 200
+    for ticket_id in resolved[:2]:
+        assert client.put(f'/api/tickets/{ticket_id}/status', json={'status': 'in_progress'}).status_code == 200
+    # Resolving again moves the ticket to the bucket of its new resolved_at
+    assert client.put(f'/api/tickets/{opened[0]}/status', json={'status': 'resolved'}).status_code == 200
+    for ticket_id in resolved[2:] + opened[4:]:
+        assert client.delete(f'/api/tickets/{ticket_id}').status_code == 200
+
+    with app.app_context():
+        assert_matches_rebuild()
+
+
+def test_null_group_columns_share_one_row(app):
+    """The unique index coalesces NULLs, so repeated upserts add to one row instead of inserting"""
+    from database import db
+    from models.resolution_rollup import ResolutionRollup
+    from services.resolution_analytics import ResolutionSample, _apply
+
+    moment = datetime(2001, 2, 3, 4, 5)
+    with app.app_context():
+        for seconds in (60.0, 3600.0, 0.0):
+            _apply(ResolutionSample(moment, None, None, None, None, seconds), 1)
+        db.session.commit()
+
+        rows = ResolutionRollup.query.filter_by(bucket_start=datetime(2001, 2, 3, 4)).all()
+        assert len(rows) == 1
+        assert rows[0].count == 3
+        assert rows[0].sum_seconds == pytest.approx(3660.0)
+        sketch = QuantileSketch.deserialize(rows[0].sketch)
+        assert sketch.count == 3
+        assert sketch.zero_count == 1
+        assert sketch.quantile(1.0) == pytest.approx(3600.0, rel=0.01)
+
+        for seconds in (60.0, 3600.0, 0.0):
+            _apply(ResolutionSample(moment, None, None, None, None, seconds), -1)
+        db.session.commit()
+        # A bucket that drops to zero tickets is deleted at every granularity
+        assert ResolutionRollup.query.filter(ResolutionRollup.bucket_start >= datetime(2001, 1, 1),
+                                             ResolutionRollup.bucket_start < datetime(2002, 1, 1)).count() == 0
+
+
+def test_reopened_ticket_is_retracted(app, client):
+    from database import db
+    from models.resolution_rollup import ResolutionRollup
+    from models.support_ticket import SupportTicket
+
+    with app.app_context():
+        ticket_id = ticket_ids(('pending', 'in_progress'), 1)[0]
+    assert client.put(f'/api/tickets/{ticket_id}/status', json={'status': 'resolved'}).status_code == 200
+
+    with app.app_context():
+        ticket = db.session.get(SupportTicket, ticket_id)
+        hour = ticket.resolved_at.replace(minute=0, second=0, microsecond=0)
+        key = dict(granularity='hour', bucket_start=hour, building_id=ticket.building_id,
+                   department_id=ticket.department_id, issue_type=ticket.issue_type, priority=ticket.priority)
+        before = ResolutionRollup.query.filter_by(**key).one().count
+
+    assert client.put(f'/api/tickets/{ticket_id}/status', json={'status': 'pending'}).status_code == 200
+
+    with app.app_context():
+        row = ResolutionRollup.query.filter_by(**key).first()
+        assert (row.count if row else 0) == before - 1
+        assert_matches_rebuild()
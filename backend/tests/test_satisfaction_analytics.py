@@ -0,0 +1,73 @@
+"""Satisfaction rollups kept by the ticket routes must match a rebuild from the tickets"""
+from datetime import datetime, timedelta
+import pytest
+
+
+@pytest.fixture(scope='module', autouse=True)
+def rebuilt(app):
+    # Generated tickets are written in bulk without touching the rollups
+    from services.satisfaction_analytics import rebuild_satisfaction_rollups
+
+    with app.app_context():
+        rebuild_satisfaction_rollups()
+
+
+def snapshot():
+    from models.satisfaction_rollup import SatisfactionRollup
+    from services.satisfaction_analytics import GROUP_FIELDS, SUM_COLUMNS
+
+    return sorted((tuple(getattr(row, field) for field in ('bucket_start',) + GROUP_FIELDS + SUM_COLUMNS)
+                   for row in SatisfactionRollup.query.all()), key=repr)
+
+
+def test_rating_changes_match_rebuild(app, client):
+    from models.support_ticket import SupportTicket
+    from models.user import User
+    from services.satisfaction_analytics import rebuild_satisfaction_rollups
+
+    with app.app_context():
+        tickets = [ticket.id for ticket in SupportTicket.query.filter(SupportTicket.status.in_(('resolved', 'closed')))
+                   .order_by(SupportTicket.id.desc()).limit(6)]
+        agent = User.query.filter_by(role='AGENT', active=True).order_by(User.id).first().id
+
+    for rating, ticket_id in enumerate(tickets[:5], start=1):
+        response = client.post(f'/api/tickets/{ticket_id}/rate', json={'rating': rating, 'comment': 'test'})
+        assert response.status_code == 200
+    # Re-rating moves the rating instead of counting it twice
+    assert client.post(f'/api/tickets/{tickets[0]}/rate', json={'rating': 5}).status_code == 200
+    # Reassigning a rated ticket moves it to the new assignee's group
+    assert client.put(f'/api/tickets/{tickets[1]}/assign', json={'assigned_to_id': agent}).status_code == 200
+    assert client.delete(f'/api/tickets/{tickets[2]}').status_code == 200
+    assert client.post(f'/api/tickets/{tickets[5]}/rate', json={'rating': 9}).status_code == 400
+
+    with app.app_context():
+        live = snapshot()
+        rebuild_satisfaction_rollups()
+        assert live == snapshot()
+
+
+def test_stats_summarize_the_ratings(app):
+    from database import db
+    from models.satisfaction_rollup import SatisfactionRollup
+    from services.satisfaction_analytics import RatingSample, _apply, satisfaction_stats
+
+    day = datetime(2001, 5, 6, 7)
+    with app.app_context():
+        # NULL group columns share one row through the coalescing unique index
+        for rating in (1, 4, 4, 5):
+            _apply(RatingSample(day, None, None, None, rating), 1)
+        db.session.commit()
+        assert SatisfactionRollup.query.filter_by(bucket_start=datetime(2001, 5, 6)).count() == 1
+
+        [stats] = satisfaction_stats(day, day + timedelta(days=1))
+        assert stats['count'] == 4
+        assert stats['average'] == 3.5
+        assert stats['stddev'] == pytest.approx(1.5)
+        assert stats['satisfied_pct'] == 75.0
+        assert stats['histogram'] == {'1': 1, '2': 0, '3': 0, '4': 2, '5': 1}
+
+        for rating in (1, 4, 4, 5):
+            _apply(RatingSample(day, None, None, None, rating), -1)
+        db.session.commit()
+        assert SatisfactionRollup.query.filter_by(bucket_start=datetime(2001, 5, 6)).count() == 0
+        assert satisfaction_stats(day, day + timedelta(days=1))[0]['count'] == 0
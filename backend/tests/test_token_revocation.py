@@ -0,0 +1,104 @@
+"""Token revocation: single tokens on logout, per-user watermarks, and sync between workers"""
+import time
+from datetime import datetime, timedelta
+import pytest
+
+
+@pytest.fixture(scope='module')
+def user(app):
+    from database import db
+    from models.user import User
+
+    with app.app_context():
+        user = User(username='revocation_user', role='USER')
+        user.set_password('Revoke@user1')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def login(client):
+    response = client.post('/api/login', json={'username': 'revocation_user', 'password': 'Revoke@user1'})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def payload(user_id, iat, jti=None):
+    return {'user_id': user_id, 'iat': iat, 'jti': jti, 'exp': time.time() + 3600}
+
+
+def test_logout_revokes_only_that_token(client, user):
+    first, second = login(client), login(client)
+
+    assert client.post('/api/logout', headers=first).status_code == 200
+    assert client.get('/api/me', headers=first).status_code == 401
+    assert client.get('/api/me', headers=second).status_code == 200
+
+
+def test_watermark_revokes_tokens_issued_before_it(app, user):
+    from services.token_revocation import revocation_list
+
+    with app.app_context():
+        revocation_list.revoke_user_tokens(user)
+        watermark = revocation_list.watermarks[user][0]
+
+        assert revocation_list.is_revoked(payload(user, watermark - 1, 'old'))
+        assert revocation_list.is_revoked(payload(user, None, 'no-iat'))
+        assert not revocation_list.is_revoked(payload(user, watermark + 1, 'new'))
+        assert not revocation_list.is_revoked(payload(user + 1000, watermark - 1, 'other-user'))
+
+
+def test_token_without_jti_is_revoked_by_watermark(app, user):
+    from services.token_revocation import revocation_list
+
+    with app.app_context():
+        legacy = payload(user, time.time() - 10)
+        del legacy['jti']
+        revocation_list.revoke_token(legacy)
+        assert revocation_list.is_revoked(legacy)
+
+
+def test_other_workers_pick_up_revocations_on_sync(app, user):
+    from database import db
+    from models.token_revocation import TokenRevocation
+    from services.token_revocation import RevocationList, _epoch
+
+    with app.app_context():
+        now = datetime.utcnow()
+        expiry = now + timedelta(hours=1)
+        db.session.add_all([
+            TokenRevocation(jti='synced-jti', user_id=user, expires_at=expiry),
+            TokenRevocation(user_id=user, issued_before=now, expires_at=expiry),
+            # An older watermark written later must not lower the newer one
+            TokenRevocation(user_id=user, issued_before=now - timedelta(minutes=5), expires_at=expiry),
+            TokenRevocation(jti='expired-jti', user_id=user, expires_at=now - timedelta(seconds=1)),
+        ])
+        db.session.commit()
+
+        worker = RevocationList()
+        assert worker.is_revoked(payload(user + 1000, 0, 'synced-jti'))
+        assert not worker.is_revoked(payload(user + 1000, 0, 'expired-jti'))
+        assert worker.watermarks[user][0] == pytest.approx(_epoch(now), abs=1e-3)
+        assert worker.is_revoked(payload(user, _epoch(now) - 60, 'x'))
+
+        # Later rows arrive on the next sync, after the interval
+        last_id = worker.last_id
+        db.session.add(TokenRevocation(jti='late-jti', user_id=user, expires_at=expiry))
+        db.session.commit()
+        assert not worker.is_revoked(payload(user + 1000, 0, 'late-jti'))
+        worker.next_sync = 0
+        assert worker.is_revoked(payload(user + 1000, 0, 'late-jti'))
+        assert worker.last_id > last_id
+
+
+def test_sync_forgets_expired_entries(app):
+    from services.token_revocation import RevocationList
+
+    with app.app_context():
+        worker = RevocationList()
+        worker.sync()
+        worker.revoked['gone'] = time.time() - 1
+        worker.watermarks[-1] = (time.time(), time.time() - 1)
+        worker.next_sync = 0
+        worker.sync()
+        assert 'gone' not in worker.revoked
+        assert -1 not in worker.watermarks
@@ -0,0 +1,97 @@
+"""Hourly ticket-volume rollups and the seasonal forecast built on them"""
+import numpy as np
+import pytest
+from services.volume_forecast import WEEK_HOURS, forecast_bands, seasonal_forecast
+
+
+@pytest.fixture(scope='module', autouse=True)
+def rebuilt(app):
+    # Generated tickets are written in bulk without touching the rollups
+    from services.volume_forecast import rebuild_volume_rollups
+
+    with app.app_context():
+        rebuild_volume_rollups()
+
+
+def snapshot():
+    from models.volume_rollup import VolumeRollup
+
+    return sorted((row.bucket_start, row.building_id, row.count) for row in VolumeRollup.query.all())
+
+
+def test_created_and_deleted_tickets_match_rebuild(app, client):
+    from models.floor import Floor
+    from services.volume_forecast import rebuild_volume_rollups
+
+    with app.app_context():
+        floor = Floor.query.order_by(Floor.id.desc()).first()
+        ticket = {'building': floor.building_id, 'floor': floor.id, 'department': 1,
+                  'issue_type': 'Printer', 'priority': 'low'}
+
+    created = []
+    for i in range(5):
+        response = client.post('/api/tickets', json=dict(ticket, description=f'Volume test printer jam {i}'))
+        assert response.status_code == 201
+        created.append(response.get_json()['ticket_id'])
+    assert client.delete(f'/api/tickets/{created[0]}').status_code == 200
+
+    with app.app_context():
+        live = snapshot()
+        assert rebuild_volume_rollups() == sum(count for _, _, count in live)
+        assert live == snapshot()
+
+
+def test_hourly_counts_read_the_rollups(app):
+    from datetime import timedelta
+    from models.volume_rollup import VolumeRollup
+    from services.volume_forecast import hourly_counts
+
+    with app.app_context():
+        latest = VolumeRollup.query.order_by(VolumeRollup.bucket_start.desc()).first()
+        start = latest.bucket_start - timedelta(hours=47)
+        building_ids = [latest.building_id, -1]
+        counts = hourly_counts(start, latest.bucket_start + timedelta(hours=1), building_ids)
+
+        assert counts.shape == (2, 48)
+        assert counts[0, -1] == latest.count
+        assert not counts[1].any()
+        stored = sum(row.count for row in VolumeRollup.query.filter(
+            VolumeRollup.building_id == latest.building_id, VolumeRollup.bucket_start >= start))
+        assert counts[0].sum() == stored
+
+
+def test_repeating_weeks_forecast_the_same_week():
+    profile = np.random.default_rng(1).poisson(3, WEEK_HOURS).astype(float)
+    history = np.stack([np.tile(profile, 6), np.tile(2 * profile, 6)])
+
+    expected = seasonal_forecast(history, horizon=2 * WEEK_HOURS)
+
+    assert expected.shape == (2, 2 * WEEK_HOURS)
+    assert expected[0, :WEEK_HOURS] == pytest.approx(profile)
+    assert expected[0, WEEK_HOURS:] == pytest.approx(profile)
+    assert expected[1] == pytest.approx(2 * expected[0])
+
+
+def test_trend_follows_the_weekly_totals():
+    weeks = [np.ones(WEEK_HOURS) * (1 + week / 10) for week in range(8)]
+    growing = np.concatenate(weeks)[None, :]
+    shrinking = np.concatenate(weeks[::-1])[None, :]
+
+    assert seasonal_forecast(growing).sum() > seasonal_forecast(shrinking).sum()
+
+
+def test_empty_history_forecasts_zero():
+    expected, low, high = forecast_bands(np.zeros((3, 4 * WEEK_HOURS)))
+
+    assert not expected.any() and not low.any() and not high.any()
+    assert np.isfinite(expected).all()
+
+
+def test_bands_contain_the_forecast():
+    history = np.random.default_rng(2).poisson(4, (2, 12 * WEEK_HOURS)).astype(float)
+
+    expected, low, high = forecast_bands(history)
+
+    assert (low >= 0).all()
+    assert (low <= expected).all() and (expected <= high).all()
+    assert (high > expected).any()
@@ -0,0 +1,124 @@
+"""claim-next under concurrent agents: every ticket claimed once, loads kept exact"""
+import threading
+from collections import Counter
+import pytest
+
+AGENTS = 8
+TICKETS = 60
+PRIORITIES = ('low', 'medium', 'high', 'urgent')
+
+
+@pytest.fixture(scope='module')
+def queue(app):
+    """A department of its own with AGENTS claiming agents and TICKETS pending tickets
+
+    Two thirds are assigned as auto-assignment would, some to an agent who never
+    claims, whose tickets must still be claimable by the others.
+    """
+    from datetime import datetime, timedelta
+    from database import db
+    from models.building import Building
+    from models.department import Department
+    from models.floor import Floor
+    from models.support_ticket import SupportTicket
+    from models.user import User
+    from services.assignment import assign, assignment_engine
+
+    with app.app_context():
+        department = Department(name='Claim Queue Test')
+        db.session.add(department)
+        db.session.flush()
+        agents = []
+        for i in range(AGENTS + 1):
+            agent = User(username=f'claim_agent_{i}', role='AGENT', department_id=department.id)
+            agent.set_password('Claim@agent1')
+            agents.append(agent)
+        db.session.add_all(agents)
+        db.session.flush()
+
+        floor = Floor.query.first()
+        building = db.session.get(Building, floor.building_id)
+        start = datetime.utcnow() - timedelta(hours=TICKETS)
+        tickets = []
+        for i in range(TICKETS):
+            ticket = SupportTicket(building_id=building.id, floor_id=floor.id, department_id=department.id,
+                                   issue_type='Network', description=f'claim test {i}',
+                                   priority=PRIORITIES[i % len(PRIORITIES)], status='pending',
+                                   created_at=start + timedelta(hours=i))
+            if i % 3:
+                assign(ticket, agents[i % len(agents)])
+            tickets.append(ticket)
+        db.session.add_all(tickets)
+        db.session.commit()
+        assignment_engine.invalidate()
+        return {'department_id': department.id,
+                'ticket_ids': {ticket.id for ticket in tickets},
+                'tokens': [agent.generate_token() for agent in agents[:AGENTS]]}
+
+
+def open_loads():
+    """Every user's stored load next to the load recomputed from their open tickets"""
+    from sqlalchemy import func
+    from database import db
+    from models.support_ticket import SupportTicket
+    from models.user import User
+    from services.assignment import OPEN_STATUSES, PRIORITY_WEIGHTS
+
+    actual = Counter()
+    rows = (db.session.query(SupportTicket.assigned_to_id, SupportTicket.priority, func.count())
+            .filter(SupportTicket.status.in_(OPEN_STATUSES), SupportTicket.assigned_to_id.isnot(None))
+            .group_by(SupportTicket.assigned_to_id, SupportTicket.priority))
+    for user_id, priority, count in rows:
+        actual[user_id] += PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS['medium']) * count
+    stored = {user_id: load or 0 for user_id, load in db.session.query(User.id, User.assignment_load)}
+    return stored, {user_id: actual[user_id] for user_id in stored}
+
+
+def test_concurrent_claims_take_each_ticket_once(app, queue):
+    from models.support_ticket import SupportTicket
+    from models.user import User
+    from services.work_queue import PRIORITY_ORDER
+
+    claims = [[] for _ in queue['tokens']]
+    failures = []
+    barrier = threading.Barrier(len(queue['tokens']))
+
+    def work(token, claimed):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        barrier.wait()
+        while True:
+            response = client.post('/api/admin/tickets/claim-next', headers=headers)
+            if response.status_code == 404:
+                return
+            if response.status_code != 200:
+                failures.append(response.get_json())
+                return
+            ticket = response.get_json()['ticket']
+            claimed.append((ticket['id'], ticket['priority']))
+
+    threads = [threading.Thread(target=work, args=args) for args in zip(queue['tokens'], claims)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not failures
+    claimed = [ticket_id for agent_claims in claims for ticket_id, _ in agent_claims]
+    assert len(claimed) == len(set(claimed))
+    assert set(claimed) == queue['ticket_ids']
+    # The queue only shrinks, so no agent ever gets a more urgent ticket than its previous one
+    for agent_claims in claims:
+        ranks = [PRIORITY_ORDER.index(priority) for _, priority in agent_claims]
+        assert ranks == sorted(ranks)
+
+    with app.app_context():
+        tickets = SupportTicket.query.filter(SupportTicket.id.in_(queue['ticket_ids'])).all()
+        agents = {user.username: user.id for user in User.query.filter(User.username.like('claim_agent_%'))}
+        owners = {ticket_id: agents[f'claim_agent_{i}'] for i, agent_claims in enumerate(claims)
+                  for ticket_id, _ in agent_claims}
+        assert all(ticket.status == 'in_progress' for ticket in tickets)
+        assert all(ticket.assigned_to_id == owners[ticket.id] for ticket in tickets)
+        stored, actual = open_loads()
+        assert stored == actual
+
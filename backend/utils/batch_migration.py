@@ -0,0 +1,241 @@
+"""
+Resumable, batched data migrations
+
+A migration walks a table in primary-key order, reading batch_size rows per
+query (WHERE key > last ORDER BY key LIMIT n) so memory use and query cost stay
+flat on large tables. Each batch's updates and the checkpoint row in
+migration_checkpoints are committed in the same transaction, so an interrupted
+run resumes after the last committed batch. Dry runs roll every batch back and
+leave the checkpoint untouched.
+
+A migration can also name model columns and indexes that older databases lack
+(add_columns, add_indexes). They are added with ALTER TABLE ... ADD COLUMN and
+CREATE INDEX before the first batch, using the model's scalar default as the
+column default so NOT NULL columns can be added to tables that have rows.
+"""
+import time
+from datetime import datetime
+from sqlalchemy import MetaData, Table, bindparam, func, inspect, literal, select, text
+from database import db
+from models.migration_checkpoint import MigrationCheckpoint
+
+
+def column_ddl(column, dialect):
+    """Column definition for ALTER TABLE ... ADD COLUMN"""
+    preparer = dialect.identifier_preparer
+    ddl = f'{preparer.format_column(column)} {column.type.compile(dialect=dialect)}'
+    if column.default is not None and column.default.is_scalar:
+        default = literal(column.default.arg, column.type).compile(dialect=dialect,
+                                                                   compile_kwargs={'literal_binds': True})
+        ddl += f' DEFAULT {default}'
+    elif not column.nullable:
+        raise ValueError(f'{column.table.name}.{column.name} is NOT NULL without a scalar default')
+    if not column.nullable:
+        ddl += ' NOT NULL'
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        ddl += f' REFERENCES {preparer.format_table(target.table)} ({preparer.format_column(target)})'
+    return ddl
+
+
+def missing_schema(connection, add_columns, add_indexes):
+    """(columns, indexes) of the given model columns and indexes the database lacks"""
+    inspector = inspect(connection)
+    columns = []
+    for table_name, names in add_columns.items():
+        existing = {column['name'] for column in inspector.get_columns(table_name)}
+        table = db.metadata.tables[table_name]
+        columns.extend(table.c[name] for name in names if name not in existing)
+    indexes = []
+    for index_name in add_indexes:
+        index = next(index for table in db.metadata.tables.values() for index in table.indexes
+                     if index.name == index_name)
+        if index_name not in {existing['name'] for existing in inspector.get_indexes(index.table.name)}:
+            indexes.append(index)
+    return columns, indexes
+
+
+class BatchMigration:
+    """Base class for data migrations
+
+    Subclasses set name, table_name and update_columns, and implement
+    migrate_batch(connection, rows) returning one dict per changed row with
+    '_key' (the row's primary key) and a value for every update column.
+    prepare(connection) runs once before the first batch, e.g. to load lookup
+    caches, and finish() once after the last batch of a run that is not a dry
+    run, e.g. to recompute aggregates from the migrated rows.
+    """
+
+    name = None
+    table_name = None
+    key = 'id'
+    columns = ()           # columns to read besides the key
+    update_columns = ()
+    batch_size = 5000
+    add_columns = {}       # table name -> model column names to add when missing
+    add_indexes = ()       # model index names to create when missing
+
+    def __init__(self, batch_size=None, dry_run=False):
+        self.batch_size = batch_size or self.batch_size
+        self.dry_run = dry_run
+
+    def applicable(self, table):
+        """False when the table has nothing this migration can act on"""
+        return True
+
+    def select_columns(self, table):
+        return [table.c[name] for name in self.columns]
+
+    def prepare(self, connection):
+        pass
+
+    def migrate_batch(self, connection, rows):
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+    def summary(self):
+        """Extra counters to report at the end of a run"""
+        return {}
+
+    def upgrade_schema(self, connection, verbose=True):
+        """Add missing columns and indexes; returns False if a dry run found any missing"""
+        columns, indexes = missing_schema(connection, self.add_columns, self.add_indexes)
+        if not columns and not indexes:
+            return True
+        statements = [f'ALTER TABLE {column.table.name} ADD COLUMN {column_ddl(column, connection.dialect)}'
+                      for column in columns]
+        if self.dry_run:
+            if verbose:
+                for statement in statements:
+                    print(f"  would run: {statement}")
+                for index in indexes:
+                    print(f"  would create index {index.name}")
+            return False
+        for statement in statements:
+            connection.execute(text(statement))
+        for index in indexes:
+            index.create(connection)
+        connection.commit()
+        if verbose:
+            added = [f'{column.table.name}.{column.name}' for column in columns] + [index.name for index in indexes]
+            print(f"✓ {self.name}: added {', '.join(added)}")
+        return True
+
+    def _save_checkpoint(self, connection, last_key, processed, changed, status):
+        checkpoints = MigrationCheckpoint.__table__
+        values = {'last_key': last_key, 'rows_processed': processed, 'rows_changed': changed,
+                  'status': status, 'updated_at': datetime.utcnow()}
+        result = connection.execute(checkpoints.update().where(checkpoints.c.name == self.name).values(**values))
+        if result.rowcount == 0:
+            connection.execute(checkpoints.insert().values(name=self.name, started_at=datetime.utcnow(), **values))
+
+    def run(self, restart=False, verbose=True):
+        """Run (or resume) the migration; returns a summary dict"""
+        engine = db.engine
+        MigrationCheckpoint.__table__.create(engine, checkfirst=True)
+        report = {'name': self.name, 'dry_run': self.dry_run, 'processed': 0, 'changed': 0,
+                  'batches': 0, 'seconds': 0.0, 'rows_per_second': 0.0, 'completed': False}
+
+        with engine.connect() as connection:
+            if not self.upgrade_schema(connection, verbose):
+                if verbose:
+                    print(f"✗ {self.name}: dry run stops here until the schema is upgraded")
+                return report
+
+            table = Table(self.table_name, MetaData(), autoload_with=connection)
+            if not self.applicable(table):
+                connection.commit()
+                if verbose:
+                    print(f"✓ {self.name}: nothing to migrate")
+                report['completed'] = True
+                return report
+
+            checkpoints = MigrationCheckpoint.__table__
+            checkpoint = connection.execute(select(checkpoints).where(checkpoints.c.name == self.name)).first()
+            if checkpoint and checkpoint.status == 'completed' and not restart:
+                connection.commit()
+                if verbose:
+                    print(f"✓ {self.name}: already completed ({checkpoint.rows_processed:,} rows)")
+                report.update(processed=checkpoint.rows_processed, changed=checkpoint.rows_changed, completed=True)
+                return report
+
+            resume = checkpoint is not None and not restart
+            last_key = (checkpoint.last_key or 0) if resume else 0
+            processed = checkpoint.rows_processed if resume else 0
+            changed = checkpoint.rows_changed if resume else 0
+
+            key_column = table.c[self.key]
+            remaining = connection.execute(select(func.count()).select_from(table).where(key_column > last_key)).scalar()
+            self.prepare(connection)
+            connection.commit()
+
+            if verbose:
+                mode = 'dry run' if self.dry_run else ('resuming after key %s' % last_key if resume else 'starting')
+                print(f"🔄 {self.name}: {mode}, {remaining:,} rows to process in batches of {self.batch_size:,}")
+
+            query = (select(key_column, *self.select_columns(table))
+                     .where(key_column > bindparam('after'))
+                     .order_by(key_column)
+                     .limit(self.batch_size))
+            update = None
+            if self.update_columns:
+                update = (table.update()
+                          .where(key_column == bindparam('_key'))
+                          .values({name: bindparam(name) for name in self.update_columns}))
+
+            start = time.perf_counter()
+            last_report = start
+            done_this_run = 0
+            while True:
+                transaction = connection.begin()
+                try:
+                    rows = connection.execute(query, {'after': last_key}).all()
+                    if not rows:
+                        if not self.dry_run:
+                            self._save_checkpoint(connection, last_key, processed, changed, 'completed')
+                        transaction.commit()
+                        report['completed'] = True
+                        break
+
+                    updates = self.migrate_batch(connection, rows)
+                    if updates and update is not None:
+                        connection.execute(update, updates)
+
+                    last_key = getattr(rows[-1], self.key)
+                    processed += len(rows)
+                    changed += len(updates or ())
+                    done_this_run += len(rows)
+                    report['batches'] += 1
+
+                    if self.dry_run:
+                        transaction.rollback()
+                    else:
+                        self._save_checkpoint(connection, last_key, processed, changed, 'running')
+                        transaction.commit()
+                except BaseException:
+                    transaction.rollback()
+                    if verbose:
+                        print(f"✗ {self.name}: stopped after key {last_key}; rerun to resume")
+                    raise
+
+                now = time.perf_counter()
+                if verbose and now - last_report >= 1.0:
+                    last_report = now
+                    rate = done_this_run / (now - start)
+                    eta = (remaining - done_this_run) / rate if rate else 0
+                    print(f"  {done_this_run:,}/{remaining:,} rows ({changed:,} changed) "
+                          f"{rate:,.0f} rows/s, ETA {eta:.0f}s")
+
+        if not self.dry_run:
+            self.finish()
+        elapsed = time.perf_counter() - start
+        report.update(processed=processed, changed=changed, seconds=round(elapsed, 3),
+                      rows_per_second=round(done_this_run / elapsed, 1) if elapsed else 0.0)
+        report.update(self.summary())
+        if verbose:
+            prefix = 'Dry run' if self.dry_run else 'Completed'
+            print(f"✅ {self.name}: {prefix} - {processed:,} rows, {changed:,} changed "
+                  f"in {elapsed:.1f}s ({report['rows_per_second']:,.0f} rows/s)")
+        return report
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Seeded SQLite template database for fast resets
+
+The template is a fully created and seeded database file named after a
+checksum of the schema (built from the real models) and the seed data. Resets
+restore it with the SQLite backup API instead of dropping, recreating and
+reseeding; a schema or seed change produces a new checksum and the template is
+rebuilt on next use.
+
+Usage: python -m utils.db_template [--rebuild]
+"""
+import os
+import sys
+import glob
+import shutil
+import hashlib
+import sqlite3
+import argparse
+import importlib
+import pkgutil
+import tempfile
+import threading
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateTable, CreateIndex
+from database import db
+from services.passwords import bcrypt_rounds
+from utils import seed_data
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TEMPLATE_DIR = os.path.join(BACKEND_DIR, 'instance')
+TEMPLATE_PREFIX = 'template_'
+
+_lock = threading.Lock()
+
+
+def _load_models():
+    """Import every module under models/ so db.metadata holds all tables"""
+    models_dir = os.path.join(BACKEND_DIR, 'models')
+    for module in pkgutil.iter_modules([models_dir]):
+        importlib.import_module(f'models.{module.name}')
+
+
+def schema_checksum():
+    """Checksum of the DDL for every table and index plus the seed data"""
+    _load_models()
+    dialect = sqlite.dialect()
+    parts = []
+    for table in db.metadata.sorted_tables:
+        parts.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda i: i.name or ''):
+            parts.append(str(CreateIndex(index).compile(dialect=dialect)))
+    parts.append(repr((
+        seed_data.ADMIN_USERNAME, seed_data.ADMIN_PASSWORD, seed_data.BUILDINGS,
+        seed_data.FLOOR_LABELS, seed_data.DEPARTMENTS, bcrypt_rounds()
+    )))
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def template_path(checksum=None):
+    directory = os.getenv('DB_TEMPLATE_DIR', DEFAULT_TEMPLATE_DIR)
+    return os.path.join(directory, f'{TEMPLATE_PREFIX}{checksum or schema_checksum()}.db')
+
+
+def build_template(path):
+    """Create and seed a new template at path (written atomically)"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+
+    engine = create_engine(f'sqlite:///{tmp}')
+    try:
+        db.metadata.create_all(engine)
+        with engine.begin() as connection:
+            seed_data.seed_admin(connection)
+            seed_data.seed_buildings(connection)
+            seed_data.seed_departments(connection)
+        engine.dispose()
+        os.replace(tmp, path)
+    except Exception:
+        engine.dispose()
+        os.remove(tmp)
+        raise
+
+    # Templates for older schemas are no longer useful
+    for stale in glob.glob(os.path.join(directory, f'{TEMPLATE_PREFIX}*.db')):
+        if stale != path:
+            os.remove(stale)
+    print(f"✓ Built database template {os.path.basename(path)}")
+    return path
+
+
+def get_template(rebuild=False):
+    """Path to the template for the current schema, building it if needed"""
+    path = template_path()
+    if rebuild or not os.path.exists(path):
+        with _lock:
+            if rebuild or not os.path.exists(path):
+                build_template(path)
+    return path
+
+
+def is_sqlite(engine=None):
+    return (engine or db.engine).dialect.name == 'sqlite'
+
+
+def restore_template(engine=None, method='backup'):
+    """Replace the contents of a SQLite database with the template
+
+    'backup' (default) copies pages with the SQLite backup API into a live
+    connection, so it also works for in-memory databases and while other
+    connections are open. 'copy' disposes the engine and copies the file over
+    the database, for scripts that own the database exclusively.
+    """
+    engine = engine or db.engine
+    if not is_sqlite(engine):
+        raise ValueError('Template restore is only supported for SQLite databases')
+    template = get_template()
+    db.session.remove()
+
+    if method == 'copy' and engine.url.database not in (None, '', ':memory:'):
+        engine.dispose()
+        for suffix in ('-wal', '-shm', '-journal'):
+            if os.path.exists(engine.url.database + suffix):
+                os.remove(engine.url.database + suffix)
+        shutil.copyfile(template, engine.url.database)
+        return
+
+    source = sqlite3.connect(f'file:{template}?mode=ro', uri=True)
+    connection = engine.raw_connection()
+    try:
+        source.backup(connection.driver_connection)
+    finally:
+        connection.close()
+        source.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the seeded database template')
+    parser.add_argument('--rebuild', action='store_true', help='rebuild even if the template is current')
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        path = get_template(rebuild=args.rebuild)
+    print(f"✅ Template: {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
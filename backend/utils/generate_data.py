@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Large-scale synthetic ticket generator for capacity testing
+
+Usage: python -m utils.generate_data --tickets 1000000 [--days 365] [--seed 42] [--batch 100000]
+                                      [--now 2026-01-01T00:00:00|now]
+
+Generation is vectorized with NumPy and rows are written with executemany in
+large transactions. Tickets are spread over the days before --now (a fixed
+date by default), so the same seed and --now always produce the same tickets;
+use --now now for data ending at the current time.
+"""
+import sys
+import time
+import argparse
+from datetime import datetime
+import numpy as np
+from database import db
+from models.building import Building
+from models.floor import Floor
+from models.department import Department
+from models.support_ticket import SupportTicket
+from services.sla import DEFAULT_SLA_HOURS
+
+REFERENCE_NOW = datetime(2026, 1, 1)  # Default end of the generated date range
+
+ISSUE_TYPES = {
+    # issue type: (weight, descriptions, resolution notes)
+    'Network': (0.24, [
+        'Internet is down on the whole floor',
+        'WiFi keeps dropping every few minutes',
+        'Cannot connect to Teleposta_Guest network',
+        'Network is very slow when opening shared drives',
+    ], [
+        'Restarted the floor access point and reconnected users',
+        'Replaced faulty patch cable at the desk',
+        'Reset user network adapter and renewed DHCP lease',
+    ]),
+    'Printer': (0.20, [
+        'Printer shows paper jam but nothing is stuck',
+        'Printer is offline on all computers',
+        'Prints come out faded',
+        'Cannot scan to email from the printer',
+    ], [
+        'Cleared the rear tray sensor and reset the printer spooler',
+        'Replaced toner cartridge',
+        'Reinstalled printer driver on the workstation',
+    ]),
+    'Email': (0.15, [
+        'Outlook is not syncing new emails',
+        'Mailbox is full and cannot send',
+        'Emails to external addresses bounce back',
+    ], [
+        'Rebuilt the Outlook profile',
+        'Archived old mail and increased mailbox quota',
+        'Corrected the SMTP connector settings',
+    ]),
+    'Hardware': (0.15, [
+        'Laptop shows a blue screen on startup',
+        'Computer will not power on',
+        'Monitor flickers constantly',
+        'Keyboard and mouse stopped working',
+    ], [
+        'Updated graphics driver and ran disk check',
+        'Replaced the power supply unit',
+        'Swapped the monitor cable',
+    ]),
+    'Software': (0.12, [
+        'Need Excel updated to the latest version',
+        'Application crashes when opening reports',
+        'Need antivirus installed on new laptop',
+    ], [
+        'Installed the latest Office updates',
+        'Repaired the application installation',
+        'Installed and activated antivirus',
+    ]),
+    'Projector': (0.07, [
+        'Projector in the boardroom has no signal',
+        'Need help setting up projector for presentation',
+    ], [
+        'Switched projector input to HDMI and extended display',
+        'Replaced the HDMI adapter',
+    ]),
+    'Account Access': (0.07, [
+        'Locked out of my account after password change',
+        'Need access to the shared finance folder',
+    ], [
+        'Unlocked the account and reset the password',
+        'Added user to the shared folder security group',
+    ]),
+}
+
+PRIORITIES = np.array(['low', 'medium', 'high', 'urgent'], dtype=object)
+PRIORITY_WEIGHTS = [0.25, 0.45, 0.20, 0.10]
+# Median hours to resolve, by priority index
+PRIORITY_MEDIAN_HOURS = np.array([48.0, 24.0, 6.0, 2.0])
+
+# Office hours dominate; weekends are quiet
+HOUR_WEIGHTS = np.array([1, 1, 1, 1, 1, 2, 4, 10, 30, 45, 45, 40, 30, 35, 40, 38, 30, 18, 8, 4, 3, 2, 1, 1], dtype=float)
+WEEKDAY_WEIGHTS = np.array([1.2, 1.1, 1.0, 1.0, 0.9, 0.15, 0.05])
+
+CONTACTS = np.array([
+    'John Kamau', 'Mary Wanjiku', 'Peter Otieno', 'Sarah Muthoni', 'David Kimani', 'Grace Njeri',
+    'James Kiprop', 'Alice Ochieng', 'Robert Mwangi', 'Patricia Akinyi', 'Michael Odhiambo', 'Esther Chebet'
+], dtype=object)
+RATING_COMMENTS = np.array(['', '', 'Quick fix, thank you', 'Took too long', 'Very helpful team', 'Issue came back'], dtype=object)
+
+COLUMNS = [
+    'building_id', 'floor_id', 'department_id', 'issue_type', 'description', 'contact_person',
+    'phone_number', 'priority', 'status', 'created_at', 'updated_at', 'resolved_at', 'notes',
+    'rating', 'rating_comment', 'rated_at', 'due_at'
+]
+DATETIME_COLUMNS = ('created_at', 'updated_at', 'resolved_at', 'rated_at', 'due_at')
+
+
+def zipf_weights(n, exponent=1.1):
+    """Skewed popularity: the first items get most of the traffic"""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def load_reference_data():
+    """Buildings, their floors and departments as id arrays"""
+    buildings = np.array([b for (b,) in db.session.query(Building.id).order_by(Building.id)])
+    departments = np.array([d for (d,) in db.session.query(Department.id).order_by(Department.id)])
+    floors = {}
+    for floor_id, building_id in db.session.query(Floor.id, Floor.building_id).order_by(Floor.id):
+        floors.setdefault(building_id, []).append(floor_id)
+    if not len(buildings) or not len(departments) or not floors:
+        raise RuntimeError('Seed buildings, floors and departments first (utils/seed_data.py)')
+    return buildings, {b: np.array(f) for b, f in floors.items()}, departments
+
+
+def _format_datetimes(values):
+    """datetime64[us] -> list of strings in SQLAlchemy's SQLite format; NaT -> None
+
+    Digits are written straight into a byte buffer, which is several times faster
+    than np.datetime_as_string for large batches.
+    """
+    missing = np.isnat(values)
+    values = np.where(missing, np.datetime64(0, 'us'), values)
+    days = values.astype('datetime64[D]')
+    months = days.astype('datetime64[M]')
+    micros = (values - days).astype(np.int64)
+    fields = [
+        (0, 4, months.astype(np.int64) // 12 + 1970),
+        (5, 2, months.astype(np.int64) % 12 + 1),
+        (8, 2, (days - months).astype(np.int64) + 1),
+        (11, 2, micros // 3600000000),
+        (14, 2, micros // 60000000 % 60),
+        (17, 2, micros // 1000000 % 60),
+        (20, 6, micros % 1000000),
+    ]
+    buffer = np.empty((len(values), 26), dtype=np.uint8)
+    buffer[:, [4, 7]] = ord('-')
+    buffer[:, 10] = ord(' ')
+    buffer[:, [13, 16]] = ord(':')
+    buffer[:, 19] = ord('.')
+    for start, width, number in fields:
+        for k in range(width):
+            buffer[:, start + width - 1 - k] = ord('0') + number // 10 ** k % 10
+
+    text = [b.decode() for b in buffer.view('S26').ravel().tolist()]
+    for i in np.flatnonzero(missing).tolist():
+        text[i] = None
+    return text
+
+
+def generate_batch(rng, size, reference, now, days):
+    """Generate one batch of tickets as a dict of column arrays"""
+    buildings, floors, departments = reference
+
+    building_ids = rng.choice(buildings, size=size, p=zipf_weights(len(buildings), 0.6))
+    floor_ids = np.empty(size, dtype=np.int64)
+    for building_id in np.unique(building_ids):
+        mask = building_ids == building_id
+        options = floors.get(int(building_id))
+        if options is None:
+            options = floors[next(iter(floors))]
+        floor_ids[mask] = rng.choice(options, size=int(mask.sum()), p=zipf_weights(len(options), 0.8))
+    department_ids = rng.choice(departments, size=size, p=zipf_weights(len(departments), 0.9))
+
+    issue_names = list(ISSUE_TYPES)
+    issue_index = rng.choice(len(issue_names), size=size, p=[ISSUE_TYPES[n][0] for n in issue_names])
+    issue_types = np.array(issue_names, dtype=object)[issue_index]
+    descriptions = np.empty(size, dtype=object)
+    notes_choices = np.empty(size, dtype=object)
+    for i, name in enumerate(issue_names):
+        mask = issue_index == i
+        count = int(mask.sum())
+        descriptions[mask] = np.array(ISSUE_TYPES[name][1], dtype=object)[rng.integers(0, len(ISSUE_TYPES[name][1]), count)]
+        notes_choices[mask] = np.array(ISSUE_TYPES[name][2], dtype=object)[rng.integers(0, len(ISSUE_TYPES[name][2]), count)]
+
+    priority_index = rng.choice(len(PRIORITIES), size=size, p=PRIORITY_WEIGHTS)
+
+    # Creation time: day weighted by weekday, hour weighted by office hours
+    start_day = (now - np.timedelta64(days, 'D')).astype('datetime64[D]')
+    day_offsets = np.arange(days)
+    weekdays = (start_day + day_offsets).astype('datetime64[D]').view('int64')
+    day_weights = WEEKDAY_WEIGHTS[(weekdays + 3) % 7]  # 1970-01-01 was a Thursday
+    day = rng.choice(day_offsets, size=size, p=day_weights / day_weights.sum())
+    hour = rng.choice(24, size=size, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    micros = rng.integers(0, 3600 * 10**6, size=size)
+    created = (start_day + day.astype('timedelta64[D]')).astype('datetime64[us]') \
+        + hour.astype('timedelta64[h]') + micros.astype('timedelta64[us]')
+    created = np.minimum(created, now)
+
+    # Resolution time: log-normal around the priority's median
+    hours_to_resolve = rng.lognormal(np.log(PRIORITY_MEDIAN_HOURS[priority_index]), 0.9)
+    resolved = created + (hours_to_resolve * 3.6e9).astype('timedelta64[us]')
+    finished = resolved <= now
+
+    status = np.where(rng.random(size) < 0.5, 'pending', 'in_progress').astype(object)
+    outcome = rng.random(size)
+    status[finished & (outcome < 0.70)] = 'resolved'
+    status[finished & (outcome >= 0.70) & (outcome < 0.95)] = 'closed'
+    status[finished & (outcome >= 0.95)] = 'cancelled'
+    is_resolved = (status == 'resolved') | (status == 'closed')
+
+    resolved_at = np.where(is_resolved, resolved, np.datetime64('NaT'))
+    notes = np.where(is_resolved, notes_choices, None)
+
+    # Ratings: ~40% of resolved tickets, worse when resolution was slow
+    rated = is_resolved & (rng.random(size) < 0.4)
+    slow = hours_to_resolve > 72
+    rating = np.where(
+        slow,
+        rng.choice(np.arange(1, 6), size=size, p=[0.20, 0.25, 0.25, 0.20, 0.10]),
+        rng.choice(np.arange(1, 6), size=size, p=[0.03, 0.05, 0.12, 0.35, 0.45])
+    ).astype(object)
+    rating[~rated] = None
+    rated_at = np.where(rated, np.minimum(resolved + np.timedelta64(2, 'h'), now), np.datetime64('NaT'))
+    rating_comment = np.where(rated, RATING_COMMENTS[rng.integers(0, len(RATING_COMMENTS), size)], None)
+
+    updated = np.where(is_resolved, resolved, created)
+    sla_hours = np.array([DEFAULT_SLA_HOURS[priority] for priority in PRIORITIES])[priority_index]
+    due = created + (sla_hours * 3.6e9).astype('timedelta64[us]')
+    phone = np.char.add('+254-7', rng.integers(10**7, 10**8, size).astype(str)).astype(object)
+
+    return {
+        'building_id': building_ids.tolist(),
+        'floor_id': floor_ids.tolist(),
+        'department_id': department_ids.tolist(),
+        'issue_type': issue_types.tolist(),
+        'description': descriptions.tolist(),
+        'contact_person': CONTACTS[rng.integers(0, len(CONTACTS), size)].tolist(),
+        'phone_number': phone.tolist(),
+        'priority': PRIORITIES[priority_index].tolist(),
+        'status': status.tolist(),
+        'created_at': created,
+        'updated_at': updated,
+        'resolved_at': resolved_at,
+        'notes': notes.tolist(),
+        'rating': rating.tolist(),
+        'rating_comment': rating_comment.tolist(),
+        'rated_at': rated_at,
+        'due_at': due,
+    }
+
+
+def _write_sqlite(batch):
+    """Insert a batch through the raw DBAPI connection in one transaction"""
+    for column in DATETIME_COLUMNS:
+        batch[column] = _format_datetimes(batch[column])
+    rows = list(zip(*(batch[column] for column in COLUMNS)))
+    sql = (f"INSERT INTO {SupportTicket.__tablename__} ({', '.join(COLUMNS)}) "
+           f"VALUES ({', '.join('?' for _ in COLUMNS)})")
+
+    connection = db.engine.raw_connection()
+    cursor = connection.cursor()
+    synchronous = cursor.execute('PRAGMA synchronous').fetchone()[0]
+    cache_size = cursor.execute('PRAGMA cache_size').fetchone()[0]
+    try:
+        # Bulk load settings; the batch is one transaction
+        cursor.execute('PRAGMA synchronous=OFF')
+        cursor.execute('PRAGMA cache_size=-262144')
+        cursor.executemany(sql, rows)
+        connection.commit()
+    finally:
+        # The connection goes back to the pool, so restore its settings
+        connection.rollback()
+        cursor.execute(f'PRAGMA synchronous={int(synchronous)}')
+        cursor.execute(f'PRAGMA cache_size={int(cache_size)}')
+        connection.close()
+
+
+def _write_core(batch):
+    """Insert a batch with a Core executemany (non-SQLite databases)"""
+    for column in DATETIME_COLUMNS:
+        batch[column] = [None if np.isnat(v) else v.astype(datetime) for v in batch[column]]
+    rows = [dict(zip(COLUMNS, values)) for values in zip(*(batch[column] for column in COLUMNS))]
+    with db.engine.begin() as connection:
+        connection.execute(SupportTicket.__table__.insert(), rows)
+
+
+def generate_tickets(count, days=365, seed=42, batch_size=100000, verbose=True, now=None):
+    """Generate and insert count tickets created in the days before now; returns rows per second
+
+    now defaults to the current time, so open tickets and recent-window
+    analytics look like a live system; pass REFERENCE_NOW (the CLI default)
+    for data that is identical on every run.
+    """
+    rng = np.random.default_rng(seed)
+    reference = load_reference_data()
+    now = np.datetime64((now or datetime.utcnow()).replace(microsecond=0), 'us')
+    write = _write_sqlite if db.engine.dialect.name == 'sqlite' else _write_core
+
+    start = time.perf_counter()
+    written = 0
+    while written < count:
+        size = min(batch_size, count - written)
+        write(generate_batch(rng, size, reference, now, days))
+        written += size
+        if verbose:
+            rate = written / (time.perf_counter() - start)
+            print(f"✓ {written:,}/{count:,} tickets ({rate:,.0f} rows/s)")
+
+    rate = written / (time.perf_counter() - start) if written else 0.0
+    if verbose:
+        print(f"✅ Generated {written:,} tickets in {time.perf_counter() - start:.1f}s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic support tickets')
+    parser.add_argument('--tickets', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365, help='spread creation times over this many days')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch', type=int, default=100000, help='rows per transaction')
+    parser.add_argument('--now', default=REFERENCE_NOW.isoformat(),
+                        help="end of the date range (ISO date/time, or 'now' for the current time)")
+    args = parser.parse_args()
+    now = datetime.utcnow() if args.now == 'now' else datetime.fromisoformat(args.now)
+
+    from app import app
+    from utils.seed_data import seed_database
+    with app.app_context():
+        db.create_all()
+        seed_database()
+        generate_tickets(args.tickets, days=args.days, seed=args.seed, batch_size=args.batch, now=now)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
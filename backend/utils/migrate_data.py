@@ -1,79 +1,184 @@
+#!/usr/bin/env python3
+"""
+Bring an existing database up to the current models
+
+Runs each migration in MIGRATIONS in order; every one is resumable and is
+skipped once completed. New tables are created first.
+
+  ticket_locations   Older databases stored building, department and floor on
+                     support_tickets as text. Fills building_id, department_id
+                     and floor_id from them, creating missing buildings,
+                     departments and floors on the way.
+  ticket_assignment  Adds users.assignment_load and support_tickets.assigned_to_id,
+                     links assigned_to usernames to users and recounts agent loads.
+  ticket_sla         Adds the duplicate, triage and SLA columns and the status,
+                     created_at and (status, due_at) indexes to support_tickets,
+                     and sets due_at on open tickets from their SLA targets.
+
+Usage: python -m utils.migrate_data [--only NAME] [--dry-run] [--restart] [--batch-size 5000]
+"""
+import sys
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, select
 from database import db
-from models.support_ticket import SupportTicket
 from models.building import Building
 from models.department import Department
 from models.floor import Floor
+from models.user import User
+from models.sla_target import SlaTarget
+from services.assignment import recount_loads
+from services.sla import DEFAULT_SLA_HOURS, OPEN_STATUSES
+from utils.batch_migration import BatchMigration
 
-def migrate_ticket_data():
-    """Migrate existing ticket data to use foreign keys"""
-    try:
-        print("Starting data migration...")
-        
-        # Get all tickets
-        tickets = SupportTicket.query.all()
-        
-        for ticket in tickets:
-            # Migrate building
-            if hasattr(ticket, 'building') and isinstance(ticket.building, str):
-                building = Building.query.filter_by(name=ticket.building).first()
-                if building:
-                    ticket.building_id = building.id
-                    print(f"✓ Migrated building for ticket {ticket.id}: {ticket.building}")
-                else:
-                    # Create building if it doesn't exist
-                    building = Building(name=ticket.building)
-                    db.session.add(building)
-                    db.session.flush()  # Get the ID
-                    ticket.building_id = building.id
-                    print(f"✓ Created and migrated building for ticket {ticket.id}: {ticket.building}")
-            
-            # Migrate department
-            if hasattr(ticket, 'department') and isinstance(ticket.department, str):
-                department = Department.query.filter_by(name=ticket.department).first()
-                if department:
-                    ticket.department_id = department.id
-                    print(f"✓ Migrated department for ticket {ticket.id}: {ticket.department}")
-                else:
-                    # Create department if it doesn't exist
-                    department = Department(name=ticket.department)
-                    db.session.add(department)
-                    db.session.flush()  # Get the ID
-                    ticket.department_id = department.id
-                    print(f"✓ Created and migrated department for ticket {ticket.id}: {ticket.department}")
-            
-            # Migrate floor
-            if hasattr(ticket, 'floor') and isinstance(ticket.floor, str):
-                # Find floor in the building
-                if hasattr(ticket, 'building_id') and ticket.building_id:
-                    floor = Floor.query.filter_by(
-                        building_id=ticket.building_id,
-                        label=ticket.floor
-                    ).first()
-                    
-                    if floor:
-                        ticket.floor_id = floor.id
-                        print(f"✓ Migrated floor for ticket {ticket.id}: {ticket.floor}")
-                    else:
-                        # Create floor if it doesn't exist
-                        floor = Floor(
-                            building_id=ticket.building_id,
-                            label=ticket.floor,
-                            display_name=ticket.floor
-                        )
-                        db.session.add(floor)
-                        db.session.flush()  # Get the ID
-                        ticket.floor_id = floor.id
-                        print(f"✓ Created and migrated floor for ticket {ticket.id}: {ticket.floor}")
-        
-        # Commit all changes
-        db.session.commit()
-        print("✓ Data migration completed successfully!")
-        return True
-        
-    except Exception as e:
-        print(f"✗ Error during migration: {str(e)}")
-        db.session.rollback()
-        return False
+LEGACY_COLUMNS = ('building', 'department', 'floor')
+
+
+class TicketLocationMigration(BatchMigration):
+    """Legacy building/department/floor text -> foreign keys"""
+
+    name = 'ticket_locations'
+    table_name = 'support_tickets'
+    update_columns = ('building_id', 'department_id', 'floor_id')
+
+    def applicable(self, table):
+        self.columns = [name for name in LEGACY_COLUMNS if name in table.c] + list(self.update_columns)
+        return any(name in table.c for name in LEGACY_COLUMNS)
+
+    def prepare(self, connection):
+        """Load every lookup once; new entries are added as they are created"""
+        self.buildings = dict(connection.execute(select(Building.name, Building.id)).all())
+        self.departments = dict(connection.execute(select(Department.name, Department.id)).all())
+        self.floors = {(building_id, label): floor_id for floor_id, building_id, label
+                       in connection.execute(select(Floor.id, Floor.building_id, Floor.label))}
+        self.created = {'buildings': 0, 'departments': 0, 'floors': 0}
+        self._placeholder = 0
+
+    def _get_or_create(self, connection, kind, cache, key, model, values):
+        if key in cache:
+            return cache[key]
+        if self.dry_run:
+            # Nothing is written in a dry run; stand-in ids keep counts correct
+            self._placeholder -= 1
+            cache[key] = self._placeholder
+        else:
+            result = connection.execute(model.__table__.insert().values(**values))
+            cache[key] = result.inserted_primary_key[0]
+        self.created[kind] += 1
+        return cache[key]
+
+    def migrate_batch(self, connection, rows):
+        updates = []
+        for row in rows:
+            legacy = row._mapping
+            building_id, department_id, floor_id = row.building_id, row.department_id, row.floor_id
+
+            building = legacy.get('building')
+            if isinstance(building, str) and building.strip():
+                name = building.strip()
+                building_id = self._get_or_create(connection, 'buildings', self.buildings, name, Building, {'name': name})
+
+            department = legacy.get('department')
+            if isinstance(department, str) and department.strip():
+                name = department.strip()
+                department_id = self._get_or_create(connection, 'departments', self.departments, name, Department, {'name': name})
+
+            floor = legacy.get('floor')
+            if isinstance(floor, str) and floor.strip() and building_id:
+                label = floor.strip()
+                floor_id = self._get_or_create(connection, 'floors', self.floors, (building_id, label), Floor, {
+                    'building_id': building_id, 'label': label, 'description': f"Floor {label}"
+                })
+
+            if (building_id, department_id, floor_id) != (row.building_id, row.department_id, row.floor_id):
+                updates.append({'_key': row.id, 'building_id': building_id,
+                                'department_id': department_id, 'floor_id': floor_id})
+        return updates
+
+    def summary(self):
+        return {'created': dict(getattr(self, 'created', {}))}
+
+
+class TicketAssignmentMigration(BatchMigration):
+    """assigned_to usernames -> assigned_to_id, then users.assignment_load from open tickets"""
+
+    name = 'ticket_assignment'
+    table_name = 'support_tickets'
+    columns = ('assigned_to', 'assigned_to_id')
+    update_columns = ('assigned_to_id',)
+    add_columns = {'users': ('assignment_load',), 'support_tickets': ('assigned_to_id',)}
+    add_indexes = ('ix_support_tickets_assigned_to_id',)
+
+    def prepare(self, connection):
+        self.user_ids = dict(connection.execute(select(User.username, User.id)).all())
+
+    def migrate_batch(self, connection, rows):
+        return [{'_key': row.id, 'assigned_to_id': self.user_ids[row.assigned_to]}
+                for row in rows if row.assigned_to_id is None and row.assigned_to in self.user_ids]
+
+    def finish(self):
+        self.recounted = recount_loads()
+
+    def summary(self):
+        return {'loads_recounted': getattr(self, 'recounted', 0)}
+
+
+class TicketSlaMigration(BatchMigration):
+    """Duplicate, triage and SLA columns and the SLA and claim-next indexes; due_at for open tickets from their SLA targets"""
+
+    name = 'ticket_sla'
+    table_name = 'support_tickets'
+    columns = ('priority', 'status', 'department_id', 'created_at', 'due_at')
+    update_columns = ('due_at',)
+    add_columns = {'support_tickets': ('duplicate_of_id', 'suggested_priority', 'suggested_issue_type',
+                                       'due_at', 'breached_at')}
+    add_indexes = ('ix_support_tickets_status', 'ix_support_tickets_created_at', 'ix_support_tickets_status_due_at',
+                   'ix_support_tickets_queue')
+
+    def prepare(self, connection):
+        """SLA targets by (priority, department id); None department applies to every department"""
+        self.targets = {}
+        if inspect(connection).has_table(SlaTarget.__tablename__):
+            self.targets = {(priority, department_id): hours for priority, department_id, hours in
+                            connection.execute(select(SlaTarget.priority, SlaTarget.department_id, SlaTarget.hours))}
+        self.now = datetime.utcnow()
+
+    def hours(self, priority, department_id):
+        # Same precedence as services.sla.target_hours
+        for key in ((priority, department_id), (priority, None)):
+            if key in self.targets:
+                return self.targets[key]
+        return DEFAULT_SLA_HOURS.get(priority, DEFAULT_SLA_HOURS['medium'])
+
+    def migrate_batch(self, connection, rows):
+        return [{'_key': row.id,
+                 'due_at': (row.created_at or self.now) + timedelta(hours=self.hours(row.priority, row.department_id))}
+                for row in rows if row.status in OPEN_STATUSES and row.due_at is None]
+
+
+MIGRATIONS = (TicketLocationMigration, TicketAssignmentMigration, TicketSlaMigration)
+
+
+def migrate_ticket_data(dry_run=False, restart=False, batch_size=None, only=None):
+    """Run every migration (or those named in only) in order; returns False on the first failure"""
+    if not dry_run:
+        db.create_all()
+    for migration in MIGRATIONS:
+        if only and migration.name not in only:
+            continue
+        try:
+            report = migration(batch_size=batch_size, dry_run=dry_run).run(restart=restart)
+        except Exception as e:
+            print(f"✗ Error during migration {migration.name}: {str(e)}")
+            return False
+        created = report.get('created')
+        if created and any(created.values()):
+            verb = 'Would create' if dry_run else 'Created'
+            print(f"✓ {verb} {created['buildings']} buildings, {created['departments']} departments, "
+                  f"{created['floors']} floors")
+        if report.get('loads_recounted'):
+            print(f"✓ Recounted assignment loads for {report['loads_recounted']} users")
+    return True
 
 def cleanup_old_columns():
     """Remove old string columns after migration (run this after confirming migration worked)"""
@@ -86,7 +191,21 @@ def cleanup_old_columns():
         print(f"✗ Error cleaning up old columns: {str(e)}")
         return False
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description='Bring an existing database up to the current models')
+    parser.add_argument('--only', choices=[migration.name for migration in MIGRATIONS], action='append',
+                        help='run only these migrations')
+    parser.add_argument('--dry-run', action='store_true', help='process every batch and roll it back')
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoint and start from the first row')
+    parser.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args()
+
     from app import app
     with app.app_context():
-        migrate_ticket_data() 
\ No newline at end of file
+        ok = migrate_ticket_data(dry_run=args.dry_run, restart=args.restart, batch_size=args.batch_size,
+                                 only=args.only)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
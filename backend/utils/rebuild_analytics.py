@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Recompute analytics rollups from the tickets table
+
+Usage: python -m utils.rebuild_analytics [--only resolution|volume|satisfaction]
+"""
+import sys
+import time
+import argparse
+from database import db
+from services.resolution_analytics import rebuild_resolution_rollups
+from services.volume_forecast import rebuild_volume_rollups
+from services.satisfaction_analytics import rebuild_satisfaction_rollups
+
+REBUILDERS = {
+    'resolution': ('resolution-time rollups', rebuild_resolution_rollups),
+    'volume': ('ticket volume rollups', rebuild_volume_rollups),
+    'satisfaction': ('satisfaction rollups', rebuild_satisfaction_rollups),
+}
+
+
+def rebuild(names=None):
+    for name in names or REBUILDERS:
+        label, rebuild_fn = REBUILDERS[name]
+        start = time.perf_counter()
+        count = rebuild_fn()
+        print(f"✓ Rebuilt {label} from {count:,} tickets in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute analytics rollups')
+    parser.add_argument('--only', choices=sorted(REBUILDERS), action='append', help='rebuild only these rollups')
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        db.create_all()
+        rebuild(args.only)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
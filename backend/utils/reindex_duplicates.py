@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Backfill duplicate links for open tickets
+
+Walks the open tickets oldest first and sets duplicate_of_id on unlinked
+tickets that duplicate an earlier open one (--link). The index it builds lives
+only in this process. --rebuild makes every running web worker rebuild its own
+index within DUPLICATE_GENERATION_CHECK_SECONDS, like
+POST /api/admin/tickets/duplicates/reindex.
+
+Usage: python -m utils.reindex_duplicates [--link] [--rebuild]
+"""
+import sys
+import time
+import argparse
+from database import db
+from models.index_generation import IndexGeneration
+from models.support_ticket import SupportTicket
+from services.duplicate_detector import DuplicateIndex, GENERATION_NAME, OPEN_STATUSES, minhash_signature
+
+
+def reindex_duplicates(link=False, batch_size=1000):
+    """Compute signatures for every open ticket, oldest first, in a local index
+
+    With link=True, open tickets that are not yet linked get duplicate_of_id set
+    to the oldest earlier open ticket they duplicate. The returned index is not
+    the one the server uses.
+    """
+    start = time.perf_counter()
+    index = DuplicateIndex()
+    linked = 0
+    pending_links = []
+
+    query = db.session.query(
+        SupportTicket.id,
+        SupportTicket.building_id,
+        SupportTicket.issue_type,
+        SupportTicket.description,
+        SupportTicket.duplicate_of_id
+    ).filter(SupportTicket.status.in_(OPEN_STATUSES)).order_by(SupportTicket.id).yield_per(batch_size)
+
+    for ticket_id, building_id, issue_type, description, duplicate_of_id in query:
+        signature = minhash_signature(description)
+        if link and duplicate_of_id is None:
+            duplicate = index.find(building_id, issue_type, description, signature=signature)
+            if duplicate:
+                pending_links.append({'id': ticket_id, 'duplicate_of_id': duplicate[0]})
+        index.add(ticket_id, building_id, issue_type, description, signature=signature)
+
+    for i in range(0, len(pending_links), batch_size):
+        batch = pending_links[i:i + batch_size]
+        db.session.bulk_update_mappings(SupportTicket, batch)
+        db.session.commit()
+        linked += len(batch)
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Indexed {len(index)} open tickets in {elapsed:.2f}s")
+    if link:
+        print(f"✓ Linked {linked} tickets to earlier duplicates")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill duplicate links and rebuild the servers\' indexes')
+    parser.add_argument('--link', action='store_true', help='set duplicate_of_id on unlinked duplicates')
+    parser.add_argument('--rebuild', action='store_true', help='have every running web worker rebuild its index')
+    args = parser.parse_args()
+    if not args.link and not args.rebuild:
+        parser.error('nothing to do: pass --link, --rebuild or both')
+
+    from app import app
+    with app.app_context():
+        if args.link:
+            reindex_duplicates(link=True)
+        if args.rebuild:
+            generation = IndexGeneration.bump(GENERATION_NAME)
+            print(f"✓ Web workers will rebuild their duplicate indexes (generation {generation})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
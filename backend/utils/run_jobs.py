@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Run background jobs in a dedicated process
+
+Usage: python -m utils.run_jobs [--workers 4]
+
+Useful with several web workers: set JOB_WORKERS=0 for the web processes and
+run one or more of these instead. Jobs are claimed per row, so any number of
+runners can share the jobs table.
+"""
+import sys
+import time
+import argparse
+from database import db
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run background jobs')
+    parser.add_argument('--workers', type=int, default=None, help='worker threads (default JOB_WORKERS or 2)')
+    args = parser.parse_args()
+
+    from app import app
+    from services.jobs import JobRunner, PERIODIC
+    with app.app_context():
+        db.create_all()
+
+    runner = JobRunner(app, workers=args.workers)
+    runner.start()
+    print(f"✅ Running jobs with {runner.workers} workers as {runner.worker_id}")
+    for name, every in sorted(PERIODIC.items()):
+        print(f"✓ {name} every {every:g}s")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping...")
+        runner.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,105 +7,114 @@ from models.user import User
 from models.building import Building
 from models.department import Department
 from models.floor import Floor
-import bcrypt
-from datetime import datetime
+from services.passwords import password_hasher
+
+ADMIN_USERNAME = 'ict_support'
+ADMIN_PASSWORD = 'Ict@support'
+
+BUILDINGS = [
+    {"name": "Uchumi House", "description": "Uchumi House building"},
+    {"name": "KICC", "description": "KICC building"},
+    {"name": "Harambee House", "description": "Harambee House building"},
+    {"name": "Teleposta", "description": "Teleposta building"}
+]
+
+FLOOR_LABELS = [str(i) for i in range(1, 28)] + ["Background Floor", "Ground Floor"]
+
+DEPARTMENTS = [
+    {"name": "Human Resource", "description": "Human Resource department"},
+    {"name": "Internal Audit", "description": "Internal Audit department"},
+    {"name": "Guidance and Counselling", "description": "Guidance and Counselling department"},
+    {"name": "Accounts", "description": "Accounts department"},
+    {"name": "Library", "description": "Library department"},
+    {"name": "Treasury", "description": "Treasury department"}
+]
+
+
+def seed_admin(connection):
+    """Insert the default admin user"""
+    connection.execute(User.__table__.insert(), [{
+        'username': ADMIN_USERNAME,
+        'password_hash': password_hasher.hash(ADMIN_PASSWORD),
+        'role': 'ADMIN',
+        'active': True,
+        'must_change_password': True
+    }])
+    print(f"✓ Created admin user: {ADMIN_USERNAME}")
+
+
+def seed_buildings(connection):
+    """Insert buildings, then every floor in one executemany"""
+    connection.execute(Building.__table__.insert(), BUILDINGS)
+    building_ids = dict(connection.execute(db.select(Building.name, Building.id)).all())
+
+    floors = [
+        {'building_id': building_ids[building['name']], 'label': label,
+         'description': f"Floor {label} in {building['name']}"}
+        for building in BUILDINGS
+        for label in FLOOR_LABELS
+    ]
+    connection.execute(Floor.__table__.insert(), floors)
+    print(f"✓ Created {len(BUILDINGS)} buildings with {len(FLOOR_LABELS)} floors each")
+
+
+def seed_departments(connection):
+    """Insert departments"""
+    connection.execute(Department.__table__.insert(), DEPARTMENTS)
+    print(f"✓ Created {len(DEPARTMENTS)} departments")
+
 
 def seed_database():
     """Seed the database with initial data"""
     try:
         # Check if admin user already exists
-        admin_user = User.query.filter_by(username='ict_support').first()
-        if not admin_user:
-            # Create default admin user
-            admin_user = User(
-                username='ict_support',
-                role='ADMIN',
-                active=True,
-                must_change_password=True
-            )
-            admin_user.set_password('Ict@support')
-            db.session.add(admin_user)
-            print("✓ Created admin user: ict_support")
-        
+        if not db.session.query(User.id).filter_by(username=ADMIN_USERNAME).first():
+            seed_admin(db.session)
+
         # Check if buildings already exist
-        if Building.query.count() == 0:
-            # Create buildings
-            buildings_data = [
-                {"name": "Uchumi House", "description": "Uchumi House building"},
-                {"name": "KICC", "description": "KICC building"},
-                {"name": "Harambee House", "description": "Harambee House building"},
-                {"name": "Teleposta", "description": "Teleposta building"}
-            ]
-            
-            buildings = {}
-            for building_data in buildings_data:
-                building = Building(**building_data)
-                db.session.add(building)
-                buildings[building_data['name']] = building
-                print(f"✓ Created building: {building_data['name']}")
-            
-            # Commit buildings to get their IDs
-            db.session.commit()
-            
-            # Now get the buildings with their IDs
-            for building_data in buildings_data:
-                building = Building.query.filter_by(name=building_data['name']).first()
-                if building:
-                    buildings[building_data['name']] = building
-            
-            # Create floors for each building
-            floor_labels = [str(i) for i in range(1, 28)] + ["Background Floor", "Ground Floor"]
-            
-            for building_name, building in buildings.items():
-                for label in floor_labels:
-                    floor = Floor(
-                        building_id=building.id,
-                        label=label,
-                        description=f"Floor {label} in {building_name}"
-                    )
-                    db.session.add(floor)
-                print(f"✓ Created {len(floor_labels)} floors for {building_name}")
-        
+        if not db.session.query(Building.id).first():
+            seed_buildings(db.session)
+
         # Check if departments already exist
-        if Department.query.count() == 0:
-            # Create departments
-            departments_data = [
-                {"name": "Human Resource", "description": "Human Resource department"},
-                {"name": "Internal Audit", "description": "Internal Audit department"},
-                {"name": "Guidance and Counselling", "description": "Guidance and Counselling department"},
-                {"name": "Accounts", "description": "Accounts department"},
-                {"name": "Library", "description": "Library department"},
-                {"name": "Treasury", "description": "Treasury department"}
-            ]
-            
-            for dept_data in departments_data:
-                department = Department(**dept_data)
-                db.session.add(department)
-                print(f"✓ Created department: {dept_data['name']}")
-        
+        if not db.session.query(Department.id).first():
+            seed_departments(db.session)
+
         # Commit all changes
         db.session.commit()
         print("✅ Database seeding completed!")
-        
+
     except Exception as e:
         print(f"✗ Error seeding database: {str(e)}")
         db.session.rollback()
         raise
 
+
 def reset_database():
-    """Reset the database (for development)"""
+    """Reset the database (for development)
+
+    SQLite databases are restored from the seeded template snapshot
+    (utils/db_template.py); other databases are dropped, recreated and seeded.
+    """
+    from utils.db_template import is_sqlite, restore_template
+
     try:
+        if is_sqlite():
+            restore_template()
+            print("✓ Restored database from template")
+            return True
+
         # Drop all tables
         db.drop_all()
         print("✓ Dropped all tables")
-        
+
         # Create all tables
         db.create_all()
         print("✓ Created all tables")
-        
+
         # Seed the database
-        return seed_database()
-        
+        seed_database()
+        return True
+
     except Exception as e:
         print(f"✗ Error resetting database: {str(e)}")
         return False
@@ -114,4 +123,4 @@ if __name__ == "__main__":
     # This can be run directly to seed the database
     from app import app
     with app.app_context():
-        seed_database() 
\ No newline at end of file
+        seed_database()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Train the auto-triage model from historical tickets
+
+Usage: python -m utils.train_triage [--min-count N] [--backfill]
+"""
+import sys
+import time
+from database import db
+from models.support_ticket import SupportTicket
+from services.triage import train_triage_model, TriageModel
+
+
+def train(min_count=5):
+    """Train priority and issue-type classifiers from every ticket and save them"""
+    start = time.perf_counter()
+    rows = db.session.query(
+        SupportTicket.issue_type,
+        SupportTicket.description,
+        SupportTicket.priority
+    ).yield_per(5000)
+
+    model = train_triage_model(rows, min_count=min_count)
+    path = model.save()
+
+    elapsed = time.perf_counter() - start
+    for name, classifier in (('priority', model.priority_model), ('issue_type', model.issue_type_model)):
+        classes = len(classifier.classes) if classifier else 0
+        print(f"✓ {name}: {classes} classes")
+    print(f"✓ Model saved to {path} ({elapsed:.2f}s)")
+    return model
+
+
+def backfill(model=None, batch_size=5000):
+    """Score every ticket without a suggestion, in batches"""
+    model = model or TriageModel.load()
+    start = time.perf_counter()
+    scored = 0
+    last_id = 0
+
+    while True:
+        rows = db.session.query(
+            SupportTicket.id,
+            SupportTicket.issue_type,
+            SupportTicket.description
+        ).filter(
+            SupportTicket.id > last_id,
+            SupportTicket.suggested_priority.is_(None)
+        ).order_by(SupportTicket.id).limit(batch_size).all()
+        if not rows:
+            break
+
+        suggestions = model.suggest_batch([(issue_type, description) for _, issue_type, description in rows])
+        db.session.bulk_update_mappings(SupportTicket, [
+            {
+                'id': ticket_id,
+                'suggested_priority': suggestion['priority'],
+                'suggested_issue_type': suggestion['issue_type']
+            }
+            for (ticket_id, _, _), suggestion in zip(rows, suggestions)
+        ])
+        db.session.commit()
+        scored += len(rows)
+        last_id = rows[-1][0]
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Backfilled suggestions for {scored} tickets in {elapsed:.2f}s")
+    return scored
+
+
+if __name__ == "__main__":
+    from app import app
+    min_count = int(sys.argv[sys.argv.index('--min-count') + 1]) if '--min-count' in sys.argv else 5
+    with app.app_context():
+        trained = train(min_count=min_count)
+        if '--backfill' in sys.argv:
+            backfill(trained)
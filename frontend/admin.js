@@ -332,6 +332,11 @@ class AdminModule {
             const data = await response.json();
 
             if (response.ok) {
+                // Existing tokens are revoked on password change; keep the fresh one
+                if (data.token) {
+                    this.token = data.token;
+                    localStorage.setItem('admin_token', this.token);
+                }
                 this.showSuccessMessage('Password changed successfully');
                 document.getElementById('password-change').classList.remove('active');
                 this.showAdminDashboard();
@@ -779,6 +784,13 @@ class AdminModule {
     }
 
     logout() {
+        if (this.token) {
+            // Revoke the token server-side; the local session is cleared regardless
+            fetch('/api/logout', {
+                method: 'POST',
+                headers: { 'Authorization': `Bearer ${this.token}` }
+            }).catch(() => {});
+        }
         localStorage.removeItem('admin_token');
         localStorage.removeItem('admin_user');
         this.token = null;